@@ -0,0 +1,64 @@
+"""
+Performance budgets for tests.
+
+The budgets of a test are set with the ap_perf marker (the defaults for the
+test) and in the test's config.toml section (server-specific values that
+override the marker). A test that passes but exceeds a budget has the
+"overbudget" outcome.
+"""
+
+from typing import Any, Callable, Mapping
+
+OVERBUDGET = "overbudget"
+
+
+def _delivery_ms(durations: Mapping[str, float], metadata: Mapping[str, Any]):
+    latencies = [latency for _, _, latency in metadata.get("delivery_latency") or []]
+    return max(latencies) * 1000 if latencies else None
+
+
+# Budget name -> function of the stage durations and test metadata
+# that returns the actual value (None if there is no value)
+BUDGETS: dict[str, Callable[[Mapping[str, float], Mapping[str, Any]], Any]] = {
+    "max_setup_seconds": lambda durations, _: durations.get("setup"),
+    "max_call_seconds": lambda durations, _: durations.get("call"),
+    "max_duration_seconds": lambda durations, _: sum(durations.values()),
+    # Slowest delivery (outbox POST to remote receipt) in the test
+    "max_delivery_ms": _delivery_ms,
+}
+
+
+def unknown_budgets(budgets: Mapping[str, Any]) -> list[str]:
+    return [name for name in budgets if name not in BUDGETS]
+
+
+def get_budgets(
+    marker_budgets: Mapping[str, Any], test_config: Mapping[str, Any]
+) -> dict[str, float]:
+    budgets = dict(marker_budgets)
+    budgets.update(
+        {name: value for name, value in test_config.items() if name in BUDGETS}
+    )
+    return budgets
+
+
+def check_budgets(
+    budgets: Mapping[str, float],
+    durations: Mapping[str, float],
+    metadata: Mapping[str, Any],
+) -> list[dict[str, Any]]:
+    """The budget, actual value and whether the budget was exceeded
+    for each budget that has a value"""
+    results = []
+    for name, budget in budgets.items():
+        actual = BUDGETS[name](durations, metadata)
+        if actual is not None:
+            results.append(
+                {
+                    "name": name,
+                    "budget": budget,
+                    "actual": round(actual, 6),
+                    "exceeded": actual > budget,
+                }
+            )
+    return results
@@ -1,6 +1,17 @@
+import json
+import os
+import tempfile
+
 import click
+import pytest
 
+from .history import DurationHistory, estimate_duration, history_path
+from .load import LOAD_ACTIVITY_TYPES, format_summary
+from .report.compare import DEFAULT_MIN_DELTA, DEFAULT_THRESHOLD
+from .report.generator import compare_main
 from .report.generator import main as report_main
+from .report.generator import matrix_main
+from .report.merge import merge_report_files
 
 
 @click.group
@@ -12,8 +23,9 @@ def aptest():
 @click.option(
     "--input",
     metavar="FILENAME",
-    default="test-report.json",
-    help="JSON test data",
+    default=["test-report.json"],
+    multiple=True,
+    help="JSON test data (repeat to merge shard reports)",
 )
 @click.option(
     "--output",
@@ -26,9 +38,226 @@ def aptest():
     is_flag=True,
     help="Launch browser for HTML report",
 )
-def report(input: str, output: str, browser: bool):
+@click.option(
+    "--lazy",
+    is_flag=True,
+    help="Embed compressed test data and render the tests in the browser",
+)
+def report(input: tuple[str], output: str, browser: bool, lazy: bool):
     """Generate an HTML report from the JSON data produced by pytest."""
     try:
-        report_main(input, output, browser=browser)
+        report_main(list(input), output, browser=browser, lazy=lazy)
+    except FileNotFoundError as ex:
+        raise click.ClickException(ex)
+
+
+@aptest.command(context_settings={"show_default": True})
+@click.argument("reports", nargs=-1, required=True, metavar="REPORT...")
+@click.option(
+    "--output",
+    metavar="FILENAME",
+    default="test-report.json",
+    help="Merged JSON output file",
+)
+def merge(reports: tuple[str], output: str):
+    """Merge JSON test reports (from shards or workers) into one report.
+
+    Tests in more than one report (re-runs) are taken from the last report."""
+    try:
+        merger = merge_report_files(list(reports))
+    except FileNotFoundError as ex:
+        raise click.ClickException(ex)
+    with open(output, "w") as fp:
+        merger.write(fp)
+    click.echo(f"Merged {len(reports)} reports ({len(merger.tests)} tests) to {output}")
+
+
+@aptest.command(context_settings={"show_default": True})
+@click.argument("reports", nargs=-1, required=True, metavar="REPORT...")
+@click.option(
+    "--output",
+    metavar="FILENAME",
+    default="test-matrix.html",
+    help="HTML output file",
+)
+@click.option(
+    "--browser",
+    is_flag=True,
+    help="Launch browser for HTML report",
+)
+def matrix(reports: tuple[str], output: str, browser: bool):
+    """Generate a test x server matrix report from the JSON reports
+    of several servers (keyed by project name)."""
+    try:
+        report_matrix = matrix_main(list(reports), output, browser=browser)
+    except FileNotFoundError as ex:
+        raise click.ClickException(ex)
+    click.echo(
+        f"{len(report_matrix.tests)} tests x {len(report_matrix.servers)} servers "
+        f"({', '.join(report_matrix.servers)}) to {output}"
+    )
+
+
+@aptest.command(context_settings={"show_default": True})
+@click.argument("base")
+@click.argument("head")
+@click.option(
+    "--output",
+    metavar="FILENAME",
+    default=None,
+    help="HTML comparison output file",
+)
+@click.option(
+    "--threshold",
+    default=DEFAULT_THRESHOLD,
+    help="Relative duration increase that is a regression (0.2 = 20%)",
+)
+@click.option(
+    "--min-delta",
+    default=DEFAULT_MIN_DELTA,
+    help="Duration increases (seconds) smaller than this are not regressions",
+)
+@click.option(
+    "--top",
+    default=10,
+    help="Number of slowest new tests to show",
+)
+@click.option(
+    "--browser",
+    is_flag=True,
+    help="Launch browser for HTML comparison",
+)
+def compare(
+    base: str,
+    head: str,
+    output: str,
+    threshold: float,
+    min_delta: float,
+    top: int,
+    browser: bool,
+):
+    """Compare two test runs (JSON reports) for outcome and duration changes.
+
+    Exits with a non-zero status if there are regressions."""
+    try:
+        comparison = compare_main(
+            base,
+            head,
+            output,
+            threshold=threshold,
+            min_delta=min_delta,
+            top=top,
+            browser=browser,
+        )
     except FileNotFoundError as ex:
         raise click.ClickException(ex)
+    if comparison.has_regressions:
+        raise SystemExit(1)
+
+
+@aptest.command(context_settings={"show_default": True})
+@click.argument("reports", nargs=-1, metavar="[REPORT]...")
+@click.option(
+    "--history",
+    "history_file",
+    metavar="FILENAME",
+    default=history_path("."),
+    help="Duration history database",
+)
+@click.option(
+    "--workers",
+    default=1,
+    help="Number of parallel workers for the duration estimate",
+)
+@click.option(
+    "--top",
+    default=10,
+    help="Number of slowest tests to show",
+)
+def history(reports: tuple[str], history_file: str, workers: int, top: int):
+    """Add JSON test reports to the duration history and summarize it."""
+    if not reports and not os.path.exists(history_file):
+        raise click.ClickException(f"No duration history: {history_file}")
+    with DurationHistory(history_file) as duration_history:
+        for report_file in reports:
+            try:
+                count = duration_history.ingest_file(report_file)
+            except FileNotFoundError as ex:
+                raise click.ClickException(ex)
+            click.echo(f"Added {count} test durations from {report_file}")
+        durations = duration_history.durations()
+    slowest = sorted(durations.items(), key=lambda x: x[1], reverse=True)
+    for nodeid, duration in slowest[:top]:
+        click.echo(f"{duration:8.3f}s  {nodeid}")
+    estimate = estimate_duration(durations, durations, workers)
+    click.echo(f"{len(durations)} tests, estimated duration {estimate:0.1f}s")
+
+
+@aptest.command(context_settings={"show_default": True, "ignore_unknown_options": True})
+@click.option("--duration", default=30.0, help="Duration of the load (seconds)")
+@click.option(
+    "--rate",
+    type=float,
+    default=None,
+    help="Target requests per second (default: as fast as the server responds)",
+)
+@click.option("--concurrency", default=10, help="Maximum concurrent requests")
+@click.option("--senders", default=10, help="Number of simulated remote actors")
+@click.option(
+    "--requests",
+    type=int,
+    default=None,
+    help="Maximum number of requests (default: no limit)",
+)
+@click.option(
+    "--types",
+    default=",".join(LOAD_ACTIVITY_TYPES),
+    help="Comma-separated activity types to send",
+)
+@click.option(
+    "--output",
+    metavar="FILENAME",
+    default=None,
+    help="JSON results file",
+)
+@click.argument("pytest_args", nargs=-1, type=click.UNPROCESSED)
+def load(
+    duration: float,
+    rate: float | None,
+    concurrency: int,
+    senders: int,
+    requests: int | None,
+    types: str,
+    output: str | None,
+    pytest_args: tuple[str],
+):
+    """Send sustained signed inbox traffic to the server-under-test.
+
+    Runs the load tests (ap_load marker) in the server test directory
+    (the current directory) with pytest. Additional arguments are passed
+    to pytest."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        results_file = output or os.path.join(temp_dir, "load-results.json")
+        args = [
+            "-m",
+            "ap_load",
+            "--aptest-load",
+            f"--aptest-load-duration={duration}",
+            f"--aptest-load-concurrency={concurrency}",
+            f"--aptest-load-senders={senders}",
+            f"--aptest-load-types={types}",
+            f"--aptest-load-output={results_file}",
+        ]
+        if rate:
+            args.append(f"--aptest-load-rate={rate}")
+        if requests:
+            args.append(f"--aptest-load-requests={requests}")
+        exit_code = pytest.main(args + list(pytest_args))
+        if os.path.exists(results_file):
+            with open(results_file) as fp:
+                results = json.load(fp)
+            for nodeid, summary in results.items():
+                click.echo(nodeid)
+                for line in format_summary(summary):
+                    click.echo(f"  {line}")
+    raise SystemExit(exit_code)
@@ -0,0 +1,305 @@
+"""
+Delivery tracking for the simulated remote server.
+
+A tracker records the POST requests received by the remote server (and its
+virtual hosts) with their receive times. The deliveries of an activity are
+matched against the expected inboxes to find missed and duplicate
+deliveries and the delivery completion times.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Iterable, Mapping
+from urllib.parse import urlparse
+
+from activitypub_testsuite.interfaces import RemoteRequest
+from activitypub_testsuite.report.summary import latency_summary
+
+
+@dataclass
+class FanoutConfig:
+    followers: int = 100
+    # Simulated remote hosts (the followers are spread across the hosts)
+    hosts: int = 10
+    # Every n-th host has a shared inbox (0 = none)
+    shared_inbox_every: int = 2
+    timeout: float = 60.0
+
+
+def inbox_key(url: str) -> tuple[int | None, str]:
+    """Inboxes are matched by port and path. The received request URLs
+    have the listener address rather than the host name."""
+    parsed = urlparse(url)
+    return parsed.port, parsed.path
+
+
+def actor_delivery_inbox(actor: Any) -> str:
+    """The inbox that a server should deliver a public or followers-addressed
+    activity to (the shared inbox, if any)"""
+    return getattr(actor, "shared_inbox", None) or actor.inbox
+
+
+def request_activity_id(request: RemoteRequest) -> str | None:
+    return request.json.get("id") if isinstance(request.json, dict) else None
+
+
+@dataclass
+class Receipt:
+    received: float  # time.monotonic()
+    inbox: tuple[int | None, str]
+    activity_id: str | None
+
+
+class DeliveryTracker:
+    def __init__(self, expected_inboxes: Iterable[str] = ()):
+        self.expected: dict[tuple[int | None, str], str] = {}
+        self.expect(expected_inboxes)
+        self.receipts: list[Receipt] = []
+        self.start: float | None = None
+        self._condition = threading.Condition()
+
+    def expect(self, inboxes: Iterable[str]) -> None:
+        """Add expected delivery inboxes"""
+        self.expected.update({inbox_key(inbox): inbox for inbox in inboxes})
+
+    def attach(self, httpd) -> "DeliveryTracker":
+        """Start recording the POST requests received by the remote server"""
+        httpd.listeners.append(self.on_request)
+        return self
+
+    def on_request(self, method: str, handler) -> None:
+        if method != "POST":
+            return
+        request = handler.remote_request
+        self.record(
+            inbox_key(request.url), request_activity_id(request), request.received
+        )
+
+    def record(
+        self,
+        inbox: tuple[int | None, str],
+        activity_id: str | None,
+        received: float | None = None,
+    ) -> None:
+        with self._condition:
+            self.receipts.append(
+                Receipt(received or time.monotonic(), inbox, activity_id)
+            )
+            self._condition.notify_all()
+
+    def begin(self) -> None:
+        """Mark the start of the delivery (just before posting the activity)"""
+        self.start = time.monotonic()
+
+    def delivered_inboxes(self, activity_id: str) -> set[tuple[int | None, str]]:
+        return {
+            receipt.inbox
+            for receipt in self.receipts
+            if receipt.activity_id == activity_id and receipt.inbox in self.expected
+        }
+
+    def wait(
+        self,
+        activity_id: str,
+        timeout: float,
+        settle: float = 1.0,
+        inboxes: Iterable[str] | None = None,
+    ) -> bool:
+        """Wait until the activity is delivered to every expected inbox (or the
+        given inboxes). Then wait a little longer (settle) for any duplicate
+        deliveries."""
+        keys = {inbox_key(inbox) for inbox in inboxes or self.expected.values()}
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            complete = self._condition.wait_for(
+                lambda: keys <= self.delivered_inboxes(activity_id),
+                max(deadline - time.monotonic(), 0),
+            )
+        if complete and settle:
+            time.sleep(settle)
+        return complete
+
+    def _first_receipts(
+        self, activity_id: str
+    ) -> tuple[dict[tuple[int | None, str], float], int, int]:
+        """The first receipt time (since the start) at each expected inbox,
+        and the numbers of duplicate and unexpected receipts"""
+        start = self.start if self.start is not None else 0.0
+        with self._condition:
+            receipts = [r for r in self.receipts if r.activity_id == activity_id]
+        first: dict[tuple[int | None, str], float] = {}
+        duplicates = unexpected = 0
+        for receipt in sorted(receipts, key=lambda r: r.received):
+            if receipt.inbox not in self.expected:
+                unexpected += 1
+            elif receipt.inbox in first:
+                duplicates += 1
+            else:
+                first[receipt.inbox] = receipt.received - start
+        return first, duplicates, unexpected
+
+    def receive_times(self, activity_id: str) -> dict[str, float | None]:
+        """The first receipt time (seconds since the start) at each expected
+        inbox (None if not delivered)"""
+        first, _, _ = self._first_receipts(activity_id)
+        return {url: first.get(key) for key, url in self.expected.items()}
+
+    def receipt_counts(
+        self, activity_id: str, inboxes: Iterable[str] | None = None
+    ) -> dict[str, int]:
+        """The number of receipts of the activity at each expected inbox
+        (or the given inboxes, expected or not)"""
+        urls = list(inboxes) if inboxes is not None else list(self.expected.values())
+        with self._condition:
+            received = [r.inbox for r in self.receipts if r.activity_id == activity_id]
+        return {url: received.count(inbox_key(url)) for url in urls}
+
+    def summary(self, activity_id: str) -> dict[str, Any]:
+        first, duplicates, unexpected = self._first_receipts(activity_id)
+        times = sorted(first.values())
+        missed = [url for key, url in self.expected.items() if key not in first]
+        return {
+            "expected": len(self.expected),
+            "delivered": len(first),
+            "missed": len(missed),
+            "missed_inboxes": sorted(missed),
+            "duplicates": duplicates,
+            "unexpected": unexpected,
+            "completion_time": round(times[-1], 6) if times and not missed else None,
+            "latency": latency_summary(times),
+            # Number of inboxes delivered to by each time (seconds)
+            "curve": [[round(t, 6), i + 1] for i, t in enumerate(times)],
+        }
+
+
+class UndoLog:
+    """Activities (follows and likes, for example) posted by remote actors
+    during a test. The remote actors undo them when the test ends so they
+    don't affect later tests or runs."""
+
+    def __init__(self):
+        # (remote actor, inbox, activity)
+        self.activities: list[tuple[Any, str, dict[str, Any]]] = []
+        self._lock = threading.Lock()
+
+    def add(self, actor: Any, inbox: str, activity: dict[str, Any]) -> None:
+        with self._lock:
+            self.activities.append((actor, inbox, activity))
+
+    def undo_all(self, concurrency: int = 1) -> None:
+        """Post an Undo of each activity to the inbox it was posted to"""
+        with self._lock:
+            activities = list(self.activities)
+            self.activities.clear()
+
+        def undo(item: tuple[Any, str, dict[str, Any]]) -> None:
+            actor, inbox, activity = item
+            actor.post(
+                inbox,
+                actor.setup_activity({"type": "Undo", "object": activity}),
+                exception=False,
+            )
+
+        with ThreadPoolExecutor(concurrency) as pool:
+            list(pool.map(undo, activities))
+
+
+class RemoteFollowers:
+    """Remote followers of a local actor that are added for a test. The
+    remote actors undo their follows when the test ends (see the
+    remote_followers fixture) so later tests don't deliver to them."""
+
+    def __init__(self, local_actor: Any):
+        self.local_actor = local_actor
+        self.follows = UndoLog()
+
+    def add(self, followers: list[Any], tries: int | None = None) -> bool:
+        """Each remote actor follows the local actor and the local actor
+        accepts the Follow. Returns True when every remote actor is in the
+        followers collection."""
+        local_actor = self.local_actor
+        for follower in followers:
+            follow_activity = follower.setup_activity(
+                {"type": "Follow", "object": local_actor.id}
+            )
+            self.follows.add(follower, local_actor.inbox, follow_activity)
+            follower.post(local_actor.inbox, follow_activity)
+            local_actor.post(
+                local_actor.outbox,
+                local_actor.make_activity(
+                    {"type": "Accept", "object": follow_activity["id"]}
+                ),
+                exception=False,
+            )
+
+        follower_ids = {follower.id for follower in followers}
+        followers_collection = local_actor.wait_for_collection_state(
+            local_actor.followers,
+            lambda items: follower_ids <= set(items),
+            tries=tries or max(5, len(followers) // 10),
+        )
+        return follower_ids <= set(followers_collection)
+
+    def remove_all(self) -> None:
+        """Undo the follows"""
+        self.follows.undo_all()
+
+
+def format_fanout_summary(summary: dict[str, Any]) -> list[str]:
+    completion = summary["completion_time"]
+    latency = summary["latency"]
+    return [
+        f"{summary['delivered']} of {summary['expected']} inboxes delivered"
+        + (f" in {completion:0.3f}s" if completion is not None else ""),
+        f"missed {summary['missed']}, duplicates {summary['duplicates']}, "
+        f"unexpected {summary['unexpected']}",
+        "delivery time: "
+        + " ".join(
+            f"{key}={latency[key] * 1000:0.1f}ms"
+            for key in ["p50", "p90", "p99", "max"]
+        ),
+    ]
+
+
+#
+# Delivery latency (outbox POST to remote receipt)
+#
+
+# Send times (time.monotonic()) of the activities posted to local outboxes
+# during the current test, by activity id (the outbox POST Location)
+_outbox_posts: dict[str, float] = {}
+
+
+def record_outbox_post(activity_id: str, sent: float) -> None:
+    _outbox_posts[activity_id] = sent
+
+
+def outbox_posts() -> dict[str, float]:
+    return dict(_outbox_posts)
+
+
+def clear_outbox_posts() -> None:
+    _outbox_posts.clear()
+
+
+def delivery_latencies(
+    sent: Mapping[str, float], requests: Iterable[RemoteRequest]
+) -> list[tuple[str, str, float]]:
+    """The end-to-end latency (seconds) from the outbox POST to the first
+    receipt of the activity at each remote inbox: (activity id, inbox, latency)"""
+    latencies = {}
+    for request in requests:
+        if request.method != "post":
+            continue
+        activity_id = request_activity_id(request)
+        key = (activity_id, request.url)
+        if activity_id in sent and key not in latencies:
+            latencies[key] = request.received - sent[activity_id]
+    return [
+        (activity_id, inbox, latency)
+        for (activity_id, inbox), latency in sorted(
+            latencies.items(), key=lambda item: item[1]
+        )
+    ]
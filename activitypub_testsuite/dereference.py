@@ -0,0 +1,63 @@
+"""
+Remote dereference counting for the simulated remote server.
+
+The remote server records every request it receives. These helpers count
+the GET requests (dereferences) by the server-under-test for each URL so
+tests can check that remote actor profiles and keys are cached rather
+than refetched for every activity, and that large remote collections
+are not crawled.
+"""
+
+import time
+from collections import Counter
+from typing import Any, Iterable
+from urllib.parse import urlparse
+
+from activitypub_testsuite.interfaces import RemoteRequest
+
+
+def fetch_counts(requests: Iterable[RemoteRequest]) -> Counter[str]:
+    """The number of GET requests for each path (without the fragment)"""
+    return Counter(
+        urlparse(request.path).path for request in requests if request.method == "get"
+    )
+
+
+def actor_urls(actor: Any) -> list[str]:
+    """The profile and public key URLs of an actor"""
+    urls = [actor.id]
+    public_key = actor.profile.get("publicKey")
+    if isinstance(public_key, dict) and public_key.get("id"):
+        urls.append(public_key["id"])
+    return urls
+
+
+def actor_fetches(requests: Iterable[RemoteRequest], actor: Any) -> int:
+    """The number of GET requests for the actor profile or key. The key id
+    usually has a fragment so fetching it is a GET of the profile."""
+    counts = fetch_counts(requests)
+    paths = {urlparse(url).path for url in actor_urls(actor)}
+    return sum(counts[path] for path in paths)
+
+
+def page_fetches(requests: Iterable[RemoteRequest], collection_url: str) -> int:
+    """The number of GET requests for pages (?page=N) of a paged collection"""
+    path = urlparse(collection_url).path
+    urls = (urlparse(request.path) for request in requests if request.method == "get")
+    return sum(1 for url in urls if url.path == path and url.query)
+
+
+def wait_until_idle(httpd, settle: float = 1.0, timeout: float = 15.0) -> bool:
+    """Wait until the remote server has received no requests for the settle
+    time (the server-under-test has finished any asynchronous processing)"""
+    deadline = time.monotonic() + timeout
+    count = len(httpd.requests)
+    last_change = time.monotonic()
+    while time.monotonic() < deadline:
+        time.sleep(0.1)
+        if len(httpd.requests) != count:
+            count = len(httpd.requests)
+            last_change = time.monotonic()
+        elif time.monotonic() - last_change >= settle:
+            return True
+    return False
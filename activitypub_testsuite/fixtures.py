@@ -1,11 +1,13 @@
 import asyncio
 import glob
+import json
 import os
 import re
 import socketserver
 import subprocess
 import sys
 import tomllib
+import warnings
 from collections import ChainMap
 from dataclasses import dataclass
 from datetime import datetime, timezone
@@ -18,12 +20,36 @@ import dictlib
 import pytest
 from pytest_metadata.plugin import metadata_key
 
-from activitypub_testsuite import tests
+from activitypub_testsuite import resources, tests
+from activitypub_testsuite.delivery import (
+    DeliveryTracker,
+    FanoutConfig,
+    RemoteFollowers,
+    UndoLog,
+    clear_outbox_posts,
+    delivery_latencies,
+    outbox_posts,
+)
 from activitypub_testsuite.http.client import httpx_get
+from activitypub_testsuite.http.concurrency import DEFAULT_HOST
 from activitypub_testsuite.http.server import HTTPServer
+from activitypub_testsuite.load import LoadConfig, LoadResult, format_summary
+from activitypub_testsuite.output import OutputBuffer
+from activitypub_testsuite.probe import (
+    load_probed_capabilities,
+    nest_capabilities,
+    probe_actor,
+    probe_cache_path,
+    probe_delivery,
+    probe_outbox,
+    probe_server_meta,
+    save_probed_capabilities,
+)
+from activitypub_testsuite.resources import ResourceSampler
+from activitypub_testsuite.retries import retry_schedules
 from activitypub_testsuite.support import find_available_tcp_port
 
-from .interfaces import Actor, RemoteCommunicator, ServerTestSupport
+from .interfaces import Actor, RemoteCommunicator, RemoteRequest, ServerTestSupport
 
 
 @pytest.fixture
@@ -162,14 +188,26 @@ _remote_http_server = None
 # in pytest_sessionfinish
 
 
+def add_remote_faults(httpd: HTTPServer, config: pytest.Config) -> None:
+    """Apply the --aptest-remote-faults profile (if any)"""
+    profile = config.getoption("aptest_remote_faults")
+    if profile:
+        httpd.faults.add_profile(profile)
+
+
 @pytest.fixture(scope="session")
-def remote_http_server(remote_base_url):
+def remote_http_server(remote_base_url, pytestconfig):
     global _remote_http_server
     url = urlparse(remote_base_url)
     print(f"test: starting http server: {remote_base_url}")
-    httpd = HTTPServer(url.hostname, url.port)
+    httpd = HTTPServer(
+        url.hostname,
+        url.port,
+        concurrent=pytestconfig.getoption("aptest_remote_concurrent"),
+    )
     socketserver.TCPServer.allow_reuse_address = True
     httpd.start()
+    add_remote_faults(httpd, pytestconfig)
     _remote_http_server = httpd
     yield httpd
     print("test: stopping http server")
@@ -178,13 +216,14 @@ def remote_http_server(remote_base_url):
 
 
 @pytest.fixture(autouse=True)
-def reset_remote_http_server():
+def reset_remote_http_server(pytestconfig):
     # The global is needed because if reset_http_server
     # depends on http_srever, it will trigger the creation
     # of the http_server fixture unnecessary for skipped tests
     # (and lead to some other race conditions.)
     if _remote_http_server:
         _remote_http_server.reset()
+        add_remote_faults(_remote_http_server, pytestconfig)
 
 
 # It can be useful to manually start the node server
@@ -206,35 +245,56 @@ class ServerSubprocessConfig:
 
 _server_error: bool = False
 
+# Seconds between resource samples of the local server (0 disables sampling)
+RESOURCE_SAMPLE_INTERVAL = float(
+    os.environ.get("APTEST_RESOURCE_SAMPLE_INTERVAL", "0.25")
+)
+
+_resource_sampler: ResourceSampler | None = None
+
+
+# Server output is kept in a bounded buffer (not written to stdout)
+SERVER_OUTPUT_BUFFER_LINES = int(
+    os.environ.get("APTEST_SERVER_OUTPUT_BUFFER_LINES", "10000")
+)
+
+# Maximum number of server output lines recorded for a test
+SERVER_OUTPUT_TEST_LINES = int(os.environ.get("APTEST_SERVER_OUTPUT_TEST_LINES", "500"))
+
+ECHO_SERVER_OUTPUT = os.environ.get("APTEST_ECHO_SERVER_OUTPUT") in [
+    "True",
+    "true",
+    "1",
+]
+
+_server_output: OutputBuffer | None = None
+
 
 def monitor_server_output(
     server: subprocess.Popen,
     start_event: Event,
     config: ServerSubprocessConfig,
+    output: OutputBuffer,
 ):
-    def readline():
-        global _server_error
-        line = server.stdout.readline().decode()
-        if config.error_matcher and config.error_matcher(line):
-            _server_error = True
-            raise Exception(f"local server error detected: {line}")
-        return line
-
-    line = readline()
-    sys.stdout.write(f"local server: {line}")
-    try:
-        if config.start_matcher:
-            while not config.start_matcher(line):
-                line = readline()
-                sys.stdout.write(f"local server (pending match): {line}")
+    global _server_error
+    started = config.start_matcher is None
+    if started:
         start_event.set()
-        while line:
-            line = readline()
-            sys.stdout.write(f"local server: {line}")
+    try:
+        for lines in output.read_from(server.stdout):
+            for line in lines:
+                if not started and config.start_matcher(line):
+                    started = True
+                    start_event.set()
+                if config.error_matcher and config.error_matcher(line):
+                    if not _server_error:
+                        print(f"test: local server error detected: {line}")
+                    _server_error = True
     except:  # noqa
         print(f"test: server error: {sys.exc_info()}")
     finally:
-        print("test: server monitoring thread exit")
+        # Don't wait for the start timeout if the server exited
+        start_event.set()
 
 
 @pytest.fixture(scope="session", autouse=True)
@@ -242,7 +302,11 @@ def local_server_subprocess(request) -> subprocess.Popen[str]:
     if AUTO_START_LOCAL_SERVER:
         # If there is a server config, then start the server
         try:
+            global _server_output
             server_config = request.getfixturevalue("server_subprocess_config")
+            _server_output = OutputBuffer(
+                SERVER_OUTPUT_BUFFER_LINES, echo=ECHO_SERVER_OUTPUT
+            )
             with subprocess.Popen(
                 server_config.args,
                 stdout=subprocess.PIPE,
@@ -252,12 +316,14 @@ def local_server_subprocess(request) -> subprocess.Popen[str]:
                 start_event = Event()
                 server_output_thread = Thread(
                     target=monitor_server_output,
-                    args=[server, start_event, server_config],
+                    args=[server, start_event, server_config, _server_output],
                 )
                 server_output_thread.start()
                 start_event.wait(10)
                 print("test: server subprocess started")
+                start_resource_sampler(server.pid)
                 yield server
+                stop_resource_sampler()
                 server.kill()
                 server_output_thread.join(10)
                 print("test: server subprocess  stopped")
@@ -268,6 +334,179 @@ def local_server_subprocess(request) -> subprocess.Popen[str]:
         yield
 
 
+def start_resource_sampler(pid: int):
+    global _resource_sampler
+    if RESOURCE_SAMPLE_INTERVAL > 0 and resources.is_supported():
+        _resource_sampler = ResourceSampler(pid, RESOURCE_SAMPLE_INTERVAL).start()
+
+
+def stop_resource_sampler():
+    global _resource_sampler
+    if _resource_sampler:
+        _resource_sampler.stop()
+        _resource_sampler = None
+
+
+@pytest.fixture(autouse=True)
+def sample_server_resources(json_metadata):
+    """Record the local server resource usage during the test"""
+    if _resource_sampler is None:
+        yield
+        return
+    _resource_sampler.begin()
+    yield
+    usage = _resource_sampler.end()
+    if usage:
+        json_metadata["resources"] = usage
+
+
+@pytest.fixture(autouse=True)
+def record_server_output(json_metadata):
+    """Record the local server output lines written during the test"""
+    if _server_output is None:
+        yield
+        return
+    position = _server_output.position()
+    yield
+    lines, dropped = _server_output.since(position, SERVER_OUTPUT_TEST_LINES)
+    if lines:
+        json_metadata["server_output"] = [[round(t, 3), line] for t, line in lines]
+    if dropped:
+        json_metadata["server_output_dropped"] = dropped
+
+
+# Load test results of this session (by test node id)
+_load_results: dict[str, dict] = {}
+
+
+@pytest.fixture
+def load_config(request) -> LoadConfig:
+    option = request.config.getoption
+    return LoadConfig(
+        duration=option("aptest_load_duration"),
+        rate=option("aptest_load_rate"),
+        concurrency=option("aptest_load_concurrency"),
+        senders=option("aptest_load_senders"),
+        requests=option("aptest_load_requests"),
+        activity_types=[t.strip() for t in option("aptest_load_types").split(",")],
+    )
+
+
+@pytest.fixture
+def record_load_result(request, json_metadata) -> Callable[[LoadResult], None]:
+    """Record a load test result in the test report (and --aptest-load-output)"""
+
+    def _record(result: LoadResult):
+        summary = result.summary()
+        json_metadata["load"] = summary
+        output = request.config.getoption("aptest_load_output")
+        if output:
+            _load_results[request.node.nodeid] = summary
+            with open(output, "w") as fp:
+                json.dump(_load_results, fp, indent=2)
+        print("\n".join(format_summary(summary)))
+
+    return _record
+
+
+@pytest.fixture
+def load_undo_log(load_config):
+    """Records the likes and follows sent by a load test. They are undone
+    after the test so the load actors don't stay in the server's
+    collections."""
+    undo_log = UndoLog()
+    yield undo_log
+    undo_log.undo_all(load_config.concurrency)
+
+
+def remote_requests_position() -> tuple[list[RemoteRequest] | None, int]:
+    """The current remote server request log and its length"""
+    if _remote_http_server is None:
+        return None, 0
+    return _remote_http_server.requests, len(_remote_http_server.requests)
+
+
+def remote_requests_since(
+    position: tuple[list[RemoteRequest] | None, int]
+) -> list[RemoteRequest]:
+    """The remote server requests received since the position. If the
+    request log was reset (or the server was started) since then, the
+    whole log is new."""
+    if _remote_http_server is None:
+        return []
+    requests, start = position
+    current = _remote_http_server.requests
+    return current[start:] if current is requests else current
+
+
+@pytest.fixture(autouse=True)
+def record_delivery_latency(json_metadata):
+    """Record the delivery latency of the activities posted to local outboxes"""
+    clear_outbox_posts()
+    position = remote_requests_position()
+    yield
+    if _remote_http_server is None:
+        return
+    latencies = delivery_latencies(outbox_posts(), remote_requests_since(position))
+    if latencies:
+        json_metadata["delivery_latency"] = [
+            [activity_id, inbox, round(latency, 6)]
+            for activity_id, inbox, latency in latencies
+        ]
+
+
+@pytest.fixture(autouse=True)
+def record_retries(json_metadata):
+    """Record the retried deliveries to the remote server (with injected faults)"""
+    yield
+    if _remote_http_server is None:
+        return
+    schedules = retry_schedules(_remote_http_server.faults.attempts, retried_only=True)
+    if schedules:
+        json_metadata["retries"] = [schedule.to_json() for schedule in schedules]
+
+
+@pytest.fixture(autouse=True)
+def record_remote_concurrency(json_metadata):
+    """Record the in-flight requests to the concurrent simulated remote hosts
+    (see --aptest-remote-concurrent)"""
+    yield
+    if _remote_http_server is None:
+        return
+    summary = {
+        host: usage
+        for host, usage in _remote_http_server.concurrency.summary().items()
+        if _remote_http_server.is_concurrent(None if host == DEFAULT_HOST else host)
+    }
+    if summary:
+        json_metadata["remote_concurrency"] = summary
+
+
+@pytest.fixture
+def fanout_config(request) -> FanoutConfig:
+    option = request.config.getoption
+    return FanoutConfig(
+        followers=option("aptest_fanout_followers"),
+        hosts=option("aptest_fanout_hosts"),
+        timeout=option("aptest_fanout_timeout"),
+    )
+
+
+@pytest.fixture
+def remote_followers(local_actor):
+    """Adds remote followers to the local actor. The follows are undone
+    after the test."""
+    followers = RemoteFollowers(local_actor)
+    yield followers
+    followers.remove_all()
+
+
+@pytest.fixture
+def delivery_tracker(remote_http_server) -> DeliveryTracker:
+    """Records the POST requests received by the remote server during the test"""
+    return DeliveryTracker().attach(remote_http_server)
+
+
 @pytest.fixture(autouse=True)
 def check_server_state(test_config):
     global _server_error
@@ -298,18 +537,24 @@ def install_fedi_tests(test_dir: str):
         os.chdir(cwd)
 
 
-@pytest.fixture(scope="session")
-def testsuite_config(server_test_directory):
-    config_path = os.path.join(server_test_directory, "config.toml")
-    if os.path.exists(config_path):
-        with open(config_path, "rb") as fp:
-            return tomllib.load(fp)
-    return {}
+CONFIG_FILENAME = "config.toml"
 
+_testsuite_configs: dict[str, dict] = {}
 
-@pytest.fixture
-def test_config(request, testsuite_config) -> Mapping:
-    test_name = request.node.name
+
+def load_testsuite_config(directory: str) -> dict:
+    """Load (once) the config.toml in the specified directory"""
+    config_path = os.path.abspath(os.path.join(directory, CONFIG_FILENAME))
+    if config_path not in _testsuite_configs:
+        config = {}
+        if os.path.exists(config_path):
+            with open(config_path, "rb") as fp:
+                config = tomllib.load(fp)
+        _testsuite_configs[config_path] = config
+    return _testsuite_configs[config_path]
+
+
+def get_test_config(testsuite_config: Mapping, test_name: str) -> Mapping:
     if "[" not in test_name:
         return testsuite_config.get(test_name) or {}
     else:
@@ -323,17 +568,16 @@ def test_config(request, testsuite_config) -> Mapping:
         return ChainMap(*configs)
 
 
-@pytest.fixture(autouse=True)
-def conditionally_skip_test(request: pytest.FixtureRequest, test_config: Mapping):
-    if test_config:
-        # Resolve chained maps
-        request.node.stash["config"] = dict(test_config)
-    skip = test_config.get("skip")
-    if skip:
-        pytest.skip(skip if isinstance(skip, str) else "(configured)")
-    xfail = test_config.get("xfail")  # expected failure
-    if xfail:
-        pytest.xfail(xfail if isinstance(xfail, str) else "(configured)")
+@pytest.fixture(scope="session")
+def testsuite_config(server_test_directory):
+    testsuite_config = load_testsuite_config(config_directory(server_test_directory))
+    check_collection_configs(testsuite_config)
+    return testsuite_config
+
+
+@pytest.fixture
+def test_config(request, testsuite_config) -> Mapping:
+    return get_test_config(testsuite_config, request.node.name)
 
 
 def dig(data: dict, key: str, default_value: Any = None):
@@ -346,7 +590,287 @@ def dig(data: dict, key: str, default_value: Any = None):
 def is_env_set(key: str, default_value: Any = None):
     if key not in os.environ:
         return default_value
-    return str().lower(os.environ.get(key)) in ["true", "1"]
+    return os.environ.get(key).lower() in ["true", "1"]
+
+
+class ServerCapabilities:
+    """Lookup table for the server.capabilities configuration.
+
+    Capability identifiers are resolved once (including the fallback
+    to parent levels and their defaults) and then cached. Probed
+    capabilities, if any, are used when the configuration doesn't
+    specify the capability."""
+
+    def __init__(self, capabilities: dict | None, probed: dict | None = None):
+        self.capabilities = capabilities or {}
+        self.probed = nest_capabilities(probed) if probed else {}
+        self._resolved: dict[str, Any] = {}
+
+    def __bool__(self):
+        return bool(self.capabilities or self.probed)
+
+    def resolve(self, capability_id: str) -> Any:
+        if capability_id not in self._resolved:
+            capability = self._resolve(self.capabilities, capability_id)
+            if capability is None:
+                capability = self._resolve(self.probed, capability_id)
+            self._resolved[capability_id] = capability
+        return self._resolved[capability_id]
+
+    @staticmethod
+    def _resolve(capabilities: dict, capability_id: str) -> Any:
+        capability = None
+        while capability is None:
+            capability = dig(capabilities, capability_id)
+            if capability is None or isinstance(capability, dict):
+                capability = dig(capabilities, f"{capability_id}.default")
+            if capability is None:
+                if "." in capability_id:
+                    capability_id = capability_id[: capability_id.rfind(".")]
+                    continue
+                else:
+                    break
+        return capability
+
+
+_server_capabilities: dict[int, ServerCapabilities] = {}
+
+# Capabilities from the optional server probe (cached or probed during the run)
+_probed_capabilities: dict[str, bool] | None = None
+
+PROBE_CAPABILITIES = is_env_set("APTEST_PROBE_CAPABILITIES", False)
+
+
+def get_server_capabilities(testsuite_config: dict) -> ServerCapabilities:
+    key = id(testsuite_config)
+    if key not in _server_capabilities:
+        _server_capabilities[key] = ServerCapabilities(
+            dig(testsuite_config, "server.capabilities"), _probed_capabilities
+        )
+    return _server_capabilities[key]
+
+
+def set_probed_capabilities(capabilities: dict[str, bool] | None) -> None:
+    global _probed_capabilities
+    _probed_capabilities = capabilities
+    _server_capabilities.clear()
+
+
+def get_server_name_and_version(
+    config: pytest.Config, testsuite_config: dict
+) -> tuple[str, str | None]:
+    server_name = dig(testsuite_config, "server.name") or os.path.basename(
+        config.rootpath
+    )
+    server_version = dig(testsuite_config, "server.version")
+    if server_version is None:
+        try:
+            server_version = package_version(server_name)
+        except:  # noqa
+            pass
+    return server_name, server_version
+
+
+def get_probe_cache_path(config: pytest.Config, testsuite_config: dict) -> str | None:
+    server_name, server_version = get_server_name_and_version(config, testsuite_config)
+    if server_version is None:
+        # Without a version, the cached results could be stale
+        return None
+    return probe_cache_path(str(config.rootpath), server_name, server_version)
+
+
+def _fixture_server_test_directory(item: pytest.Item) -> str | None:
+    """The value of a project's server_test_directory fixture, if it can be
+    called during collection (it has no arguments)"""
+    fixture_defs = item.session._fixturemanager.getfixturedefs(
+        "server_test_directory", item
+    )
+    if not fixture_defs:
+        return None
+    fixture_def = fixture_defs[-1]
+    if fixture_def.argnames:
+        return None
+    try:
+        return fixture_def.func()
+    except Exception:  # the default fixture raises NotImplementedError
+        return None
+
+
+def config_directory(
+    server_test_directory: str | None, module_directory: str | None = None
+) -> str:
+    """The directory of the config.toml for both collection and the
+    testsuite_config fixture. APTEST_SERVER_TEST_DIRECTORY overrides the
+    server_test_directory fixture. The module directory is only used
+    during collection, when the fixture can't be called."""
+    return str(
+        os.environ.get("APTEST_SERVER_TEST_DIRECTORY")
+        or server_test_directory
+        or module_directory
+    )
+
+
+def collection_config_directory(item: pytest.Item) -> str:
+    # The project's server_test_directory fixture is used if possible.
+    # The fedi tests are linked into the server test directory
+    # so, by default, the config is found next to the test module.
+    return config_directory(_fixture_server_test_directory(item), str(item.path.parent))
+
+
+# Configs used for the collection-time skips and budgets, by directory
+_collection_configs: dict[str, dict] = {}
+
+
+def check_collection_configs(testsuite_config: dict) -> None:
+    """Fails if the collection-time skips came from a different config"""
+    for directory, config in _collection_configs.items():
+        if config != testsuite_config:
+            raise pytest.UsageError(
+                f"The {CONFIG_FILENAME} used during collection ({directory}) "
+                "differs from the server_test_directory config. "
+                "Set APTEST_SERVER_TEST_DIRECTORY to the server test directory."
+            )
+
+
+def conditionally_skip_test(item: pytest.Item, test_config: Mapping) -> bool:
+    if test_config:
+        # Resolve chained maps
+        item.stash["config"] = dict(test_config)
+    skip = test_config.get("skip")
+    if skip:
+        reason = skip if isinstance(skip, str) else "(configured)"
+        item.add_marker(pytest.mark.skip(reason=reason))
+        return True
+    xfail = test_config.get("xfail")  # expected failure
+    if xfail:
+        reason = xfail if isinstance(xfail, str) else "(configured)"
+        item.add_marker(pytest.mark.xfail(reason=reason, run=False))
+        return True
+    return False
+
+
+def missing_server_capability(
+    item: pytest.Item, capabilities: ServerCapabilities
+) -> str | None:
+    """Returns the first required capability the server doesn't support"""
+    unknown_capabilities = item.stash.setdefault("unknown_capabilities", [])
+    for marker in item.iter_markers("ap_capability"):
+        for capability_id in marker.args:
+            capability = capabilities.resolve(capability_id)
+            if capability is None and capability_id not in unknown_capabilities:
+                # Checked later since the strictness is a fixture
+                unknown_capabilities.append(capability_id)
+            if isinstance(capability, bool) and not capability:
+                return capability_id
+    return None
+
+
+def skip_without_server_capabilities(
+    item: pytest.Item, capabilities: ServerCapabilities
+) -> bool:
+    if not capabilities:
+        return False
+    capability_id = missing_server_capability(item, capabilities)
+    if capability_id:
+        item.add_marker(
+            pytest.mark.skip(
+                reason=f"Missing required server capability: {capability_id}"
+            )
+        )
+        return True
+    return False
+
+
+def pytest_collection_modifyitems(config: pytest.Config, items: list[pytest.Item]):
+    # Skips are determined during collection so skipped tests
+    # don't create any fixtures (actors, remote server, etc.)
+    _collection_configs.clear()
+    for item in items:
+        directory = collection_config_directory(item)
+        testsuite_config = load_testsuite_config(directory)
+        _collection_configs[directory] = testsuite_config
+        if PROBE_CAPABILITIES and _probed_capabilities is None:
+            cache_path = get_probe_cache_path(config, testsuite_config)
+            if cache_path:
+                set_probed_capabilities(load_probed_capabilities(cache_path))
+        test_config = get_test_config(testsuite_config, item.name)
+        if not conditionally_skip_test(item, test_config):
+            skip_without_server_capabilities(
+                item, get_server_capabilities(testsuite_config)
+            )
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_runtest_setup(item: pytest.Item):
+    # Capabilities probed during this run are applied
+    # before any fixtures are created.
+    if _capabilities_probed_during_run:
+        testsuite_config = load_testsuite_config(collection_config_directory(item))
+        capability_id = missing_server_capability(
+            item, get_server_capabilities(testsuite_config)
+        )
+        if capability_id:
+            pytest.skip(reason=f"Missing required server capability: {capability_id}")
+
+
+@pytest.fixture  # can be overridden in project-specific config
+def capability_probe_actors(server_support) -> tuple[Actor, Actor]:
+    """The local and remote actors used by the capability probe."""
+    return (
+        server_support.get_local_actor("probe_actor"),
+        server_support.get_remote_actor("probe_remote_actor"),
+    )
+
+
+_capabilities_probed_during_run: bool = False
+
+
+@pytest.fixture(autouse=True)
+def probe_server_capabilities(request: pytest.FixtureRequest, testsuite_config):
+    global _capabilities_probed_during_run
+    if not PROBE_CAPABILITIES or _probed_capabilities is not None:
+        # Disabled, already probed or loaded from the cache during collection
+        return
+    local_base_url = request.getfixturevalue("local_base_url")
+    local_actor, remote_actor = request.getfixturevalue("capability_probe_actors")
+
+    def get(url: str):
+        return httpx_get(url, media_type="*/*")
+
+    capabilities: dict[str, bool] = {}
+    try:
+        capabilities.update(probe_server_meta(local_base_url, get, local_actor))
+        capabilities.update(probe_actor(local_actor))
+        # Delivery is probed before the outbox probe follows and blocks
+        # the remote actor
+        capabilities.update(
+            probe_delivery(
+                local_actor,
+                remote_actor,
+                request.getfixturevalue("remote_communicator"),
+            )
+        )
+        capabilities.update(probe_outbox(local_actor, remote_actor))
+        probe_error = None
+    except Exception as e:
+        # The partial results are used (but not cached) so the server
+        # is only probed once per session.
+        probe_error = e
+        warnings.warn(f"Server capability probe failed: {e!r}")
+    if _remote_http_server:
+        _remote_http_server.reset()
+    print(f"test: probed capabilities: {capabilities}")
+    set_probed_capabilities(capabilities)
+    _capabilities_probed_during_run = True
+    cache_path = get_probe_cache_path(request.config, testsuite_config)
+    if cache_path and probe_error is None:
+        save_probed_capabilities(cache_path, capabilities)
+    # The current test has already passed the setup skip check
+    capability_id = missing_server_capability(
+        request.node, get_server_capabilities(testsuite_config)
+    )
+    if capability_id:
+        pytest.skip(reason=f"Missing required server capability: {capability_id}")
 
 
 @pytest.fixture  # can be overridden in project-specific config
@@ -355,33 +879,14 @@ def fail_on_unknown_capability() -> bool:
 
 
 @pytest.fixture(autouse=True)
-def skip_without_server_capabilities(
-    testsuite_config,
+def check_unknown_server_capabilities(
     request: pytest.FixtureRequest,
     fail_on_unknown_capability: bool,
 ):
-    capabilities = dig(testsuite_config, "server.capabilities")
-    if capabilities:
-        for marker in request.node.iter_markers("ap_capability"):
-            for capability_id in marker.args:
-                capability = None
-                while capability is None:
-                    capability = dig(capabilities, capability_id)
-                    if capability is None or isinstance(capability, dict):
-                        capability = dig(capabilities, f"{capability_id}.default")
-                    if capability is None:
-                        if "." in capability_id:
-                            capability_id = capability_id[: capability_id.rfind(".")]
-                            continue
-                        else:
-                            break
-                if capability is None and fail_on_unknown_capability:
-                    # Otherwise, assume capabilities not mentioned in config
-                    pytest.fail(f"Server capability not specified: {marker.args[0]}")
-                if isinstance(capability, bool) and not capability:
-                    pytest.skip(
-                        reason=f"Missing required server capability: {marker.args[0]}"
-                    )
+    unknown_capabilities = request.node.stash.get("unknown_capabilities", None)
+    if unknown_capabilities and fail_on_unknown_capability:
+        # Otherwise, assume capabilities not mentioned in config
+        pytest.fail(f"Server capability not specified: {unknown_capabilities[0]}")
 
 
 #
@@ -436,7 +941,9 @@ def pytest_json_runtest_stage(report: pytest.TestReport):
         if not hasattr(report, "wasxfail"):
             metadata["reason"] = report.longrepr[2].replace("Skipped: ", "")
         else:
-            metadata["reason"] = report.wasxfail.replace("reason: ", "")
+            metadata["reason"] = report.wasxfail.replace("reason: ", "").replace(
+                "[NOTRUN] ", ""
+            )
 
 
 @pytest.hookimpl(optionalhook=True)
@@ -0,0 +1,157 @@
+"""
+Local history of test durations.
+
+The durations are ingested from the JSON reports produced by pytest
+and stored in a SQLite database in the test project's .aptest directory.
+The history is used for test scheduling and run time estimation.
+"""
+
+import heapq
+import json
+import os
+import sqlite3
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Iterable
+
+from activitypub_testsuite.report.filters import test_duration
+from activitypub_testsuite.report.jsonl import load_jsonl_report
+from activitypub_testsuite.support import APTEST_DIRECTORY
+
+HISTORY_FILENAME = "history.sqlite"
+
+# Number of recent runs used to estimate a test duration
+HISTORY_WINDOW = 5
+
+# Skipped tests are not representative of the test duration
+RECORDED_OUTCOMES = ["passed", "failed", "xfailed", "xpassed", "error", "overbudget"]
+
+
+def history_path(root_dir: str) -> str:
+    return os.path.join(root_dir, APTEST_DIRECTORY, HISTORY_FILENAME)
+
+
+class DurationHistory:
+    def __init__(self, path: str):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS durations (
+                nodeid TEXT NOT NULL,
+                duration REAL NOT NULL,
+                outcome TEXT NOT NULL,
+                recorded TEXT NOT NULL
+            )
+            """
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS durations_nodeid ON durations (nodeid)"
+        )
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def ingest(self, json_report: dict[str, Any]) -> int:
+        """Add the test durations from a JSON report. Returns the number of tests."""
+        created = json_report.get("created")
+        recorded = (
+            datetime.fromtimestamp(created, timezone.utc)
+            if created
+            else datetime.now(timezone.utc)
+        ).isoformat()
+        rows = [
+            (test["nodeid"], test_duration(test), test["outcome"], recorded)
+            for test in json_report.get("tests", [])
+            if test["outcome"] in RECORDED_OUTCOMES
+        ]
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO durations VALUES (?, ?, ?, ?)", rows
+            )
+        return len(rows)
+
+    def ingest_file(self, filename: str) -> int:
+        if filename.endswith(".jsonl"):
+            return self.ingest(load_jsonl_report(filename))
+        with open(filename) as fp:
+            return self.ingest(json.load(fp))
+
+    def durations(self, window: int = HISTORY_WINDOW) -> dict[str, float]:
+        """The mean of the most recent durations for each test"""
+        cursor = self.connection.execute(
+            """
+            SELECT nodeid, AVG(duration) FROM (
+                SELECT nodeid, duration, ROW_NUMBER() OVER (
+                    PARTITION BY nodeid ORDER BY recorded DESC, rowid DESC
+                ) AS n
+                FROM durations
+            )
+            WHERE n <= ?
+            GROUP BY nodeid
+            """,
+            (window,),
+        )
+        return dict(cursor.fetchall())
+
+
+def load_durations(root_dir: str) -> dict[str, float]:
+    path = history_path(root_dir)
+    if not os.path.exists(path):
+        return {}
+    with DurationHistory(path) as history:
+        return history.durations()
+
+
+def default_duration(durations: dict[str, float]) -> float:
+    """Duration used for tests without history (the mean duration)"""
+    return sum(durations.values()) / len(durations) if durations else 0
+
+
+def longest_first(nodeids: Iterable[str], durations: dict[str, float]) -> list[str]:
+    """Sort test node ids by historical duration, longest first.
+
+    Ties are ordered by node id so the order is deterministic
+    (required for xdist workers to agree on the collection)."""
+    default = default_duration(durations)
+    return sorted(nodeids, key=lambda nodeid: (-durations.get(nodeid, default), nodeid))
+
+
+def estimate_duration(
+    nodeids: Iterable[str], durations: dict[str, float], workers: int = 1
+) -> float:
+    """Estimate the run time when the tests are distributed to the workers
+    in longest-first order (each test goes to the first available worker)."""
+    default = default_duration(durations)
+    loads = [0.0] * max(workers, 1)
+    for nodeid in longest_first(nodeids, durations):
+        heapq.heapreplace(loads, loads[0] + durations.get(nodeid, default))
+    return max(loads)
+
+
+def shard_assignments(
+    nodeids: Iterable[str], durations: dict[str, float], shard_count: int
+) -> dict[str, int]:
+    """Assign tests to shards (0-based).
+
+    With duration history, the tests are assigned longest-first to the
+    least loaded shard. Without history, a stable hash of the node id is used.
+    The assignment is deterministic so every shard computes the same partition.
+    """
+    if not durations:
+        return {nodeid: zlib.crc32(nodeid.encode()) % shard_count for nodeid in nodeids}
+    default = default_duration(durations)
+    loads = [(0.0, shard) for shard in range(shard_count)]
+    assignments = {}
+    for nodeid in longest_first(nodeids, durations):
+        load, shard = heapq.heappop(loads)
+        assignments[nodeid] = shard
+        heapq.heappush(loads, (load + durations.get(nodeid, default), shard))
+    return assignments
@@ -4,11 +4,13 @@ server-under-test as a client.
 """
 
 import os
+import time
 import uuid
 from functools import lru_cache
 from http.server import HTTPServer
 from threading import Condition
 from typing import Any, Callable
+from urllib.parse import urlparse
 
 import httpx
 
@@ -19,6 +21,8 @@ from activitypub_testsuite.ap import (
     get_id,
     get_types,
 )
+from activitypub_testsuite.delivery import record_outbox_post
+from activitypub_testsuite.http.server import PagedCollection
 from activitypub_testsuite.http.signatures import HTTPSignatureAuth, get_key_pair
 from activitypub_testsuite.interfaces import (
     DEFAULT_AP_MEDIA_TYPE,
@@ -30,6 +34,7 @@ from activitypub_testsuite.interfaces import (
     ServerTestSupport,
 )
 from activitypub_testsuite.support import BaseActor
+from activitypub_testsuite.tracing import span, traced
 
 
 class HttpxServerTestSupport(ServerTestSupport):
@@ -61,8 +66,22 @@ class HttpxServerTestSupport(ServerTestSupport):
         return self._httpd
 
     @lru_cache
-    def get_remote_actor(self, actor_name: str = "remote_actor") -> Actor:
-        return HttpxRemoteActor(self, actor_name)
+    def get_remote_actor(
+        self,
+        actor_name: str = "remote_actor",
+        host: str | None = None,
+        shared_inbox: bool = False,
+    ) -> Actor:
+        base_url = self.get_remote_host(host) if host else None
+        return HttpxRemoteActor(
+            self, actor_name, base_url=base_url, shared_inbox=shared_inbox
+        )
+
+    def get_remote_host(self, host: str) -> str:
+        """The base URL of a simulated remote host (a remote server virtual host)"""
+        port = self.httpd.get_virtual_host(host)
+        url = urlparse(self.remote_base_url)
+        return f"{url.scheme}://{url.hostname}:{port}"
 
     @lru_cache
     def get_unauthenticated_actor(
@@ -78,6 +97,7 @@ class HttpxRemoteCommunicator(RemoteCommunicator):
     def __init__(self, server: HttpxServerTestSupport) -> None:
         self.server = server
 
+    @traced("remote.wait_for_post")
     def _wait_for_post(self):
         httpd = self.server.httpd
         # TODO (C) @cleanup improve the post wait function
@@ -120,7 +140,13 @@ def httpx_get(
 ) -> httpx.Response:
     """Get an object and return the web response. Handles authentication."""
     headers = {"Accept": media_type}
-    return httpx.get(url, timeout=None, headers=headers, verify=False, auth=auth)
+    with span("http.get", url=url) as current:
+        response = httpx.get(
+            url, timeout=None, headers=headers, verify=False, auth=auth
+        )
+        if current:
+            current.attributes["status_code"] = response.status_code
+        return response
 
 
 def httpx_get_json(url: str, auth: Any = None, media_type: str = DEFAULT_AP_MEDIA_TYPE):
@@ -152,14 +178,25 @@ class HttpxBaseActor(BaseActor):
         headers = {
             "Content-Type": media_type or self.server.default_media_type,
         }
-        response = httpx.post(
-            url,
-            json=data,
-            headers=headers,
-            timeout=None,
-            auth=self.auth,
-            verify=False,
-        )
+        sent = time.monotonic()
+        with span("http.post", url=url) as current:
+            response = httpx.post(
+                url,
+                json=data,
+                headers=headers,
+                timeout=None,
+                auth=self.auth,
+                verify=False,
+            )
+            if current:
+                current.attributes["status_code"] = response.status_code
+        if (
+            url == self.outbox
+            and response.is_success
+            and "Location" in response.headers
+        ):
+            # For the delivery latency of the posted activity
+            record_outbox_post(response.headers["Location"], sent)
         if response.is_error and exception:
             raise HttpRequestError(
                 f"POST error: {response.status_code} "
@@ -168,6 +205,7 @@ class HttpxBaseActor(BaseActor):
             )
         return response
 
+    @traced("actor.setup_object")
     def setup_object(
         # TODO (C) Revisit whether the setup methods need with_id in the signature
         self,
@@ -182,6 +220,7 @@ class HttpxBaseActor(BaseActor):
             return self.get_json(activity_object)
         return activity_object
 
+    @traced("actor.setup_activity")
     def setup_activity(
         self, properties: dict[str, Any] | None = None, with_id: bool = False
     ) -> dict:
@@ -199,6 +238,7 @@ class HttpxBaseActor(BaseActor):
         stored_activity = self.get_json(response.headers["Location"])
         return stored_activity
 
+    @traced("actor.setup_collection")
     def setup_collection(
         self,
         properties: dict | None = None,
@@ -220,6 +260,7 @@ class HttpxLocalActor(HttpxBaseActor):
         profile = self.get_profile(server, actor_name)
         super().__init__(server, profile, auth=auth)
 
+    @traced("actor.get_profile")
     def get_profile(self, server, actor_name) -> dict:
         """Get the actor profile. Create the actor, if needed."""
         actor_uri = self.get_actor_uri(server, actor_name)
@@ -246,14 +287,21 @@ class HttpxRemoteActor(HttpxBaseActor):
         self,
         server: HttpxServerTestSupport,
         actor_name: str,
-        authenticated: bool = True
-        # Local endpoint for serving remote actor requests (host, port)
+        authenticated: bool = True,
+        # Base URL of a simulated remote host (default: the remote server)
+        base_url: str | None = None,
+        # Advertise the host's shared inbox (endpoints.sharedInbox)
+        shared_inbox: bool = False,
     ):
-        self.actor_base_url = server.remote_base_url
-        self.actor_id = f"{server.remote_base_url}/{actor_name}"
+        self.actor_base_url = base_url or server.remote_base_url
+        self.actor_id = f"{self.actor_base_url}/{actor_name}"
+        self.shared_inbox = f"{self.actor_base_url}/inbox" if shared_inbox else None
         key_id = f"{self.actor_id}#main-key"
-        self.public_key, self.private_key = get_key_pair()
-        auth = HTTPSignatureAuth(key_id, self.private_key) if authenticated else None
+        with span("remote.actor_keys", actor=actor_name):
+            self.public_key, self.private_key = get_key_pair()
+            auth = (
+                HTTPSignatureAuth(key_id, self.private_key) if authenticated else None
+            )
         super().__init__(server, self.get_profile(key_id, actor_name), auth)
         self.httpd = server.httpd
         self.httpd.serve_objects(
@@ -270,13 +318,28 @@ class HttpxRemoteActor(HttpxBaseActor):
             "totalItems": 0,
         }
 
+    def setup_paged_collection(
+        self, name: str, total_items: int, page_size: int = 50
+    ) -> PagedCollection:
+        """Serve a large paged collection (for example, followers) as an actor
+        property. The pages are generated on demand."""
+        collection = PagedCollection(
+            f"{self.actor_id}/{name}",
+            total_items,
+            page_size,
+            item=lambda index: f"{self.actor_base_url}/{name}_item_{index}",
+        )
+        self.httpd.serve_generator(collection.id, collection)
+        self.profile[name] = collection.id
+        return collection
+
     def make_uri(self, for_object: dict[str, Any] | None = None) -> str:
         """Make a IRI with an optional namespace scope"""
         type_ns = "_".join(get_types(for_object)).lower()
         return f"{self.actor_base_url}/{type_ns}/{uuid.uuid4()}"
 
     def get_profile(self, key_id: str, actor_name: str):
-        return {
+        profile = {
             "@context": [AS2_CONTEXT, SECURITY_CONTEXT],
             "id": self.actor_id,
             "type": "Person",
@@ -290,6 +353,9 @@ class HttpxRemoteActor(HttpxBaseActor):
                 "publicKeyPem": self.public_key,
             },
         }
+        if self.shared_inbox:
+            profile["endpoints"] = {"sharedInbox": self.shared_inbox}
+        return profile
 
     def expect_request(self):
         self._request_received = Condition()
@@ -300,10 +366,12 @@ class HttpxRemoteActor(HttpxBaseActor):
 
         self.httpd.listeners.append(request_monitor)
 
+    @traced("remote.wait_for_request")
     def wait_for_request(self):
         with self._request_received:
             self._request_received.wait(15)
 
+    @traced("remote.setup_object")
     def setup_object(
         self, properties: dict[str, Any] | None = None, with_id: bool = True
     ) -> dict | str:
@@ -315,6 +383,7 @@ class HttpxRemoteActor(HttpxBaseActor):
     def delete_object(self, uri: str):
         self.httpd.serve_objects({"id": uri, "type": "Tombstone"})
 
+    @traced("remote.setup_activity")
     def setup_activity(
         self, properties: dict[str, Any] | None = None, with_id: bool = True
     ) -> dict:
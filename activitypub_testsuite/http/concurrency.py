@@ -0,0 +1,66 @@
+"""
+In-flight request tracking for the simulated remote server.
+
+The number of open connections from the server-under-test to each simulated
+host is tracked over time. The simulated server closes the connection after
+each response, so this is also the number of in-flight requests. The
+remote server (or a simulated host) must be concurrent (threaded) to
+observe more than one.
+"""
+
+import threading
+import time
+from typing import Any
+
+# Name of the main remote host in the concurrency summary
+DEFAULT_HOST = "remote"
+
+
+class ConcurrencyTracker:
+    def __init__(self):
+        self.start = time.monotonic()
+        self.in_flight: dict[str, int] = {}
+        self.peaks: dict[str, int] = {}
+        # Host -> [[seconds since the start, in-flight requests], ...]
+        self.series: dict[str, list[list[float]]] = {}
+        self._lock = threading.Lock()
+
+    def _change(self, host: str | None, delta: int) -> None:
+        host = host or DEFAULT_HOST
+        with self._lock:
+            count = self.in_flight.get(host, 0) + delta
+            self.in_flight[host] = count
+            self.peaks[host] = max(self.peaks.get(host, 0), count)
+            offset = round(time.monotonic() - self.start, 6)
+            self.series.setdefault(host, []).append([offset, count])
+
+    def begin(self, host: str | None) -> None:
+        self._change(host, 1)
+
+    def end(self, host: str | None) -> None:
+        self._change(host, -1)
+
+    def peak(self, host: str | None = None) -> int:
+        return self.peaks.get(host or DEFAULT_HOST, 0)
+
+    def summary(self, max_points: int = 500) -> dict[str, dict[str, Any]]:
+        """The peak and the time series of in-flight requests for each host.
+        Long series are reduced to the highest point of each interval."""
+        with self._lock:
+            return {
+                host: {
+                    "peak": self.peaks[host],
+                    "series": reduce_series(series, max_points),
+                }
+                for host, series in self.series.items()
+            }
+
+
+def reduce_series(series: list[list[float]], max_points: int) -> list[list[float]]:
+    if len(series) <= max_points:
+        return list(series)
+    size = -(-len(series) // max_points)  # ceiling
+    return [
+        max(series[start : start + size], key=lambda point: point[1])
+        for start in range(0, len(series), size)
+    ]
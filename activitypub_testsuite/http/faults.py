@@ -0,0 +1,129 @@
+"""
+Fault and latency injection for the simulated remote server.
+
+Rules match requests by simulated host, method and path. A matching rule
+can delay the response, trickle the response body, respond with an error
+status (for example, 429 with Retry-After or 503) or reset the connection.
+A rule can be limited to the first K attempts for each URL so a delivery
+fails and then succeeds when retried. Every request attempt is logged with
+its timing and outcome.
+"""
+
+import random
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any
+
+
+@dataclass
+class FaultRule:
+    # Regular expression searched for in the request path (None: any path)
+    path: str | None = None
+    # Simulated host name (see HTTPServer.get_virtual_host). None: any host.
+    host: str | None = None
+    # "GET" or "POST" (None: any method)
+    method: str | None = None
+    # Seconds before responding: fixed or a random (min, max) range
+    delay: float | tuple[float, float] = 0.0
+    # Seconds between the chunks of the response body
+    trickle: float = 0.0
+    # Error status code to respond with instead of handling the request
+    status: int | None = None
+    # Retry-After header value (seconds) for the error response
+    retry_after: int | None = None
+    # Close the connection without a response
+    reset: bool = False
+    # Only apply the rule to the first K attempts for each URL
+    first: int | None = None
+    # Attempts matched by the rule for each (host, path)
+    matched: Counter = field(default_factory=Counter, init=False, repr=False)
+
+    def matches(self, host: str | None, method: str, path: str) -> bool:
+        return (
+            (self.host is None or self.host == host)
+            and (self.method is None or self.method == method)
+            and (self.path is None or re.search(self.path, path) is not None)
+        )
+
+    def delay_seconds(self) -> float:
+        if isinstance(self.delay, (tuple, list)):
+            return random.uniform(*self.delay)
+        return self.delay
+
+    def describe(self) -> str:
+        if self.reset:
+            return "reset"
+        if self.status is not None:
+            return f"status {self.status}"
+        return "delay" if self.delay else "trickle"
+
+
+@dataclass
+class Attempt:
+    method: str
+    host: str | None
+    path: str
+    started: float  # time.monotonic()
+    finished: float | None = None
+    status: int | None = None  # None if the connection was reset
+    fault: str | None = None  # the applied rule (describe())
+    json: Any = None  # POST body
+    retry_after: int | None = None  # Retry-After response header
+
+    @property
+    def duration(self) -> float | None:
+        return self.finished - self.started if self.finished is not None else None
+
+
+# Named rule sets for --aptest-remote-faults
+FAULT_PROFILES: dict[str, list[dict[str, Any]]] = {
+    # Remote hosts that take 0.5-2 seconds to accept a delivery
+    "slow": [{"method": "POST", "delay": (0.5, 2.0)}],
+    # Remote documents are sent a few bytes at a time
+    "trickle": [{"method": "GET", "trickle": 0.05}],
+    # The first delivery to each inbox is rate limited
+    "rate-limited": [{"method": "POST", "status": 429, "retry_after": 2, "first": 1}],
+    # The first two deliveries to each inbox fail
+    "flaky": [{"method": "POST", "status": 503, "first": 2}],
+    # Deliveries are never accepted
+    "down": [{"method": "POST", "reset": True}],
+}
+
+
+class FaultInjector:
+    def __init__(self):
+        self.rules: list[FaultRule] = []
+        self.attempts: list[Attempt] = []
+        self._lock = threading.Lock()
+
+    def add(self, rule: FaultRule | None = None, **kwargs) -> FaultRule:
+        """Add a rule (or a rule made from the keyword arguments). The first
+        matching rule is applied to a request."""
+        rule = rule or FaultRule(**kwargs)
+        self.rules.append(rule)
+        return rule
+
+    def add_profile(self, name: str) -> None:
+        if name not in FAULT_PROFILES:
+            raise ValueError(f"Unknown fault profile: {name}")
+        for rule in FAULT_PROFILES[name]:
+            self.add(**rule)
+
+    def match(self, host: str | None, method: str, path: str) -> FaultRule | None:
+        with self._lock:
+            for rule in self.rules:
+                if not rule.matches(host, method, path):
+                    continue
+                key = (host, path)
+                if rule.first is not None and rule.matched[key] >= rule.first:
+                    continue
+                rule.matched[key] += 1
+                return rule
+        return None
+
+    def log(self, attempt: Attempt) -> Attempt:
+        with self._lock:
+            self.attempts.append(attempt)
+        return attempt
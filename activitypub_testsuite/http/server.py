@@ -6,23 +6,93 @@ mesages from the server-under-test.
 import asyncio
 import http.server
 import json
+import socket
+import socketserver
+import struct
+import time
 from asyncio import Barrier
 from threading import Condition, Thread
 from typing import Any, Callable, Tuple
-from urllib.parse import urlparse
+from urllib.parse import parse_qs, urlparse
 
+from activitypub_testsuite.http.concurrency import ConcurrencyTracker
+from activitypub_testsuite.http.faults import Attempt, FaultInjector
 from activitypub_testsuite.interfaces import RemoteRequest
 
+# Response body chunk size when a fault rule trickles the body
+TRICKLE_CHUNK_SIZE = 16
+
+
+class PagedCollection:
+    """A paged collection of any size. The pages are generated when they
+    are requested (?page=N) so the items are never stored."""
+
+    def __init__(
+        self,
+        collection_id: str,
+        total_items: int,
+        page_size: int = 50,
+        ordered: bool = True,
+        item: Callable[[int], Any] | None = None,
+    ):
+        self.id = collection_id
+        self.total_items = total_items
+        self.page_size = page_size
+        self.ordered = ordered
+        self.item = item or (lambda index: f"{collection_id}/items/{index}")
+        self.pages = max((total_items + page_size - 1) // page_size, 1)
+
+    def page_id(self, page: int) -> str:
+        return f"{self.id}?page={page}"
+
+    def __call__(self, query: dict[str, list[str]]) -> dict | None:
+        prefix = "Ordered" if self.ordered else ""
+        items_key = "orderedItems" if self.ordered else "items"
+        if "page" not in query:
+            return {
+                "id": self.id,
+                "type": f"{prefix}Collection",
+                "totalItems": self.total_items,
+                "first": self.page_id(1),
+                "last": self.page_id(self.pages),
+            }
+        try:
+            page = int(query["page"][0])
+        except ValueError:
+            return None
+        if not 1 <= page <= self.pages:
+            return None
+        start = (page - 1) * self.page_size
+        end = min(start + self.page_size, self.total_items)
+        document = {
+            "id": self.page_id(page),
+            "type": f"{prefix}CollectionPage",
+            "partOf": self.id,
+            items_key: [self.item(index) for index in range(start, end)],
+        }
+        if page > 1:
+            document["prev"] = self.page_id(page - 1)
+        if page < self.pages:
+            document["next"] = self.page_id(page + 1)
+        return document
+
 
 class HTTPServer(Thread):
     class Server(http.server.HTTPServer):
         def __init__(self, server_action: Callable, *args, **kwargs):
             super().__init__(*args, **kwargs)
             self.server_action = server_action
+            # Simulated host name (None for the main remote host)
+            self.name = None
 
         def server_actions(self):
             self.server_action()
 
+    class ThreadingServer(socketserver.ThreadingMixIn, Server):
+        """Handles each connection in a new thread"""
+
+        daemon_threads = True
+
     class RequestHandler(http.server.BaseHTTPRequestHandler):
         def __init__(
             self,
@@ -30,29 +100,95 @@ class HTTPServer(Thread):
             client_address,
             server,
             documents,
+            generators,
             requests,
             listeners,
             post_received,
+            faults,
+            concurrency,
         ):
             self._documents = documents
+            self._generators = generators
             self._requests = requests
             self._listeners = listeners
             self._post_received = post_received
+            self._faults = faults
+            self._concurrency = concurrency
+            self.fault = None
             super().__init__(request, client_address, server)
 
+        def handle(self):
+            self._concurrency.begin(self.server.name)
+            try:
+                super().handle()
+            finally:
+                self._concurrency.end(self.server.name)
+
+        def _begin_attempt(self, method: str, payload: Any = None) -> bool:
+            """Log the request attempt and apply any matching fault rule.
+            Returns False if the request was not handled (the fault response
+            was sent or the connection was reset)."""
+            self.attempt = self._faults.log(
+                Attempt(
+                    method, self.server.name, self.path, time.monotonic(), json=payload
+                )
+            )
+            self.fault = self._faults.match(self.server.name, method, self.path)
+            if self.fault is None:
+                return True
+            self.attempt.fault = self.fault.describe()
+            time.sleep(self.fault.delay_seconds())
+            if self.fault.reset:
+                # Close with a zero linger time so the client gets a reset
+                self.connection.setsockopt(
+                    socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0)
+                )
+                self.connection.close()
+                self.close_connection = True
+                self._end_attempt(None)
+                return False
+            if self.fault.status is not None:
+                self.send_response(self.fault.status)
+                if self.fault.retry_after is not None:
+                    self.send_header("Retry-After", str(self.fault.retry_after))
+                    self.attempt.retry_after = self.fault.retry_after
+                self.end_headers()
+                self._end_attempt(self.fault.status)
+                return False
+            return True
+
+        def _end_attempt(self, status: int | None):
+            self.attempt.status = status
+            self.attempt.finished = time.monotonic()
+
+        def _write_body(self, body: bytes):
+            trickle = self.fault.trickle if self.fault else 0
+            if not trickle:
+                self.wfile.write(body)
+                return
+            for start in range(0, len(body), TRICKLE_CHUNK_SIZE):
+                self.wfile.write(body[start : start + TRICKLE_CHUNK_SIZE])
+                self.wfile.flush()
+                time.sleep(trickle)
+
         def do_GET(self):
+            if not self._begin_attempt("GET"):
+                return
             netloc = ":".join(map(str, self.server.server_address))
-            self._requests.append(
-                RemoteRequest(
-                    method="get",
-                    url=f"http://{netloc}{self.path}",
-                    path=self.path,
-                    json=None,
-                    headers=self.headers,
-                    kwargs={},
-                )
+            self.remote_request = RemoteRequest(
+                method="get",
+                url=f"http://{netloc}{self.path}",
+                path=self.path,
+                json=None,
+                headers=self.headers,
+                kwargs={},
             )
+            self._requests.append(self.remote_request)
             obj = self._documents.get(self.path)
+            if obj is None:
+                url = urlparse(self.path)
+                generator = self._generators.get(url.path)
+                obj = generator(parse_qs(url.query)) if generator else None
             if obj:
                 status_code = 200
                 if "type" in obj and obj["type"] == "Tombstone":
@@ -61,53 +197,74 @@ class HTTPServer(Thread):
                 self.send_header("Content-type", "application/activity+json")
                 self.end_headers()
                 # print(json.dumps(obj, indent=2))
-                self.wfile.write(json.dumps(obj).encode())
+                self._write_body(json.dumps(obj).encode())
             else:
+                status_code = 404
                 self.send_response(404)
                 self.end_headers()
                 self.wfile.write(b"")
+            self._end_attempt(status_code)
             for listener in self._listeners:
                 listener("GET", self)
 
         def do_POST(self):
-            self.send_response(200)
-            self.send_header("Content-type", "text/html")
-            self.end_headers()
             content_length = int(self.headers["Content-Length"])
             post_data = self.rfile.read(content_length).decode("utf-8")
             post_payload = json.loads(post_data.encode())
+            # Received before any injected delay (for delivery latency)
+            received = time.monotonic()
+            if not self._begin_attempt("POST", post_payload):
+                return
+            self.send_response(200)
+            self.send_header("Content-type", "text/html")
+            self.end_headers()
             netloc = ":".join(map(str, self.server.server_address))
-            self._requests.append(
-                RemoteRequest(
-                    method="post",
-                    url=f"http://{netloc}{self.path}",
-                    path=self.path,
-                    json=post_payload,
-                    headers=self.headers,
-                    kwargs={},
-                )
+            self.remote_request = RemoteRequest(
+                method="post",
+                url=f"http://{netloc}{self.path}",
+                path=self.path,
+                json=post_payload,
+                headers=self.headers,
+                kwargs={},
+                received=received,
             )
-            self.wfile.write('"OK"'.encode())
+            self._requests.append(self.remote_request)
+            self._write_body('"OK"'.encode())
+            self._end_attempt(200)
             for listener in self._listeners:
                 listener("POST", self)
             with self._post_received:
                 self._post_received.notify_all()
 
-    def __init__(self, host, port):
+    def __init__(self, host, port, concurrent: bool = False):
         Thread.__init__(self)
         self.server_address = (host, port)
         self.httpd = None
         self.httpd_running = Barrier(1)
         self._documents = {}
+        # Path -> function of the query parameters that returns a document
+        self._generators: dict[str, Callable[[dict], Any]] = {}
         self.requests: list[RemoteRequest] = []
         self.listeners = []
         self.post_received = Condition()
+        # Fault rules and the log of request attempts
+        self.faults = FaultInjector()
+        # Handle requests concurrently (a thread for each connection)
+        self.concurrent = concurrent
+        # In-flight requests for each host
+        self.concurrency = ConcurrencyTracker()
+        # Additional listeners (ports) simulating other remote hosts.
+        # The virtual hosts share the documents and the request log.
+        self.virtual_hosts: dict[str, http.server.HTTPServer] = {}
 
     def reset(self):
         self._documents = {}
+        self._generators = {}
         self.requests = []
         self.listeners = []
         self.post_received = Condition()
+        self.faults = FaultInjector()
+        self.concurrency = ConcurrencyTracker()
 
     def serve_objects(self, *objects: Tuple[dict]) -> None:
         for obj in objects:
@@ -120,6 +277,13 @@ class HTTPServer(Thread):
             doc_path += f"?{doc_url.query}"
         self._documents[doc_path] = document
 
+    def serve_generator(self, url: str, generator: Callable[[dict], Any]) -> None:
+        """Serve the documents at a path (with any query) from a function
+        of the parsed query parameters (None for not found)"""
+        path = urlparse(url).path
+        self._documents.pop(path, None)
+        self._generators[path] = generator
+
     def start(self):
         super().start()
         asyncio.run(self.httpd_running.wait())
@@ -127,21 +291,51 @@ class HTTPServer(Thread):
     def server_action(self):
         self.httpd_running.set()
 
+    def _make_handler(self, *args):
+        return self.RequestHandler(
+            *args,
+            self._documents,
+            self._generators,
+            self.requests,
+            self.listeners,
+            self.post_received,
+            self.faults,
+            self.concurrency,
+        )
+
+    def _server_class(self, concurrent: bool | None = None):
+        if concurrent is None:
+            concurrent = self.concurrent
+        return self.ThreadingServer if concurrent else self.Server
+
+    def is_concurrent(self, name: str | None = None) -> bool:
+        """The main remote host (or the named simulated host) handles
+        requests concurrently"""
+        httpd = self.virtual_hosts.get(name) if name else self.httpd
+        return isinstance(httpd, socketserver.ThreadingMixIn)
+
     def run(self):
-        self.httpd = self.Server(
-            self.server_action,
-            self.server_address,
-            lambda *args: self.RequestHandler(
-                *args,
-                self._documents,
-                self.requests,
-                self.listeners,
-                self.post_received,
-            ),
+        self.httpd = self._server_class()(
+            self.server_action, self.server_address, self._make_handler
         )
         print("HTTP server started on port", self.server_address[1])
         self.httpd.serve_forever()
 
+    def get_virtual_host(self, name: str, concurrent: bool | None = None) -> int:
+        """Start (once) a listener for a simulated remote host. Returns the port.
+        The host is concurrent if the server is (unless concurrent is given)."""
+        if name not in self.virtual_hosts:
+            httpd = self._server_class(concurrent)(
+                lambda: None, (self.server_address[0], 0), self._make_handler
+            )
+            httpd.name = name
+            Thread(target=httpd.serve_forever, daemon=True).start()
+            self.virtual_hosts[name] = httpd
+        return self.virtual_hosts[name].server_address[1]
+
     def stop(self):
+        for httpd in self.virtual_hosts.values():
+            httpd.shutdown()
+        self.virtual_hosts = {}
         if self.httpd:
             self.httpd.shutdown()
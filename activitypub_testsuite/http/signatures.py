@@ -17,6 +17,8 @@ from cryptography.hazmat.primitives import serialization as crypto_serialization
 from cryptography.hazmat.primitives.asymmetric import padding, rsa
 from cryptography.hazmat.primitives.asymmetric.types import PrivateKeyTypes
 
+from activitypub_testsuite.tracing import span
+
 try:
     # TODO (C) Clean up the requests usage
     from requests import Request
@@ -184,14 +186,15 @@ class HTTPSignatureAuth(AuthBase):
         if not self._private_key:
             raise Exception("Private key unknown. Skipping signature.")
 
-        self.synthesize_headers(request)
-        signature_text, headers_text = self.construct_signature_data(request)
+        with span("http.sign"):
+            self.synthesize_headers(request)
+            signature_text, headers_text = self.construct_signature_data(request)
 
-        signature = b64encode(
-            self._private_key.sign(
-                signature_text.encode("utf-8"), padding.PKCS1v15(), hashes.SHA256()
-            )
-        ).decode("utf-8")
+            signature = b64encode(
+                self._private_key.sign(
+                    signature_text.encode("utf-8"), padding.PKCS1v15(), hashes.SHA256()
+                )
+            ).decode("utf-8")
 
         signature_fields = [
             f'keyId="{self._key_id}"',
@@ -1,5 +1,6 @@
+import time
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Any, Callable, Mapping, Protocol
 
 from activitypub_testsuite.ap import DEFAULT_AP_MEDIA_TYPE
@@ -49,6 +50,8 @@ class RemoteRequest:
     json: Mapping[str, Any]
     headers: Mapping[str, str]
     kwargs: Mapping[str, Any]
+    # When the request was received (time.monotonic())
+    received: float = field(default_factory=time.monotonic)
 
 
 @dataclass
@@ -192,7 +195,18 @@ class ServerTestSupport(Protocol):
     def get_local_actor(self, actor_name: str) -> Actor:
         ...
 
-    def get_remote_actor(self, actor_name: str | None = None) -> Actor:
+    def get_remote_actor(
+        self,
+        actor_name: str | None = None,
+        host: str | None = None,
+        shared_inbox: bool = False,
+    ) -> Actor:
+        """A simulated remote actor, optionally on a named simulated remote host
+        and with a shared inbox for that host"""
+        ...
+
+    def get_remote_host(self, host: str) -> str:
+        """The base URL of a named simulated remote host"""
         ...
 
     def get_unauthenticated_actor(self, actor_name: str) -> Actor:
@@ -0,0 +1,230 @@
+"""
+Inbox load generation.
+
+Signed activities are posted to local actor inboxes by simulated remote
+actors, either at a target rate (open loop) or with a fixed number of
+concurrent senders (closed loop), for a fixed duration or number of requests.
+
+In the open loop mode, the latency is measured from the time the request
+was scheduled to be sent, so a server that falls behind the target rate
+shows the queueing delay in the latency (no "coordinated omission").
+"""
+
+import itertools
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Sequence
+
+from activitypub_testsuite.ap import PUBLIC_URI
+from activitypub_testsuite.delivery import UndoLog
+from activitypub_testsuite.interfaces import Actor, HttpResponse
+from activitypub_testsuite.report.summary import latency_summary
+
+LOAD_ACTIVITY_TYPES = ["Create", "Like", "Follow"]
+
+# Activities that are undone after the load run
+UNDONE_ACTIVITY_TYPES = ["Like", "Follow"]
+
+
+@dataclass
+class LoadConfig:
+    duration: float = 30.0
+    # Requests per second (open loop). If None, the senders send
+    # as fast as the server responds (closed loop).
+    rate: float | None = None
+    concurrency: int = 10
+    senders: int = 10
+    # Maximum number of requests (None: no limit within the duration)
+    requests: int | None = None
+    activity_types: list[str] = field(default_factory=lambda: LOAD_ACTIVITY_TYPES)
+
+
+@dataclass
+class LoadSample:
+    activity_type: str
+    offset: float
+    latency: float
+    status_code: int | None
+    error: str | None = None
+
+
+def is_error(sample: LoadSample) -> bool:
+    return sample.status_code is None or sample.status_code >= 400
+
+
+class LoadResult:
+    def __init__(self):
+        self.samples: list[LoadSample] = []
+        self.elapsed = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, sample: LoadSample) -> None:
+        with self._lock:
+            self.samples.append(sample)
+
+    def summary(self) -> dict[str, Any]:
+        samples = list(self.samples)
+        errors = Counter(
+            sample.error or str(sample.status_code)
+            for sample in samples
+            if is_error(sample)
+        )
+        by_type = defaultdict(list)
+        for sample in samples:
+            by_type[sample.activity_type].append(sample)
+        return {
+            "duration": round(self.elapsed, 3),
+            "requests": len(samples),
+            "throughput": round(len(samples) / self.elapsed, 3) if self.elapsed else 0,
+            "error_rate": (
+                round(sum(errors.values()) / len(samples), 6) if samples else 0
+            ),
+            "errors": dict(errors),
+            "latency": latency_summary([s.latency for s in samples]),
+            "activity_types": {
+                activity_type: {
+                    "requests": len(type_samples),
+                    "errors": len([s for s in type_samples if is_error(s)]),
+                    "latency": latency_summary([s.latency for s in type_samples]),
+                }
+                for activity_type, type_samples in by_type.items()
+            },
+        }
+
+
+def format_summary(summary: dict[str, Any]) -> list[str]:
+    latency = summary["latency"]
+
+    def latency_text(latency):
+        return " ".join(
+            f"{key}={latency[key] * 1000:0.1f}ms"
+            for key in ["p50", "p90", "p95", "p99", "max"]
+        )
+
+    lines = [
+        f"{summary['requests']} requests in {summary['duration']:0.1f}s "
+        f"({summary['throughput']:0.1f}/s), "
+        f"error rate {summary['error_rate']:.2%}",
+        f"latency: {latency_text(latency)}",
+    ]
+    for activity_type, values in summary["activity_types"].items():
+        lines.append(
+            f"  {activity_type}: {values['requests']} requests, "
+            f"{values['errors']} errors, {latency_text(values['latency'])}"
+        )
+    for error, count in summary["errors"].items():
+        lines.append(f"  error {error}: {count}")
+    return lines
+
+
+Sender = Callable[[int], tuple[str, HttpResponse]]
+
+
+def make_inbox_sender(
+    senders: Sequence[Actor],
+    recipients: Sequence[Actor],
+    activity_types: Sequence[str] = LOAD_ACTIVITY_TYPES,
+    liked_object_uri: str | None = None,
+    undo_log: UndoLog | None = None,
+) -> Sender:
+    """Returns a function that posts the n-th load activity to an inbox.
+
+    The senders, recipients and activity types are used round-robin. The
+    activities are served by the remote server so they can be dereferenced.
+    Accepted likes and follows are recorded in the undo log (if any)."""
+
+    def send(n: int) -> tuple[str, HttpResponse]:
+        sender = senders[n % len(senders)]
+        recipient = recipients[n % len(recipients)]
+        activity_type = activity_types[n % len(activity_types)]
+        if activity_type == "Create":
+            activity_object = sender.make_object(
+                {
+                    "type": "Note",
+                    "content": f"Load test {n}",
+                    "attributedTo": sender.id,
+                    "to": recipient.id,
+                }
+            )
+        elif activity_type == "Like" and liked_object_uri:
+            activity_object = liked_object_uri
+        else:
+            activity_object = recipient.id
+        activity = sender.setup_activity(
+            {
+                "type": activity_type,
+                "actor": sender.id,
+                "to": [recipient.id, PUBLIC_URI],
+                "object": activity_object,
+            }
+        )
+        response = sender.post(recipient.inbox, activity, exception=False)
+        if (
+            undo_log is not None
+            and activity_type in UNDONE_ACTIVITY_TYPES
+            and response.status_code < 400
+        ):
+            undo_log.add(sender, recipient.inbox, activity)
+        return activity_type, response
+
+    return send
+
+
+def _timed_send(send: Sender, n: int, start: float, scheduled: float) -> LoadSample:
+    try:
+        activity_type, response = send(n)
+        status_code, error = response.status_code, None
+    except Exception as ex:
+        activity_type, status_code, error = "unknown", None, type(ex).__name__
+    now = time.perf_counter()
+    return LoadSample(
+        activity_type, round(scheduled - start, 6), now - scheduled, status_code, error
+    )
+
+
+def _limit_reached(config: LoadConfig, n: int) -> bool:
+    return config.requests is not None and n >= config.requests
+
+
+def run_load(send: Sender, config: LoadConfig) -> LoadResult:
+    result = LoadResult()
+    start = time.perf_counter()
+    deadline = start + config.duration
+    counter = itertools.count()
+    if config.rate:
+        # Open loop: requests are scheduled at the target rate
+        interval = 1 / config.rate
+        with ThreadPoolExecutor(config.concurrency) as pool:
+            for n in counter:
+                scheduled = start + n * interval
+                if scheduled >= deadline or _limit_reached(config, n):
+                    break
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(
+                    lambda n, scheduled: result.add(
+                        _timed_send(send, n, start, scheduled)
+                    ),
+                    n,
+                    scheduled,
+                )
+    else:
+        # Closed loop: each worker sends the next request after a response
+        def worker():
+            while (now := time.perf_counter()) < deadline:
+                n = next(counter)
+                if _limit_reached(config, n):
+                    break
+                result.add(_timed_send(send, n, start, now))
+
+        threads = [threading.Thread(target=worker) for _ in range(config.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    result.elapsed = time.perf_counter() - start
+    return result
@@ -0,0 +1,77 @@
+"""
+Bounded buffer for the output of the server-under-test.
+
+The output is read in chunks (not line by line) and stored as timestamped
+lines in a ring buffer, so a verbose server uses a bounded amount of memory
+and doesn't flood the pytest output capture. The lines written during a
+test are available from the buffer position at the start of the test.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import deque
+from typing import IO, Iterator
+
+CHUNK_SIZE = 1 << 16
+
+
+class OutputBuffer:
+    def __init__(self, max_lines: int = 10000, echo: bool = False):
+        # (sequence number, timestamp, line)
+        self.lines: deque[tuple[int, float, str]] = deque(maxlen=max_lines)
+        self.echo = echo
+        self._sequence = 0
+        self._partial = b""
+        self._lock = threading.Lock()
+
+    def position(self) -> int:
+        """The sequence number of the next line"""
+        return self._sequence
+
+    def append(self, data: bytes, timestamp: float | None = None) -> list[str]:
+        """Add a chunk of output. Returns the complete lines in the chunk."""
+        timestamp = timestamp or time.time()
+        *complete, self._partial = (self._partial + data).split(b"\n")
+        lines = [line.decode(errors="replace").rstrip("\r") for line in complete]
+        with self._lock:
+            for line in lines:
+                self.lines.append((self._sequence, timestamp, line))
+                self._sequence += 1
+        if self.echo and lines:
+            sys.stdout.write("".join(f"local server: {line}\n" for line in lines))
+        return lines
+
+    def flush(self) -> list[str]:
+        """Add any unterminated line (at the end of the output)"""
+        if not self._partial:
+            return []
+        return self.append(b"\n")
+
+    def since(
+        self, position: int, limit: int | None = None
+    ) -> tuple[list[tuple[float, str]], int]:
+        """The lines from the position (limited to the most recent lines)
+        and the number of lines that were dropped."""
+        with self._lock:
+            lines = [(t, line) for seq, t, line in self.lines if seq >= position]
+            available = self._sequence - position
+        if limit is not None and len(lines) > limit:
+            lines = lines[-limit:]
+        return lines, available - len(lines)
+
+    def read_from(self, stream: IO[bytes]) -> Iterator[list[str]]:
+        """Read the stream until the end of the output,
+        returning the complete lines of each chunk."""
+        fd = stream.fileno()
+        while True:
+            data = os.read(fd, CHUNK_SIZE)
+            if not data:
+                break
+            lines = self.append(data)
+            if lines:
+                yield lines
+        lines = self.flush()
+        if lines:
+            yield lines
@@ -1,5 +1,31 @@
 # pytest plugins
 
+import os
+import time
+
+import pytest
+from pytest_metadata.plugin import metadata_key
+
+from activitypub_testsuite import tracing
+from activitypub_testsuite.budget import (
+    OVERBUDGET,
+    check_budgets,
+    get_budgets,
+    unknown_budgets,
+)
+from activitypub_testsuite.history import (
+    DurationHistory,
+    estimate_duration,
+    history_path,
+    load_durations,
+    longest_first,
+    shard_assignments,
+)
+from activitypub_testsuite.http.faults import FAULT_PROFILES
+from activitypub_testsuite.load import LOAD_ACTIVITY_TYPES
+from activitypub_testsuite.report.jsonl import JsonLinesWriter, write_stage
+from activitypub_testsuite.tracing import ChromeTraceExporter, OtlpJsonExporter, span
+
 
 def pytest_load_initial_conftests(args):
     args.extend(
@@ -11,3 +37,508 @@ def pytest_load_initial_conftests(args):
             "keywords",
         ]
     )
+
+
+def pytest_addoption(parser: pytest.Parser):
+    group = parser.getgroup("aptest", "ActivityPub test suite")
+    group.addoption(
+        "--aptest-record-durations",
+        action="store_true",
+        help="Record the test durations in the local duration history (.aptest)",
+    )
+    group.addoption(
+        "--aptest-longest-first",
+        action="store_true",
+        help="Run tests in order of historical duration, longest first",
+    )
+    group.addoption(
+        "--aptest-shard",
+        metavar="I/N",
+        default=None,
+        help="Run only shard I (1-based) of N duration-balanced shards",
+    )
+    group.addoption(
+        "--aptest-trace",
+        metavar="FILENAME",
+        default=None,
+        help="Write operation spans as a Chrome trace (for Perfetto)",
+    )
+    group.addoption(
+        "--aptest-trace-otlp",
+        metavar="FILENAME",
+        default=None,
+        help="Write operation spans as OTLP JSON lines",
+    )
+    group.addoption(
+        "--aptest-jsonl",
+        metavar="FILENAME",
+        default=None,
+        help="Write test results incrementally as JSON Lines",
+    )
+    group.addoption(
+        "--aptest-load",
+        action="store_true",
+        help="Run the inbox load tests (ap_load marker)",
+    )
+    group.addoption(
+        "--aptest-load-duration",
+        metavar="SECONDS",
+        type=float,
+        default=30.0,
+        help="Duration of each load test",
+    )
+    group.addoption(
+        "--aptest-load-rate",
+        metavar="N",
+        type=float,
+        default=None,
+        help="Target requests per second (default: as fast as the server responds)",
+    )
+    group.addoption(
+        "--aptest-load-concurrency",
+        metavar="N",
+        type=int,
+        default=10,
+        help="Maximum number of concurrent load requests",
+    )
+    group.addoption(
+        "--aptest-load-senders",
+        metavar="N",
+        type=int,
+        default=10,
+        help="Number of simulated remote actors sending the load",
+    )
+    group.addoption(
+        "--aptest-load-requests",
+        metavar="N",
+        type=int,
+        default=None,
+        help="Maximum number of requests in each load test (default: no limit)",
+    )
+    group.addoption(
+        "--aptest-load-types",
+        metavar="TYPES",
+        default=",".join(LOAD_ACTIVITY_TYPES),
+        help="Comma-separated activity types to send",
+    )
+    group.addoption(
+        "--aptest-load-output",
+        metavar="FILENAME",
+        default=None,
+        help="Write the load test results as JSON",
+    )
+    group.addoption(
+        "--aptest-fanout-followers",
+        metavar="N",
+        type=int,
+        default=100,
+        help="Number of simulated remote followers in the fan-out benchmark",
+    )
+    group.addoption(
+        "--aptest-fanout-hosts",
+        metavar="N",
+        type=int,
+        default=10,
+        help="Number of simulated remote hosts in the fan-out benchmark",
+    )
+    group.addoption(
+        "--aptest-fanout-timeout",
+        metavar="SECONDS",
+        type=float,
+        default=60.0,
+        help="Maximum time for the fan-out delivery to complete",
+    )
+    group.addoption(
+        "--aptest-remote-concurrent",
+        action="store_true",
+        default=False,
+        help="Handle the simulated remote server requests concurrently "
+        "(to measure the server's outbound concurrency)",
+    )
+    group.addoption(
+        "--aptest-remote-faults",
+        metavar="PROFILE",
+        choices=sorted(FAULT_PROFILES),
+        help="Inject faults in the simulated remote server responses "
+        f"({', '.join(sorted(FAULT_PROFILES))})",
+    )
+
+
+#
+# Duration history and scheduling
+#
+
+CONFIG = None
+
+DURATION_ESTIMATE = None
+
+
+def pytest_configure(config: pytest.Config):
+    global CONFIG
+    CONFIG = config
+    config.addinivalue_line(
+        "markers", "ap_load: inbox load test (runs with --aptest-load)"
+    )
+    config.addinivalue_line(
+        "markers", "ap_perf(**budgets): performance budgets for the test"
+    )
+    configure_tracing(config)
+
+
+def get_worker_count(config: pytest.Config) -> int:
+    # pytest-xdist, if installed
+    workers = config.getoption("numprocesses", None)
+    return workers if isinstance(workers, int) and workers > 0 else 1
+
+
+def get_shard(config: pytest.Config) -> tuple[int, int] | None:
+    shard = config.getoption("aptest_shard")
+    if not shard:
+        return None
+    try:
+        index, count = map(int, shard.split("/"))
+    except ValueError:
+        raise pytest.UsageError(f"Invalid --aptest-shard (expected I/N): {shard}")
+    if count < 1 or not 1 <= index <= count:
+        raise pytest.UsageError(f"Invalid --aptest-shard (1 <= I <= N): {shard}")
+    return index, count
+
+
+def get_scheduling_durations(
+    items: list[pytest.Item], durations: dict[str, float]
+) -> dict[str, float]:
+    if not durations:
+        return durations
+    # Tests skipped during collection won't take any time
+    return {
+        **durations,
+        **{
+            item.nodeid: 0.0
+            for item in items
+            if item.get_closest_marker("skip") is not None
+        },
+    }
+
+
+def skip_load_tests(config: pytest.Config, items: list[pytest.Item]):
+    if config.getoption("aptest_load"):
+        return
+    for item in items:
+        if item.get_closest_marker("ap_load"):
+            item.add_marker(
+                pytest.mark.skip(reason="Load tests run with --aptest-load")
+            )
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_collection_modifyitems(config: pytest.Config, items: list[pytest.Item]):
+    global DURATION_ESTIMATE
+    skip_load_tests(config, items)
+    check_budget_markers(items)
+    shard = get_shard(config)
+    longest_first_order = config.getoption("aptest_longest_first")
+    if not shard and not longest_first_order:
+        return
+    durations = get_scheduling_durations(items, load_durations(str(config.rootpath)))
+    if shard:
+        index, count = shard
+        assignments = shard_assignments(
+            [item.nodeid for item in items], durations, count
+        )
+        selected = [item for item in items if assignments[item.nodeid] == index - 1]
+        deselected = [item for item in items if assignments[item.nodeid] != index - 1]
+        if deselected:
+            config.hook.pytest_deselected(items=deselected)
+        items[:] = selected
+    if not durations:
+        return
+    nodeids = [item.nodeid for item in items]
+    if longest_first_order:
+        items_by_nodeid = {item.nodeid: item for item in items}
+        items[:] = [
+            items_by_nodeid[nodeid] for nodeid in longest_first(nodeids, durations)
+        ]
+    DURATION_ESTIMATE = (
+        estimate_duration(nodeids, durations, get_worker_count(config)),
+        len([nodeid for nodeid in nodeids if nodeid in durations]),
+        len(nodeids),
+    )
+
+
+def pytest_report_collectionfinish(config: pytest.Config):
+    if DURATION_ESTIMATE:
+        estimate, known, total = DURATION_ESTIMATE
+        return (
+            f"aptest: estimated duration {estimate:0.1f}s "
+            f"({known} of {total} tests have duration history)"
+        )
+
+
+#
+# Performance budgets
+#
+
+STAGE_RESULTS_KEY = "stage_results"
+
+OVER_BUDGET_TESTS: list[str] = []
+
+
+def check_budget_markers(items: list[pytest.Item]):
+    for item in items:
+        marker = item.get_closest_marker("ap_perf")
+        unknown = unknown_budgets(marker.kwargs) if marker else []
+        if unknown:
+            raise pytest.UsageError(
+                f"Unknown ap_perf budget in {item.nodeid}: {', '.join(unknown)}"
+            )
+
+
+def item_budgets(item: pytest.Item) -> dict[str, float]:
+    marker = item.get_closest_marker("ap_perf")
+    test_config = item.stash["config"] if "config" in item.stash else {}
+    return get_budgets(marker.kwargs if marker else {}, test_config)
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item: pytest.Item, call: pytest.CallInfo):
+    report = (yield).get_result()
+    stage_results = item.stash.setdefault(STAGE_RESULTS_KEY, {})
+    stage_results[report.when] = (
+        report.passed and not hasattr(report, "wasxfail"),
+        report.duration,
+    )
+    if report.when != "teardown":
+        return
+    budgets = item_budgets(item)
+    if not budgets:
+        return
+    extra = getattr(item, "_json_report_extra", None)
+    metadata = extra.setdefault("metadata", {}) if extra is not None else {}
+    results = check_budgets(
+        budgets,
+        {when: duration for when, (_, duration) in stage_results.items()},
+        metadata,
+    )
+    if results:
+        metadata["budget"] = results
+    passed = all(passed for passed, _ in stage_results.values())
+    if passed and any(result["exceeded"] for result in results):
+        report.over_budget = True
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_report_teststatus(report: pytest.TestReport, config: pytest.Config):
+    if getattr(report, "over_budget", False):
+        return OVERBUDGET, "B", "OVERBUDGET"
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_sessionfinish(session: pytest.Session):
+    # Passing tests that exceed their budgets fail the run. The status is
+    # set before any pytest_sessionfinish implementation (the JSON report)
+    # reads it.
+    if OVER_BUDGET_TESTS and session.exitstatus == pytest.ExitCode.OK:
+        session.exitstatus = pytest.ExitCode.TESTS_FAILED
+    yield
+
+
+def count_over_budget_test(config: pytest.Config, report: pytest.TestReport):
+    """An over-budget test is counted once, with the over-budget outcome.
+    The passed call report was counted before the budgets were checked
+    (at teardown)."""
+    OVER_BUDGET_TESTS.append(report.nodeid)
+    terminal = config.pluginmanager.get_plugin("terminalreporter")
+    if terminal is None:
+        return
+    passed = [r for r in terminal.stats.get("passed", []) if r.nodeid != report.nodeid]
+    if passed:
+        terminal.stats["passed"] = passed
+    else:
+        terminal.stats.pop("passed", None)
+
+
+#
+# Fixture setup and teardown durations
+#
+
+FIXTURE_DURATIONS_KEY = "fixture_durations"
+
+CURRENT_ITEM: pytest.Item | None = None
+
+# Durations of nested fixture setups (to compute the exclusive setup time)
+_fixture_setup_stack: list[float] = []
+
+_fixture_teardown_starts: dict[pytest.FixtureDef, float] = {}
+
+
+def record_fixture_duration(name: str, when: str, duration: float):
+    # Higher-scoped fixtures are attributed to the test that set them up
+    # or tore them down
+    if CURRENT_ITEM is not None:
+        durations = CURRENT_ITEM.stash.setdefault(FIXTURE_DURATIONS_KEY, {})
+        fixture_durations = durations.setdefault(name, {})
+        fixture_durations[when] = fixture_durations.get(when, 0) + round(duration, 6)
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_protocol(item: pytest.Item):
+    global CURRENT_ITEM
+    CURRENT_ITEM = item
+    with span("test", nodeid=item.nodeid):
+        yield
+    CURRENT_ITEM = None
+    if tracing.TRACER:
+        tracing.TRACER.flush()
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_fixture_setup(fixturedef: pytest.FixtureDef, request: pytest.FixtureRequest):
+    start = time.perf_counter()
+    _fixture_setup_stack.append(0.0)
+    with span("fixture.setup", fixture=fixturedef.argname, scope=fixturedef.scope):
+        yield
+    elapsed = time.perf_counter() - start
+    nested = _fixture_setup_stack.pop()
+    if _fixture_setup_stack:
+        _fixture_setup_stack[-1] += elapsed
+    record_fixture_duration(fixturedef.argname, "setup", elapsed - nested)
+
+    def start_teardown():
+        _fixture_teardown_starts[fixturedef] = time.perf_counter()
+
+    # Finalizers run in reverse order so this runs before the fixture teardown
+    fixturedef.addfinalizer(start_teardown)
+
+
+def pytest_fixture_post_finalizer(fixturedef: pytest.FixtureDef):
+    start = _fixture_teardown_starts.pop(fixturedef, None)
+    if start is not None:
+        record_fixture_duration(
+            fixturedef.argname, "teardown", time.perf_counter() - start
+        )
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_json_runtest_metadata(item: pytest.Item):
+    # The same dictionary is updated by the later test stages
+    durations = item.stash.get(FIXTURE_DURATIONS_KEY, None)
+    if durations:
+        return {"fixtures": durations}
+
+
+#
+# Span tracing
+#
+
+
+def worker_filename(config: pytest.Config, filename: str) -> str:
+    # Each xdist worker writes a separate file
+    if hasattr(config, "workerinput"):
+        base, ext = os.path.splitext(filename)
+        return f"{base}-{config.workerinput['workerid']}{ext}"
+    return filename
+
+
+def configure_tracing(config: pytest.Config):
+    exporters = []
+    if config.getoption("aptest_trace", None):
+        filename = worker_filename(config, config.getoption("aptest_trace"))
+        exporters.append(ChromeTraceExporter(filename))
+    if config.getoption("aptest_trace_otlp", None):
+        filename = worker_filename(config, config.getoption("aptest_trace_otlp"))
+        exporters.append(OtlpJsonExporter(filename))
+    if exporters:
+        tracing.set_tracer(tracing.Tracer(exporters))
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_setup(item: pytest.Item):
+    with span("stage.setup"):
+        yield
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item: pytest.Item):
+    with span("stage.call"):
+        yield
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_teardown(item: pytest.Item):
+    with span("stage.teardown"):
+        yield
+
+
+#
+# Incremental JSON Lines results
+#
+
+JSONL_WRITER: JsonLinesWriter | None = None
+
+
+def pytest_sessionstart(session: pytest.Session):
+    global JSONL_WRITER
+    # In case of in-process runs (aptest load)
+    OVER_BUDGET_TESTS.clear()
+    config = session.config
+    # Only the xdist controller (or a non-distributed run) writes the results
+    if config.getoption("aptest_jsonl") and not hasattr(config, "workerinput"):
+        JSONL_WRITER = JsonLinesWriter(config.getoption("aptest_jsonl"))
+        JSONL_WRITER.write(
+            "start",
+            created=time.time(),
+            root=str(session.path),
+            environment=dict(config.stash.get(metadata_key, {})),
+        )
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_runtest_logreport(report: pytest.TestReport):
+    if getattr(report, "over_budget", False):
+        count_over_budget_test(CONFIG, report)
+    if JSONL_WRITER:
+        extra = getattr(report, "_json_report_extra", {})
+        write_stage(
+            JSONL_WRITER,
+            report.nodeid,
+            report.location[1],
+            report.when,
+            CONFIG.hook.pytest_report_teststatus(report=report, config=CONFIG)[0],
+            CONFIG.hook.pytest_json_runtest_stage(report=report),
+            extra.get("metadata"),
+        )
+
+
+def close_jsonl_writer(json_report: dict | None = None):
+    global JSONL_WRITER
+    if JSONL_WRITER:
+        if json_report:
+            JSONL_WRITER.write(
+                "finish",
+                **{
+                    key: value
+                    for key, value in json_report.items()
+                    if key not in ["tests", "collectors"]
+                },
+            )
+        JSONL_WRITER.close()
+        JSONL_WRITER = None
+
+
+def pytest_unconfigure(config: pytest.Config):
+    # In case the JSON report wasn't created
+    close_jsonl_writer()
+    if tracing.TRACER:
+        tracing.TRACER.close()
+        tracing.set_tracer(None)
+
+
+@pytest.hookimpl(optionalhook=True, trylast=True)
+def pytest_json_modifyreport(json_report):
+    if CONFIG and CONFIG.getoption("aptest_shard"):
+        # Used when merging shard reports
+        json_report["environment"]["Shard"] = CONFIG.getoption("aptest_shard")
+    if CONFIG and CONFIG.getoption("aptest_record_durations"):
+        with DurationHistory(history_path(str(CONFIG.rootpath))) as history:
+            history.ingest(json_report)
+    close_jsonl_writer(json_report)
@@ -0,0 +1,232 @@
+"""
+Optional, cheap probing of the server-under-test capabilities.
+
+The probe results are flat capability maps (dotted capability identifiers
+to booleans). Capabilities that can't be determined are not included.
+The results are cached on disk keyed by the server name and version.
+"""
+
+import json
+import os
+import re
+from http import HTTPStatus
+from typing import Any, Callable
+from urllib.parse import urlparse
+
+from activitypub_testsuite.interfaces import Actor, HttpResponse, RemoteCommunicator
+from activitypub_testsuite.support import APTEST_DIRECTORY
+
+SERVER_META_ENDPOINTS = {
+    "nodeinfo": "/.well-known/nodeinfo",
+    "x-nodeinfo2": "/.well-known/x-nodeinfo2",
+    "host-meta": "/.well-known/host-meta",
+    "robots_txt": "/robots.txt",
+    "portable_contacts": "/poco",
+}
+
+ACTOR_COLLECTIONS = ["following", "followers", "liked"]
+
+OBJECT_COLLECTIONS = ["likes", "shares"]
+
+# Activity types probed after a Create, in order. The object of each
+# activity is the created object, the target actor or a previously
+# accepted activity. Delete is last and deletes an object of its own.
+OUTBOX_ACTIVITY_TYPES = [
+    "Update",
+    "Add",
+    "Remove",
+    "Like",
+    "Follow",
+    "Block",
+    "Undo",
+    "Delete",
+]
+
+# Activity types with an actor as the object
+ACTOR_OBJECT_TYPES = ["Follow", "Block"]
+
+# Activity types that can be the object of the Undo probe, in order of preference
+UNDO_OBJECT_TYPES = ["Follow", "Like", "Block"]
+
+UNSUPPORTED_STATUS_CODES = {
+    HTTPStatus.BAD_REQUEST.value,
+    HTTPStatus.NOT_FOUND.value,
+    HTTPStatus.METHOD_NOT_ALLOWED.value,
+    HTTPStatus.UNPROCESSABLE_ENTITY.value,
+    HTTPStatus.NOT_IMPLEMENTED.value,
+}
+
+
+def is_supported(response: HttpResponse) -> bool | None:
+    """Interpret a probe response (None if it's inconclusive)"""
+    if response.is_success:
+        return True
+    if response.status_code in UNSUPPORTED_STATUS_CODES:
+        return False
+    return None
+
+
+def is_activity_supported(response: HttpResponse) -> bool | None:
+    """Interpret an outbox activity probe response. A probe activity could be
+    rejected for reasons other than the activity type (for example, the
+    server doesn't accept the object), so only 501 means it's unsupported."""
+    if response.is_success:
+        return True
+    if response.status_code == HTTPStatus.NOT_IMPLEMENTED.value:
+        return False
+    return None
+
+
+def _record(results: dict[str, bool], capability_id: str, supported: bool | None):
+    if supported is not None:
+        results[capability_id] = supported
+
+
+def probe_server_meta(
+    base_url: str,
+    get: Callable[[str], HttpResponse],
+    actor: Actor | None = None,
+) -> dict[str, bool]:
+    results = {}
+    for capability_id, path in SERVER_META_ENDPOINTS.items():
+        _record(results, capability_id, is_supported(get(f"{base_url}{path}")))
+    if actor and "preferredUsername" in actor.profile:
+        netloc = urlparse(base_url).netloc
+        resource = f"acct:{actor.profile['preferredUsername']}@{netloc}"
+        response = get(f"{base_url}/.well-known/webfinger?resource={resource}")
+        _record(results, "webfinger", is_supported(response))
+    return results
+
+
+def probe_actor(actor: Actor) -> dict[str, bool]:
+    results = {}
+    for name in ACTOR_COLLECTIONS:
+        results[f"collections.{name}"] = name in actor.profile
+    results["s2s.sharedInbox"] = "sharedInbox" in actor.profile.get("endpoints", {})
+    _record(results, "c2s.outbox.get", is_supported(actor.get(actor.outbox)))
+    _record(results, "s2s.inbox.get", is_supported(actor.get(actor.inbox)))
+    return results
+
+
+def _post_create(actor: Actor) -> tuple[HttpResponse, dict | None]:
+    """Post a Create and return the response and the created object"""
+    response = actor.post(
+        actor.outbox,
+        actor.make_activity({"type": "Create", "object": actor.make_object()}),
+        exception=False,
+    )
+    if not response.is_success or "Location" not in response.headers:
+        return response, None
+    activity = actor.get_json(response.headers["Location"], exception=False)
+    object_ = activity.get("object") if isinstance(activity, dict) else None
+    if isinstance(object_, str):
+        object_ = actor.get_json(object_, exception=False)
+    if not isinstance(object_, dict) or "id" not in object_:
+        return response, None
+    return response, object_
+
+
+def probe_outbox(actor: Actor, target_actor: Actor) -> dict[str, bool]:
+    """Probe outbox POST acceptance for each activity type.
+
+    A Create is posted first. Other activity types reference the created
+    object, the target actor (Follow, Block) or an earlier activity (Undo).
+    Delete is posted last, for another created object.
+    """
+    results = {}
+    response, object_ = _post_create(actor)
+    supported = is_supported(response)
+    _record(results, "c2s.outbox.post", supported)
+    _record(results, "c2s.outbox.post.Create", supported)
+    if object_ is None:
+        return results
+    for name in OBJECT_COLLECTIONS:
+        results[f"collections.{name}"] = name in object_
+    activities: dict[str, str] = {}
+    for activity_type in OUTBOX_ACTIVITY_TYPES:
+        properties: dict[str, Any] = {"type": activity_type}
+        if activity_type in ACTOR_OBJECT_TYPES:
+            properties["object"] = target_actor.id
+        elif activity_type == "Update":
+            properties["object"] = {**object_, "content": "Updated probe object"}
+        elif activity_type == "Undo":
+            undo_object = next(
+                (activities[t] for t in UNDO_OBJECT_TYPES if t in activities), None
+            )
+            if undo_object is None:
+                continue
+            properties["object"] = undo_object
+        elif activity_type == "Delete":
+            _, deleted_object = _post_create(actor)
+            if deleted_object is None:
+                continue
+            properties["object"] = deleted_object["id"]
+        else:
+            properties["object"] = object_["id"]
+        if activity_type in ["Add", "Remove"]:
+            properties["target"] = actor.outbox
+        response = actor.post(
+            actor.outbox, actor.make_activity(properties), exception=False
+        )
+        supported = is_activity_supported(response)
+        _record(results, f"c2s.outbox.post.{activity_type}", supported)
+        if supported and "Location" in response.headers:
+            activities[activity_type] = response.headers["Location"]
+    return results
+
+
+def probe_delivery(
+    actor: Actor, remote_actor: Actor, remote_communicator: RemoteCommunicator
+) -> dict[str, bool]:
+    """Probe outbound delivery. This waits (once) for the delivery timeout
+    if the server doesn't federate."""
+    response = actor.post(
+        actor.outbox,
+        actor.make_activity(
+            {"to": remote_actor.id, "object": actor.make_object()},
+        ),
+        exception=False,
+    )
+    if not response.is_success:
+        return {}
+    try:
+        post = remote_communicator.get_most_recent_post()
+    except Exception:
+        return {"s2s.delivery": False}
+    return {"s2s.delivery": post is not None}
+
+
+def nest_capabilities(capabilities: dict[str, bool]) -> dict[str, Any]:
+    """Convert a flat capability map to the nested server.capabilities form"""
+    nested = {}
+    for capability_id in sorted(capabilities):
+        node = nested
+        *path, name = capability_id.split(".")
+        for key in path:
+            value = node.get(key)
+            if not isinstance(value, dict):
+                node[key] = {} if value is None else {"default": value}
+            node = node[key]
+        if isinstance(node.get(name), dict):
+            node[name]["default"] = capabilities[capability_id]
+        else:
+            node[name] = capabilities[capability_id]
+    return nested
+
+
+def probe_cache_path(root_dir: str, server_name: str, server_version: str) -> str:
+    key = re.sub(r"[^\w.-]", "_", f"{server_name}-{server_version}")
+    return os.path.join(root_dir, APTEST_DIRECTORY, f"capabilities-{key}.json")
+
+
+def load_probed_capabilities(cache_path: str) -> dict[str, bool] | None:
+    if not os.path.exists(cache_path):
+        return None
+    with open(cache_path) as fp:
+        return json.load(fp)
+
+
+def save_probed_capabilities(cache_path: str, capabilities: dict[str, bool]) -> None:
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    with open(cache_path, "w") as fp:
+        json.dump(capabilities, fp, indent=2, sort_keys=True)
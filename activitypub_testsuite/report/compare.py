@@ -0,0 +1,222 @@
+"""
+Comparison of two test runs (a base run and a head run).
+
+The comparison includes the test outcome changes, the per-test and
+per-capability duration changes, the delivery latency percentile changes
+and the tests that are only in the head run.
+A duration regression is an increase greater than the relative threshold
+(and greater than the minimum absolute increase, to ignore timing noise).
+"""
+
+from collections import defaultdict
+from typing import Any, Iterable
+
+from activitypub_testsuite.report.filters import test_duration
+from activitypub_testsuite.report.summary import (
+    latency_summary,
+    test_delivery_latencies,
+)
+
+# Relative duration increase considered a regression (0.2 = 20% slower)
+DEFAULT_THRESHOLD = 0.2
+
+# Duration increases smaller than this (seconds) are ignored
+DEFAULT_MIN_DELTA = 0.05
+
+DELIVERY_PERCENTILES = ["p50", "p90", "p99"]
+
+# Outcome changes that are regressions (base outcome, head outcomes)
+OUTCOME_REGRESSIONS = {
+    "passed": ["failed", "error", "overbudget"],
+    "xpassed": ["failed", "error", "overbudget"],
+    "xfailed": ["error"],
+}
+
+
+def test_capabilities(test: dict[str, Any]) -> list[str]:
+    return (test.get("metadata") or {}).get("ap_capability") or []
+
+
+def summarize_tests(tests: Iterable[dict[str, Any]]) -> dict[str, dict[str, Any]]:
+    """The outcome, duration and capabilities of each test (by node id)"""
+    return {
+        test["nodeid"]: {
+            "outcome": test["outcome"],
+            "duration": test_duration(test),
+            "capabilities": test_capabilities(test),
+            "delivery_latencies": test_delivery_latencies(test),
+        }
+        for test in tests
+    }
+
+
+def duration_change(
+    name: str, base: float, head: float, threshold: float, min_delta: float
+) -> dict[str, Any]:
+    delta = head - base
+    ratio = delta / base if base > 0 else None
+    return {
+        "name": name,
+        "base": base,
+        "head": head,
+        "delta": delta,
+        "ratio": ratio,
+        "regression": delta > min_delta and (ratio is None or ratio > threshold),
+    }
+
+
+class ReportComparison:
+    def __init__(
+        self,
+        base_tests: Iterable[dict[str, Any]],
+        head_tests: Iterable[dict[str, Any]],
+        threshold: float = DEFAULT_THRESHOLD,
+        min_delta: float = DEFAULT_MIN_DELTA,
+    ):
+        self.threshold = threshold
+        self.min_delta = min_delta
+        base = summarize_tests(base_tests)
+        head = summarize_tests(head_tests)
+        self.new_tests = [
+            {"name": nodeid, **test}
+            for nodeid, test in head.items()
+            if nodeid not in base
+        ]
+        self.new_tests.sort(key=lambda test: test["duration"], reverse=True)
+        self.removed_tests = [nodeid for nodeid in base if nodeid not in head]
+        common = [nodeid for nodeid in head if nodeid in base]
+        self.outcome_changes = [
+            {
+                "name": nodeid,
+                "base": base[nodeid]["outcome"],
+                "head": head[nodeid]["outcome"],
+                "regression": head[nodeid]["outcome"]
+                in OUTCOME_REGRESSIONS.get(base[nodeid]["outcome"], []),
+            }
+            for nodeid in common
+            if base[nodeid]["outcome"] != head[nodeid]["outcome"]
+        ]
+        # Only tests that ran in both runs have comparable durations
+        timed = [
+            nodeid
+            for nodeid in common
+            if base[nodeid]["outcome"] != "skipped"
+            and head[nodeid]["outcome"] != "skipped"
+        ]
+        self.duration_changes = sorted(
+            (
+                self._duration_change(
+                    nodeid, base[nodeid]["duration"], head[nodeid]["duration"]
+                )
+                for nodeid in timed
+            ),
+            key=lambda change: change["delta"],
+            reverse=True,
+        )
+        base_capabilities = defaultdict(float)
+        head_capabilities = defaultdict(float)
+        for nodeid in timed:
+            for capability in head[nodeid]["capabilities"]:
+                base_capabilities[capability] += base[nodeid]["duration"]
+                head_capabilities[capability] += head[nodeid]["duration"]
+        self.capability_changes = sorted(
+            (
+                self._duration_change(
+                    capability, base_capabilities[capability], duration
+                )
+                for capability, duration in head_capabilities.items()
+            ),
+            key=lambda change: change["delta"],
+            reverse=True,
+        )
+        self.delivery_changes = self._delivery_changes(
+            [x for nodeid in timed for x in base[nodeid]["delivery_latencies"]],
+            [x for nodeid in timed for x in head[nodeid]["delivery_latencies"]],
+        )
+        self.base_duration = sum(base[nodeid]["duration"] for nodeid in timed)
+        self.head_duration = sum(head[nodeid]["duration"] for nodeid in timed)
+
+    def _duration_change(self, name: str, base: float, head: float):
+        return duration_change(name, base, head, self.threshold, self.min_delta)
+
+    def _delivery_changes(self, base: list[float], head: list[float]):
+        if not base or not head:
+            return []
+        base_summary, head_summary = latency_summary(base), latency_summary(head)
+        return [
+            self._duration_change(
+                f"Delivery latency {key}", base_summary[key], head_summary[key]
+            )
+            for key in DELIVERY_PERCENTILES
+        ]
+
+    @property
+    def duration_regressions(self) -> list[dict[str, Any]]:
+        return [change for change in self.duration_changes if change["regression"]]
+
+    @property
+    def capability_regressions(self) -> list[dict[str, Any]]:
+        return [change for change in self.capability_changes if change["regression"]]
+
+    @property
+    def delivery_regressions(self) -> list[dict[str, Any]]:
+        return [change for change in self.delivery_changes if change["regression"]]
+
+    @property
+    def outcome_regressions(self) -> list[dict[str, Any]]:
+        return [change for change in self.outcome_changes if change["regression"]]
+
+    @property
+    def has_regressions(self) -> bool:
+        return bool(
+            self.outcome_regressions
+            or self.duration_regressions
+            or self.capability_regressions
+            or self.delivery_regressions
+        )
+
+
+def format_change(change: dict[str, Any]) -> str:
+    ratio = f"{change['ratio']:+.0%}" if change["ratio"] is not None else "new"
+    return (
+        f"{change['base']:8.3f}s -> {change['head']:8.3f}s "
+        f"({change['delta']:+.3f}s, {ratio})"
+    )
+
+
+def format_text(comparison: ReportComparison, top: int = 10) -> Iterable[str]:
+    """Plain text comparison (one line per item)"""
+    yield (
+        f"Duration of tests in both runs: {comparison.base_duration:0.3f}s -> "
+        f"{comparison.head_duration:0.3f}s"
+    )
+    yield (
+        f"Regression threshold: {comparison.threshold:.0%} "
+        f"(minimum {comparison.min_delta:0.3f}s)"
+    )
+    sections = [
+        ("Outcome changes", comparison.outcome_changes, None),
+        ("Duration regressions", comparison.duration_regressions, format_change),
+        ("Capability duration changes", comparison.capability_changes, format_change),
+        ("Delivery latency changes", comparison.delivery_changes, format_change),
+    ]
+    for title, changes, formatter in sections:
+        yield ""
+        yield f"{title} ({len(changes)}):"
+        for change in changes:
+            marker = "!" if change["regression"] else " "
+            detail = (
+                formatter(change)
+                if formatter
+                else f"{change['base']} -> {change['head']}"
+            )
+            yield f"{marker} {detail}  {change['name']}"
+    yield ""
+    yield f"Slowest new tests ({len(comparison.new_tests)} new):"
+    for test in comparison.new_tests[:top]:
+        yield f"  {test['duration']:8.3f}s  {test['outcome']:8}  {test['name']}"
+    if comparison.removed_tests:
+        yield ""
+        yield f"Removed tests ({len(comparison.removed_tests)}):"
+        for nodeid in comparison.removed_tests:
+            yield f"  {nodeid}"
@@ -1,5 +1,14 @@
+import json
+from datetime import datetime
 from urllib.parse import quote
 
+from activitypub_testsuite.report.summary import (
+    concurrency_chart,
+    delivery_chart,
+    fixture_durations,
+    retry_timeline,
+)
+
 
 def get_metadata_value(test, key, default_value=""):
     metadata = test.get("metadata")
@@ -30,9 +39,33 @@ def test_slug(test):
     return quote(test_name(test))
 
 
+def format_bytes(x):
+    for unit in ["B", "KiB", "MiB"]:
+        if abs(x) < 1024:
+            return f"{x:0.0f}{unit}" if unit == "B" else f"{x:0.1f}{unit}"
+        x /= 1024
+    return f"{x:0.2f}GiB"
+
+
+def format_timestamp(x):
+    return datetime.fromtimestamp(x).strftime("%H:%M:%S.%f")[:-3]
+
+
+def script_json(value):
+    # Safe to embed in a <script> element
+    return json.dumps(value, separators=(",", ":")).replace("</", "<\\/")
+
+
 def configure_filters(template_env):
     template_env.filters["test_name"] = test_name
     template_env.filters["test_slug"] = test_slug
     template_env.filters["metadata_value"] = get_metadata_value
     template_env.filters["test_duration"] = test_duration
     template_env.filters["format_duration"] = format_duration
+    template_env.filters["script_json"] = script_json
+    template_env.filters["fixture_durations"] = fixture_durations
+    template_env.filters["delivery_chart"] = delivery_chart
+    template_env.filters["retry_timeline"] = retry_timeline
+    template_env.filters["concurrency_chart"] = concurrency_chart
+    template_env.filters["format_bytes"] = format_bytes
+    template_env.filters["format_timestamp"] = format_timestamp
@@ -1,37 +1,121 @@
-import json
 import os
+import sys
 import webbrowser
 
 import jinja2
 
+from activitypub_testsuite.report.compare import (
+    DEFAULT_MIN_DELTA,
+    DEFAULT_THRESHOLD,
+    ReportComparison,
+    format_text,
+)
 from activitypub_testsuite.report.filters import configure_filters
+from activitypub_testsuite.report.lazy import LazyReportData
+from activitypub_testsuite.report.matrix import load_matrix
+from activitypub_testsuite.report.merge import merge_report_files
+from activitypub_testsuite.report.stream import stream_report
+from activitypub_testsuite.report.summary import session_totals
 
 
-def main(json_report_filename, html_report_filename=None, *, browser=False):
+def load_report(json_report_filenames: str | list[str]):
+    if isinstance(json_report_filenames, str):
+        json_report_filenames = [json_report_filenames]
+    if len(json_report_filenames) == 1:
+        # The tests are streamed from the file during rendering
+        return stream_report(json_report_filenames[0])
+    # The merged tests are also streamed from the files
+    return merge_report_files(json_report_filenames).stream_report()
+
+
+def get_templates():
     base_dir = os.path.dirname(os.path.realpath(__file__))
     templates = jinja2.Environment(
         loader=jinja2.FileSystemLoader(os.path.join(base_dir, "templates"))
     )
     configure_filters(templates)
-    with open(json_report_filename) as fp:
-        json_report = json.load(fp)
-        template = templates.get_template("report.jinja")
-        content = template.render(
+    return templates
+
+
+def write_html(content, html_report_filename=None, *, browser=False):
+    if html_report_filename:
+        html_report_filename = os.path.abspath(html_report_filename)
+        with open(html_report_filename, "w") as fp:
+            fp.writelines(content)
+        if browser:
+            webbrowser.open("file://" + html_report_filename)
+    else:
+        sys.stdout.writelines(content)
+
+
+def main(json_report_filename, html_report_filename=None, *, browser=False, lazy=False):
+    json_report = load_report(json_report_filename)
+    if lazy:
+        # The tests are compressed first (the lookups are built from the tests)
+        lazy_data = LazyReportData().add_tests(json_report["tests"])
+        template = get_templates().get_template("report-lazy.jinja")
+        content = template.generate(
+            data=json_report,
+            tests=lazy_data.encoded_tests(),
+            lookups=lazy_data.lookups(),
+            fixture_totals=lazy_data.fixture_totals.rows(),
+            delivery_latency=lazy_data.delivery_latency.summary(),
+            memory_chart=lazy_data.resource_timeline.chart(),
+        )
+    else:
+        template = get_templates().get_template("report.jinja")
+        content = template.generate(
             data=json_report,
             duration_format="%0.3f",
+            # An extra pass over the (streamed) tests
+            **session_totals(json_report["tests"]),
+        )
+
+    if browser and html_report_filename is None:
+        html_report_filename = "test-report.html"
+
+    write_html(content, html_report_filename, browser=browser)
+
+
+def compare_main(
+    base_filename: str,
+    head_filename: str,
+    html_report_filename=None,
+    *,
+    threshold: float = DEFAULT_THRESHOLD,
+    min_delta: float = DEFAULT_MIN_DELTA,
+    top: int = 10,
+    browser=False,
+) -> ReportComparison:
+    """Compare two test runs. The text comparison is written to stdout
+    and the HTML comparison is written if a filename is specified."""
+    base = stream_report(base_filename)
+    head = stream_report(head_filename)
+    comparison = ReportComparison(base["tests"], head["tests"], threshold, min_delta)
+    for line in format_text(comparison, top):
+        print(line)
+    if html_report_filename:
+        template = get_templates().get_template("compare.jinja")
+        content = template.generate(
+            comparison=comparison,
+            base=base,
+            head=head,
+            base_name=base_filename,
+            head_name=head_filename,
+            top=top,
         )
+        write_html(content, html_report_filename, browser=browser)
+    return comparison
 
-        if browser and html_report_filename is None:
-            html_report_filename = "test-report.html"
 
-        if html_report_filename:
-            html_report_filename = os.path.abspath(html_report_filename)
-            with open(html_report_filename, "w") as fp:
-                fp.write(content)
-            if browser:
-                webbrowser.open("file://" + html_report_filename)
-        else:
-            print(content)
+def matrix_main(
+    json_report_filenames: list[str], html_report_filename, *, browser=False
+):
+    matrix = load_matrix(json_report_filenames)
+    template = get_templates().get_template("matrix.jinja")
+    content = template.generate(data=matrix.data())
+    write_html(content, html_report_filename, browser=browser)
+    return matrix
 
 
 if __name__ == "__main__":
@@ -39,6 +123,7 @@ if __name__ == "__main__":
 
     parser = argparse.ArgumentParser()
     parser.add_argument("--browser", action="store_true")
-    parser.add_argument("report_data_file")
+    parser.add_argument("--lazy", action="store_true")
+    parser.add_argument("report_data_file", nargs="+")
     args = parser.parse_args()
-    main(args.report_data_file, browser=args.browser)
+    main(args.report_data_file, browser=args.browser, lazy=args.lazy)
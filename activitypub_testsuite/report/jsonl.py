@@ -0,0 +1,153 @@
+"""
+Incremental JSON Lines test results.
+
+Each line is a compact JSON object with an "event" key:
+
+* start - the session start time, root directory and environment
+* stage - a test stage (setup, call, teardown) result as it completes
+* finish - the final report header (summary, duration, exit code, environment)
+
+The stage details are the same as the stages in the JSON report. If the
+test run is killed, the results for all completed tests are still available
+(but there is no finish line).
+"""
+
+import json
+import os
+import time
+from typing import Any, Iterator
+
+from activitypub_testsuite.report.summary import summarize
+
+SEPARATORS = (",", ":")
+
+START_PREFIX = '{"event":"start"'
+STAGE_PREFIX = '{"event":"stage"'
+FINISH_PREFIX = '{"event":"finish"'
+
+
+class JsonLinesWriter:
+    def __init__(self, filename: str, buffer_size: int = 1 << 16):
+        self.fp = open(filename, "w", buffering=buffer_size)
+
+    def write(self, event: str, **data: Any) -> None:
+        self.fp.write(json.dumps({"event": event, **data}, separators=SEPARATORS))
+        self.fp.write("\n")
+
+    def flush(self) -> None:
+        # Completed tests survive if the process is killed
+        self.fp.flush()
+
+    def close(self) -> None:
+        self.fp.flush()
+        os.fsync(self.fp.fileno())
+        self.fp.close()
+
+
+def write_stage(
+    writer: JsonLinesWriter,
+    nodeid: str,
+    lineno: int | None,
+    when: str,
+    outcome: str,
+    stage: dict[str, Any],
+    metadata: dict[str, Any] | None = None,
+) -> None:
+    data = {
+        "nodeid": nodeid,
+        "lineno": lineno,
+        "when": when,
+        "outcome": outcome,
+        "stage": stage,
+        "finished": time.time(),
+    }
+    if metadata:
+        data["metadata"] = metadata
+    writer.write("stage", **data)
+    if when == "teardown":
+        writer.flush()
+
+
+def iter_jsonl_tests(filename: str) -> Iterator[dict[str, Any]]:
+    """Assemble the tests from the stage lines.
+
+    A test is complete after the teardown stage. Tests that never
+    completed (the run was killed) are returned at the end. Their outcome
+    is "error" unless a completed stage failed."""
+    pending: dict[str, dict[str, Any]] = {}
+    with open(filename) as fp:
+        for line in fp:
+            if not line.startswith(STAGE_PREFIX):
+                continue
+            data = json.loads(line)
+            nodeid = data["nodeid"]
+            test = pending.get(nodeid)
+            if test is None:
+                test = {"nodeid": nodeid, "lineno": data["lineno"], "outcome": "passed"}
+                pending[nodeid] = test
+            if "metadata" in data:
+                test["metadata"] = data["metadata"]
+            # The test outcome can differ from the stage outcome (xfailed, error)
+            if data["outcome"] not in ["passed", ""]:
+                test["outcome"] = data["outcome"]
+            test[data["when"]] = data["stage"]
+            if data["when"] == "teardown":
+                yield pending.pop(nodeid)
+    for test in pending.values():
+        if test["outcome"] == "passed":
+            test["outcome"] = "error"
+        yield test
+
+
+class StreamedJsonlTests:
+    """Re-iterable tests from a JSON Lines results file"""
+
+    def __init__(self, filename: str):
+        self.filename = filename
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        return iter_jsonl_tests(self.filename)
+
+
+def read_jsonl_header(filename: str) -> dict[str, Any]:
+    start = finish = None
+    last_finished = None
+    with open(filename) as fp:
+        for line in fp:
+            if line.startswith(FINISH_PREFIX):
+                finish = json.loads(line)
+            elif line.startswith(START_PREFIX):
+                start = json.loads(line)
+            elif line.startswith(STAGE_PREFIX):
+                last_finished = line
+    if finish:
+        del finish["event"]
+        return finish
+    # The run didn't finish. Reconstruct the header.
+    header = {"created": time.time(), "environment": {}}
+    if start:
+        del start["event"]
+        header.update(start)
+    end = json.loads(last_finished)["finished"] if last_finished else header["created"]
+    tests = iter_jsonl_tests(filename)  # streamed, only outcomes are counted
+    header.update(
+        {
+            "duration": end - header["created"],
+            # Same as pytest.ExitCode.INTERRUPTED
+            "exitcode": 2,
+            "summary": summarize(tests),
+        }
+    )
+    return header
+
+
+def stream_jsonl_report(filename: str) -> dict[str, Any]:
+    report = read_jsonl_header(filename)
+    report["tests"] = StreamedJsonlTests(filename)
+    return report
+
+
+def load_jsonl_report(filename: str) -> dict[str, Any]:
+    report = read_jsonl_header(filename)
+    report["tests"] = list(iter_jsonl_tests(filename))
+    return report
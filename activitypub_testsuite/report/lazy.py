@@ -0,0 +1,162 @@
+"""
+Compact, compressed test data for the lazily rendered HTML report.
+
+Only the values shown in the report are kept. The tests are compressed
+incrementally (gzip, base64 encoded) so the tests can be streamed from
+the JSON report. The browser decompresses the data and renders the
+result rows and test details on demand.
+"""
+
+import base64
+import json
+import zlib
+from typing import Any, Iterable
+
+from activitypub_testsuite.report.filters import (
+    get_metadata_value,
+    test_duration,
+    test_name,
+)
+from activitypub_testsuite.report.summary import (
+    SUMMARY_OUTCOMES,
+    DeliveryLatencyTotals,
+    FixtureTotals,
+    ResourceTimeline,
+    concurrency_chart,
+    delivery_chart,
+    fixture_durations,
+    retry_timeline,
+)
+
+OUTCOMES = SUMMARY_OUTCOMES
+
+STAGES = ["setup", "call", "teardown"]
+
+
+def test_details(test: dict[str, Any]) -> dict[str, Any]:
+    """The test detail values (the same values as the full report)"""
+    metadata = test.get("metadata") or {}
+    test_config = metadata.get("config") or {}
+    details = {}
+    reason = test_config.get("xfail") or test_config.get("skipped")
+    if not reason and "call" in test and test["call"].get("crash"):
+        reason = test["call"]["crash"]["message"]
+    if reason:
+        details["reason"] = reason
+    if test_config.get("bug"):
+        details["bug"] = True
+    if metadata.get("documentation"):
+        details["documentation"] = metadata["documentation"]
+    if metadata.get("params"):
+        details["params"] = {
+            key: str(value) for key, value in metadata["params"].items()
+        }
+    fixtures = fixture_durations(test)
+    if fixtures:
+        details["fixtures"] = fixtures
+    if metadata.get("server_output"):
+        details["server_output"] = metadata["server_output"]
+        details["server_output_dropped"] = metadata.get("server_output_dropped", 0)
+    if metadata.get("resources"):
+        details["resources"] = metadata["resources"]
+    if metadata.get("budget"):
+        details["budget"] = metadata["budget"]
+    if metadata.get("delivery_latency"):
+        details["delivery_latency"] = metadata["delivery_latency"]
+    if metadata.get("host_delivery"):
+        details["host_delivery"] = metadata["host_delivery"]
+    if metadata.get("retries"):
+        details["retries"] = [
+            {**schedule, "timeline": retry_timeline(schedule["attempts"])}
+            for schedule in metadata["retries"]
+        ]
+    if metadata.get("remote_concurrency"):
+        details["remote_concurrency"] = [
+            [host, usage["peak"], concurrency_chart(usage["series"])]
+            for host, usage in metadata["remote_concurrency"].items()
+        ]
+    if metadata.get("fanout"):
+        fanout = dict(metadata["fanout"])
+        fanout["chart"] = delivery_chart(fanout.pop("curve"))
+        details["fanout"] = fanout
+    details["stages"] = [
+        [stage, test[stage]["outcome"], test[stage]["duration"]]
+        for stage in STAGES
+        if stage in test
+    ]
+    return details
+
+
+class LazyReportData:
+    """Accumulates the compressed test data.
+
+    Each test is [name, outcome, duration, reqlevel, capabilities, details]
+    where outcome, reqlevel and capabilities are indices into the lookup lists.
+    """
+
+    def __init__(self):
+        # Outcomes that aren't in the summary (rerun, for example) are added
+        self.outcomes: list[str] = list(OUTCOMES)
+        self.reqlevels: list[str] = []
+        self.capabilities: list[str] = []
+        self.count = 0
+        self.fixture_totals = FixtureTotals()
+        self.delivery_latency = DeliveryLatencyTotals()
+        self.resource_timeline = ResourceTimeline()
+        self._capability_index: dict[str, int] = {}
+        self._compressor = zlib.compressobj(wbits=31)  # gzip format
+        self._chunks: list[bytes] = []
+
+    def _write(self, text: str) -> None:
+        self._chunks.append(self._compressor.compress(text.encode()))
+
+    def _outcome(self, outcome: str) -> int:
+        if outcome not in self.outcomes:
+            self.outcomes.append(outcome)
+        return self.outcomes.index(outcome)
+
+    def _reqlevel(self, reqlevel: str) -> int:
+        if reqlevel not in self.reqlevels:
+            self.reqlevels.append(reqlevel)
+        return self.reqlevels.index(reqlevel)
+
+    def _capability(self, capability: str) -> int:
+        if capability not in self._capability_index:
+            self._capability_index[capability] = len(self.capabilities)
+            self.capabilities.append(capability)
+        return self._capability_index[capability]
+
+    def add(self, test: dict[str, Any]) -> None:
+        metadata = test.get("metadata") or {}
+        record = [
+            test_name(test),
+            self._outcome(test["outcome"]),
+            round(test_duration(test), 6),
+            self._reqlevel(str(get_metadata_value(test, "ap_reqlevel"))),
+            [self._capability(c) for c in metadata.get("ap_capability", [])],
+            test_details(test),
+        ]
+        self.fixture_totals.add(test)
+        self.delivery_latency.add(test)
+        self.resource_timeline.add(test)
+        self._write(("[" if self.count == 0 else ",") + json.dumps(record))
+        self.count += 1
+
+    def add_tests(self, tests: Iterable[dict[str, Any]]) -> "LazyReportData":
+        for test in tests:
+            self.add(test)
+        return self
+
+    def encoded_tests(self) -> str:
+        """The base64 encoded, gzip compressed JSON array of tests"""
+        self._write("[" if self.count == 0 else "")
+        self._write("]")
+        self._chunks.append(self._compressor.flush())
+        return base64.b64encode(b"".join(self._chunks)).decode()
+
+    def lookups(self) -> dict[str, list[str]]:
+        return {
+            "outcomes": self.outcomes,
+            "reqlevels": self.reqlevels,
+            "capabilities": self.capabilities,
+        }
@@ -0,0 +1,122 @@
+"""
+Test x server matrix of outcomes and durations from several JSON reports.
+
+The reports are keyed by the project name (from the report_project_metadata
+fixture). Reports for the same project (shards, for example) are combined.
+The matrix is compact so it can be embedded in the HTML report as JSON and
+rendered in the browser.
+"""
+
+import os
+from collections import defaultdict
+from typing import Any, Iterable
+
+from activitypub_testsuite.report.filters import get_metadata_value, test_name
+from activitypub_testsuite.report.stream import stream_report
+from activitypub_testsuite.report.summary import SUMMARY_OUTCOMES
+
+OUTCOMES = SUMMARY_OUTCOMES
+# Outcomes counted as passing in the capability rollups
+PASSING_OUTCOMES = ["passed", "xpassed", "overbudget"]
+
+PROJECT_NAME_KEY = "Project Name"
+
+
+def project_name(report: dict[str, Any], filename: str) -> str:
+    project = report.get("environment", {}).get("Project") or {}
+    return project.get(PROJECT_NAME_KEY) or os.path.splitext(
+        os.path.basename(filename)
+    )[0].removesuffix("-report")
+
+
+def call_duration(test: dict[str, Any]) -> float | None:
+    return test["call"]["duration"] if "call" in test else None
+
+
+class ReportMatrix:
+    def __init__(self):
+        self.servers: list[str] = []
+        self.capabilities: list[str] = []
+        self.reqlevels: list[str] = []
+        self.outcomes = list(OUTCOMES)
+        # test name -> (reqlevel, capability indices, {server index: cell})
+        self.tests: dict[str, tuple[int, list[int], dict[int, list]]] = {}
+        self._capability_index: dict[str, int] = {}
+
+    def _index(self, values: list[str], value: str) -> int:
+        if value not in values:
+            values.append(value)
+        return values.index(value)
+
+    def _capability(self, capability: str) -> int:
+        if capability not in self._capability_index:
+            self._capability_index[capability] = len(self.capabilities)
+            self.capabilities.append(capability)
+        return self._capability_index[capability]
+
+    def add(self, server: str, tests: Iterable[dict[str, Any]]) -> None:
+        server_index = self._index(self.servers, server)
+        for test in tests:
+            name = test_name(test)
+            if name not in self.tests:
+                reqlevel = get_metadata_value(test, "ap_reqlevel")
+                capabilities = (test.get("metadata") or {}).get("ap_capability", [])
+                self.tests[name] = (
+                    self._index(self.reqlevels, str(reqlevel)),
+                    [self._capability(c) for c in capabilities],
+                    {},
+                )
+            duration = call_duration(test)
+            self.tests[name][2][server_index] = [
+                self._index(self.outcomes, test["outcome"]),
+                round(duration, 4) if duration is not None else None,
+            ]
+
+    def add_file(self, filename: str) -> None:
+        report = stream_report(filename)
+        self.add(project_name(report, filename), report["tests"])
+
+    def rollups(self) -> list[list[list[float]]]:
+        """Per capability and server: [passed, total, call duration]"""
+        rollups = defaultdict(lambda: [0, 0, 0.0])
+        for _, capabilities, cells in self.tests.values():
+            for server_index, (outcome, duration) in cells.items():
+                for capability in capabilities:
+                    rollup = rollups[capability, server_index]
+                    rollup[0] += self.outcomes[outcome] in PASSING_OUTCOMES
+                    rollup[1] += 1
+                    rollup[2] += duration or 0
+        return [
+            [
+                rollups[capability, server_index]
+                for server_index in range(len(self.servers))
+            ]
+            for capability in range(len(self.capabilities))
+        ]
+
+    def data(self) -> dict[str, Any]:
+        """The matrix data. Each test is [name, reqlevel, capabilities, cells]
+        and each cell is [outcome, call duration] (or null if not run)."""
+        return {
+            "servers": self.servers,
+            "outcomes": self.outcomes,
+            "reqlevels": self.reqlevels,
+            "capabilities": self.capabilities,
+            "rollups": self.rollups(),
+            "tests": [
+                [
+                    name,
+                    reqlevel,
+                    capabilities,
+                    [cells.get(i) for i in range(len(self.servers))],
+                ]
+                for name, (reqlevel, capabilities, cells) in self.tests.items()
+            ],
+        }
+
+
+def load_matrix(filenames: list[str]) -> ReportMatrix:
+    matrix = ReportMatrix()
+    for filename in filenames:
+        matrix.add_file(filename)
+    return matrix
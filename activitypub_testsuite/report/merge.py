@@ -0,0 +1,234 @@
+"""
+Merging of JSON test reports (from shards or parallel workers, for example).
+"""
+
+import heapq
+import json
+from typing import Any, Iterable, Iterator, TextIO
+
+from activitypub_testsuite.report.stream import stream_report
+from activitypub_testsuite.report.summary import summarize
+
+# Same as pytest.ExitCode
+EXIT_OK = 0
+EXIT_TESTS_FAILED = 1
+EXIT_NO_TESTS_COLLECTED = 5
+
+# Over-budget tests fail the run (see plugins.py)
+FAILED_OUTCOMES = ["failed", "error", "overbudget"]
+
+
+def merged_exitcode(outcomes: Iterable[str], source_exitcodes: Iterable[int]) -> int:
+    """The exit code for the merged test outcomes. An exit code for an
+    interrupted run or an internal or usage error in a source is kept."""
+    outcomes = list(outcomes)
+    if any(outcome in FAILED_OUTCOMES for outcome in outcomes):
+        return EXIT_TESTS_FAILED
+    other = [
+        exitcode
+        for exitcode in source_exitcodes
+        if exitcode not in [EXIT_OK, EXIT_TESTS_FAILED, EXIT_NO_TESTS_COLLECTED]
+    ]
+    if other:
+        return max(other)
+    return EXIT_OK if outcomes else EXIT_NO_TESTS_COLLECTED
+
+
+class MergedTests:
+    """Re-iterable merged tests. The tests are streamed from the reports."""
+
+    def __init__(self, merger: "ReportMerger"):
+        self.merger = merger
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        return self.merger.iter_tests()
+
+    def __len__(self) -> int:
+        return len(self.merger.index)
+
+
+class ReportMerger:
+    """Merges JSON reports in two passes.
+
+    The reports are added one at a time. Only an index of the test node
+    ids is kept in memory: the position of the test in the merged report,
+    the report it's taken from and its outcome. The merged tests are then
+    streamed from their reports (again) when the report is written.
+
+    Tests that are in more than one report (re-runs) are de-duplicated.
+    The test from the last report added is kept. The environment is taken
+    from the first report and the environment values that are different
+    in other reports are kept with the report source metadata. The exit
+    code is derived from the merged test outcomes."""
+
+    def __init__(self):
+        # node id -> [position, source index, index in source, outcome]
+        self.index: dict[str, list] = {}
+        self.source_tests: list[Iterable[dict[str, Any]]] = []
+        self.sources: list[dict[str, Any]] = []
+        self.warnings: list[dict[str, Any]] = []
+        self.header: dict[str, Any] | None = None
+        self.collected = 0
+        self.created = None
+        self.finished = None
+
+    def add(self, report: dict[str, Any], source: str | None = None) -> None:
+        """Add a report. Its tests must be re-iterable (a list or streamed tests)."""
+        if self.header is None:
+            self.header = {
+                key: value
+                for key, value in report.items()
+                if key not in ["summary", "tests", "warnings"]
+            }
+        environment = report.get("environment", {})
+        base_environment = self.header.get("environment", {})
+        self.sources.append(
+            {
+                "source": source,
+                "created": report["created"],
+                "duration": report["duration"],
+                "exitcode": report["exitcode"],
+                "summary": report["summary"],
+                "environment": {
+                    key: value
+                    for key, value in environment.items()
+                    if base_environment.get(key) != value
+                },
+            }
+        )
+        created = report["created"]
+        finished = created + report["duration"]
+        self.created = created if self.created is None else min(self.created, created)
+        self.finished = (
+            finished if self.finished is None else max(self.finished, finished)
+        )
+        self.collected = max(self.collected, report["summary"].get("collected", 0))
+        source_index = len(self.source_tests)
+        tests = report.get("tests", [])
+        self.source_tests.append(tests)
+        for i, test in enumerate(tests):
+            entry = self.index.get(test["nodeid"])
+            if entry is None:
+                self.index[test["nodeid"]] = [
+                    len(self.index),
+                    source_index,
+                    i,
+                    test["outcome"],
+                ]
+            else:
+                # A re-run replaces the test (in its original position)
+                entry[1:] = [source_index, i, test["outcome"]]
+        self.warnings.extend(report.get("warnings", []))
+
+    def add_file(self, filename: str) -> None:
+        """Add a JSON or JSON Lines report. The tests are streamed from the file."""
+        self.add(stream_report(filename), filename)
+
+    def _source_tests(self, source_index: int) -> Iterator[tuple[int, dict[str, Any]]]:
+        """The (position, test) of the merged tests taken from a report"""
+        for i, test in enumerate(self.source_tests[source_index]):
+            position, source, index, _ = self.index[test["nodeid"]]
+            if source == source_index and index == i:
+                yield position, test
+
+    def _unordered_sources(self) -> set[int]:
+        """The reports with merged tests that are not in position order.
+        These are usually re-runs (of failed tests, for example)."""
+        last_positions: dict[int, int] = {}
+        unordered = set()
+        for position, source, _, _ in sorted(
+            self.index.values(), key=lambda entry: (entry[1], entry[2])
+        ):
+            last_position = last_positions.get(source)
+            if last_position is not None and last_position > position:
+                unordered.add(source)
+            last_positions[source] = position
+        return unordered
+
+    def iter_tests(self) -> Iterator[dict[str, Any]]:
+        """Stream the merged tests from their reports, in position order.
+        The tests of a report that aren't in position order are sorted
+        in memory."""
+        unordered = self._unordered_sources()
+        for _, test in heapq.merge(
+            *(
+                sorted(self._source_tests(i), key=lambda item: item[0])
+                if i in unordered
+                else self._source_tests(i)
+                for i in range(len(self.source_tests))
+            ),
+            key=lambda item: item[0],
+        ):
+            yield test
+
+    @property
+    def tests(self) -> MergedTests:
+        return MergedTests(self)
+
+    @property
+    def exitcode(self) -> int:
+        return merged_exitcode(
+            (entry[3] for entry in self.index.values()),
+            (source["exitcode"] for source in self.sources),
+        )
+
+    def _merged_header(self) -> dict[str, Any]:
+        if self.header is None:
+            raise ValueError("No reports to merge")
+        header = dict(self.header)
+        header.update(
+            {
+                "created": self.created,
+                "duration": self.finished - self.created,
+                "exitcode": self.exitcode,
+                "summary": summarize(
+                    ({"outcome": entry[3]} for entry in self.index.values()),
+                    self.collected,
+                ),
+            }
+        )
+        if len(self.sources) > 1:
+            header["sources"] = self.sources
+        return header
+
+    def stream_report(self) -> dict[str, Any]:
+        """The merged report with tests that are streamed from the reports"""
+        report = self._merged_header()
+        report["tests"] = self.tests
+        report["warnings"] = self.warnings
+        return report
+
+    def report(self) -> dict[str, Any]:
+        """The merged report with the tests in memory"""
+        report = self.stream_report()
+        report["tests"] = list(report["tests"])
+        return report
+
+    def write(self, fp: TextIO) -> None:
+        """Write the merged report (compact JSON, one test per line)"""
+        fp.write("{")
+        for key, value in self._merged_header().items():
+            fp.write(f"{json.dumps(key)}: {json.dumps(value)},\n")
+        fp.write('"tests": [')
+        for i, test in enumerate(self.iter_tests()):
+            fp.write(",\n" if i > 0 else "\n")
+            fp.write(json.dumps(test))
+        fp.write(f'\n],\n"warnings": {json.dumps(self.warnings)}}}\n')
+
+
+def merge_reports(reports: list[dict[str, Any]]) -> dict[str, Any]:
+    """Merge JSON reports into one report.
+
+    The duration is the elapsed time from the first report start
+    to the last report end."""
+    merger = ReportMerger()
+    for report in reports:
+        merger.add(report)
+    return merger.report()
+
+
+def merge_report_files(filenames: list[str]) -> ReportMerger:
+    merger = ReportMerger()
+    for filename in filenames:
+        merger.add_file(filename)
+    return merger
@@ -0,0 +1,137 @@
+"""
+Incremental reading of (potentially very large) JSON reports.
+
+The top-level report values other than the "tests" array (environment,
+summary, warnings, etc.) are loaded into memory. The tests are decoded
+one at a time, each time the tests are iterated.
+"""
+
+import json
+from typing import Any, Iterator, TextIO
+
+from activitypub_testsuite.report.jsonl import stream_jsonl_report
+
+CHUNK_SIZE = 1 << 16
+
+_decoder = json.JSONDecoder()
+
+
+class JsonScanner:
+    """A minimal incremental scanner for JSON documents in a text file"""
+
+    def __init__(self, fp: TextIO, chunk_size: int = CHUNK_SIZE):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.index = 0
+        self.eof = False
+
+    def _fill(self, size: int | None = None) -> bool:
+        if self.eof:
+            return False
+        chunk = self.fp.read(size or self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.index :] + chunk
+        self.index = 0
+        return True
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character (without consuming it)"""
+        while True:
+            while self.index < len(self.buffer) and self.buffer[self.index].isspace():
+                self.index += 1
+            if self.index < len(self.buffer):
+                return self.buffer[self.index]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON document")
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' at offset {self.index}")
+        self.index += 1
+
+    def accept(self, char: str) -> bool:
+        if self.peek() == char:
+            self.index += 1
+            return True
+        return False
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.index)
+                # A number at the end of the buffer may be truncated
+                if end < len(self.buffer) or self.eof:
+                    self.index = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Read (at least) as much again so long values aren't rescanned often
+            self._fill(max(self.chunk_size, len(self.buffer)))
+
+    def object_items(self) -> Iterator[tuple[str, "JsonScanner"]]:
+        """Iterate the object keys. The caller must consume each value."""
+        self.expect("{")
+        if self.accept("}"):
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key, self
+            if self.accept("}"):
+                return
+            self.expect(",")
+
+    def array_values(self) -> Iterator[Any]:
+        self.expect("[")
+        if self.accept("]"):
+            return
+        while True:
+            yield self.value()
+            if self.accept("]"):
+                return
+            self.expect(",")
+
+
+class StreamedTests:
+    """Re-iterable tests from a JSON report file"""
+
+    def __init__(self, filename: str):
+        self.filename = filename
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        with open(self.filename) as fp:
+            scanner = JsonScanner(fp)
+            for key, _ in scanner.object_items():
+                if key == "tests":
+                    yield from scanner.array_values()
+                    return
+                scanner.value()
+
+
+def read_report_header(filename: str) -> dict[str, Any]:
+    """Read the top-level report values other than the tests. The values
+    after the tests (warnings, for example) are read by skipping the tests."""
+    header = {}
+    with open(filename) as fp:
+        scanner = JsonScanner(fp)
+        for key, _ in scanner.object_items():
+            if key == "tests":
+                for _ in scanner.array_values():
+                    pass
+            else:
+                header[key] = scanner.value()
+    return header
+
+
+def stream_report(filename: str) -> dict[str, Any]:
+    """A report with the header values and tests that are streamed from the file"""
+    if str(filename).endswith(".jsonl"):
+        return stream_jsonl_report(filename)
+    report = read_report_header(filename)
+    report["tests"] = StreamedTests(filename)
+    return report
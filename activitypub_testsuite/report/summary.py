@@ -0,0 +1,238 @@
+import math
+from collections import Counter
+from typing import Any, Iterable, Sequence
+
+SUMMARY_OUTCOMES = [
+    "passed",
+    "failed",
+    "error",
+    "skipped",
+    "xfailed",
+    "xpassed",
+    "overbudget",
+]
+
+
+PERCENTILES = [50, 90, 95, 99]
+
+
+def percentile(sorted_values: Sequence[float], p: float) -> float:
+    """Nearest-rank percentile of sorted values"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(p / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def latency_summary(latencies: list[float]) -> dict[str, float]:
+    latencies = sorted(latencies)
+    summary = {f"p{p}": round(percentile(latencies, p), 6) for p in PERCENTILES}
+    summary["mean"] = round(sum(latencies) / len(latencies), 6) if latencies else 0
+    summary["max"] = round(latencies[-1], 6) if latencies else 0
+    return summary
+
+
+def summarize(tests: Iterable[dict[str, Any]], collected: int | None = None):
+    """Count the test outcomes (like the pytest JSON report summary)"""
+    counts = Counter(test["outcome"] for test in tests)
+    summary = {
+        outcome: counts[outcome] for outcome in SUMMARY_OUTCOMES if counts[outcome]
+    }
+    summary["total"] = sum(counts.values())
+    summary["collected"] = summary["total"] if collected is None else collected
+    return summary
+
+
+def fixture_durations(test: dict[str, Any]) -> list[tuple[str, float, float]]:
+    """The (fixture, setup, teardown) durations of a test, slowest first"""
+    fixtures = (test.get("metadata") or {}).get("fixtures") or {}
+    durations = [
+        (name, values.get("setup", 0.0), values.get("teardown", 0.0))
+        for name, values in fixtures.items()
+    ]
+    return sorted(durations, key=lambda x: x[1] + x[2], reverse=True)
+
+
+class FixtureTotals:
+    """Suite-wide fixture setup and teardown durations"""
+
+    def __init__(self):
+        self.totals: dict[str, list] = {}
+
+    def add(self, test: dict[str, Any]) -> None:
+        for name, setup, teardown in fixture_durations(test):
+            total = self.totals.setdefault(name, [0, 0.0, 0.0])
+            total[0] += 1
+            total[1] += setup
+            total[2] += teardown
+
+    def rows(self) -> list[tuple[str, int, float, float]]:
+        """(fixture, test count, setup, teardown), slowest first"""
+        return sorted(
+            ((name, *total) for name, total in self.totals.items()),
+            key=lambda x: x[2] + x[3],
+            reverse=True,
+        )
+
+
+def fixture_totals(
+    tests: Iterable[dict[str, Any]]
+) -> list[tuple[str, int, float, float]]:
+    totals = FixtureTotals()
+    for test in tests:
+        totals.add(test)
+    return totals.rows()
+
+
+def test_delivery_latencies(test: dict[str, Any]) -> list[float]:
+    """The delivery latencies (outbox POST to remote receipt) of a test"""
+    latencies = (test.get("metadata") or {}).get("delivery_latency") or []
+    return [latency for _, _, latency in latencies]
+
+
+class DeliveryLatencyTotals:
+    """Suite-wide delivery latencies"""
+
+    def __init__(self):
+        self.latencies: list[float] = []
+        self.tests = 0
+
+    def add(self, test: dict[str, Any]) -> None:
+        latencies = test_delivery_latencies(test)
+        if latencies:
+            self.tests += 1
+            self.latencies.extend(latencies)
+
+    def summary(self) -> dict[str, Any] | None:
+        """The delivery count and latency percentiles (None if no deliveries)"""
+        if not self.latencies:
+            return None
+        return {
+            "count": len(self.latencies),
+            "tests": self.tests,
+            **latency_summary(self.latencies),
+        }
+
+
+class ResourceTimeline:
+    """Server memory (RSS) at the end of each test, in test order"""
+
+    def __init__(self):
+        self.points: list[tuple[str, int]] = []
+
+    def add(self, test: dict[str, Any]) -> None:
+        resources = (test.get("metadata") or {}).get("resources")
+        if resources:
+            self.points.append((test["nodeid"], resources["rss"]["end"]))
+
+    def chart(self, width: int = 800, height: int = 200) -> dict[str, Any] | None:
+        """SVG polyline points and the memory range (None if no samples)"""
+        if len(self.points) < 2:
+            return None
+        values = [rss for _, rss in self.points]
+        low, high = min(values), max(values)
+        scale = (high - low) or 1
+        step = width / (len(values) - 1)
+        return {
+            "width": width,
+            "height": height,
+            "points": " ".join(
+                f"{i * step:.1f},{height - (rss - low) / scale * height:.1f}"
+                for i, rss in enumerate(values)
+            ),
+            "start": values[0],
+            "end": values[-1],
+            "low": low,
+            "high": high,
+            "count": len(values),
+        }
+
+
+def delivery_chart(
+    curve: list[list[float]], width: int = 400, height: int = 150
+) -> dict[str, Any] | None:
+    """SVG polyline points for a delivery completion curve
+    (the number of inboxes delivered to over time)"""
+    if not curve:
+        return None
+    end = curve[-1][0] or 1
+    count = curve[-1][1]
+    points = [(0.0, 0)]
+    for t, delivered in curve:
+        points.extend([(t, delivered - 1), (t, delivered)])
+    return {
+        "width": width,
+        "height": height,
+        "points": " ".join(
+            f"{t / end * width:.1f},{height - n / count * height:.1f}"
+            for t, n in points
+        ),
+        "end": end,
+        "count": count,
+    }
+
+
+def retry_timeline(
+    attempts: list[list], width: int = 300, height: int = 16
+) -> dict[str, Any] | None:
+    """SVG marks for the attempts of a retried delivery, positioned by time.
+    The attempts are [time, status, Retry-After]."""
+    if not attempts:
+        return None
+    end = attempts[-1][0] or 1
+    radius = height // 2 - 1
+    return {
+        "width": width,
+        "height": height,
+        "radius": radius,
+        "end": end,
+        "marks": [
+            {
+                "x": round(radius + t / end * (width - 2 * radius), 1),
+                "time": t,
+                "status": status,
+                "ok": status is not None and status < 300,
+            }
+            for t, status, _ in attempts
+        ],
+    }
+
+
+def concurrency_chart(
+    series: list[list[float]], width: int = 400, height: int = 60
+) -> dict[str, Any] | None:
+    """SVG polyline points for the in-flight requests to a host over time
+    (a step line scaled to the peak)"""
+    if not series:
+        return None
+    end = series[-1][0] or 1
+    peak = max(count for _, count in series) or 1
+    points = [(0.0, 0)]
+    for t, count in series:
+        points.extend([(t, points[-1][1]), (t, count)])
+    return {
+        "width": width,
+        "height": height,
+        "points": " ".join(
+            f"{t / end * width:.1f},{height - n / peak * height:.1f}" for t, n in points
+        ),
+        "end": end,
+        "peak": peak,
+    }
+
+
+def session_totals(tests: Iterable[dict[str, Any]]) -> dict[str, Any]:
+    """Suite-wide fixture durations, delivery latency and
+    server memory timeline (one pass)"""
+    fixtures = FixtureTotals()
+    deliveries = DeliveryLatencyTotals()
+    resources = ResourceTimeline()
+    for test in tests:
+        fixtures.add(test)
+        deliveries.add(test)
+        resources.add(test)
+    return {
+        "fixture_totals": fixtures.rows(),
+        "delivery_latency": deliveries.summary(),
+        "memory_chart": resources.chart(),
+    }
@@ -0,0 +1,67 @@
+// Renders only the visible rows of a (potentially very large) list.
+// The rows have a fixed height so the scroll position maps to a row index.
+class VirtualRows {
+    constructor(container, rowHeight, renderRow) {
+        this.container = container;
+        this.rowHeight = rowHeight;
+        this.renderRow = renderRow;
+        this.indices = [];
+        this.pending = false;
+        this.body = document.createElement("div");
+        this.body.className = "virtual-rows";
+        container.appendChild(this.body);
+        container.addEventListener("scroll", () => this.schedule());
+        window.addEventListener("resize", () => this.schedule());
+    }
+
+    // Show the rows with the specified data indices (after filtering)
+    setRows(indices) {
+        this.indices = indices;
+        this.body.style.height = `${indices.length * this.rowHeight}px`;
+        this.container.scrollTop = 0;
+        this.render();
+    }
+
+    scrollToRow(index) {
+        const position = this.indices.indexOf(index);
+        if (position >= 0) {
+            this.container.scrollTop = position * this.rowHeight;
+            this.render();
+        }
+    }
+
+    schedule() {
+        if (!this.pending) {
+            this.pending = true;
+            requestAnimationFrame(() => {
+                this.pending = false;
+                this.render();
+            });
+        }
+    }
+
+    render() {
+        const overscan = 10;
+        const top = this.container.scrollTop;
+        const first = Math.max(0, Math.floor(top / this.rowHeight) - overscan);
+        const last = Math.min(
+            this.indices.length,
+            Math.ceil((top + this.container.clientHeight) / this.rowHeight) + overscan
+        );
+        const fragment = document.createDocumentFragment();
+        for (let i = first; i < last; i++) {
+            const row = this.renderRow(this.indices[i]);
+            row.style.top = `${i * this.rowHeight}px`;
+            row.style.height = `${this.rowHeight}px`;
+            fragment.appendChild(row);
+        }
+        this.body.replaceChildren(fragment);
+    }
+}
+
+function element(tag, className, text) {
+    const e = document.createElement(tag);
+    if (className) e.className = className;
+    if (text !== undefined) e.textContent = text;
+    return e;
+}
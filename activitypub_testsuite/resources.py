@@ -0,0 +1,135 @@
+"""
+Resource sampling of the server-under-test process (and its child processes).
+
+The samples are read from /proc (Linux only). A background thread samples
+the process tree periodically so the peak values during a test are captured.
+"""
+
+import os
+import threading
+from typing import Any
+
+SAMPLED_VALUES = ["rss", "cpu", "threads", "fds", "processes"]
+
+# Values that are reported as a change over the test (the others are levels)
+CUMULATIVE_VALUES = ["cpu"]
+
+
+def is_supported() -> bool:
+    return os.path.exists("/proc/self/stat")
+
+
+def child_pids(pid: int) -> list[int]:
+    children = []
+    try:
+        for task in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{task}/children") as fp:
+                children.extend(int(child) for child in fp.read().split())
+    except OSError:
+        pass
+    return children
+
+
+def process_tree(pid: int) -> list[int]:
+    pids = [pid]
+    for child in child_pids(pid):
+        pids.extend(process_tree(child))
+    return pids
+
+
+def read_process(pid: int) -> dict[str, float] | None:
+    """Read the resource usage of one process (None if the process is gone)"""
+    try:
+        with open(f"/proc/{pid}/stat") as fp:
+            stat = fp.read()
+        fds = len(os.listdir(f"/proc/{pid}/fd"))
+    except OSError:
+        return None
+    # The command name can contain spaces and parentheses
+    fields = stat[stat.rindex(")") + 2 :].split()
+    return {
+        "rss": int(fields[21]) * os.sysconf("SC_PAGE_SIZE"),
+        "cpu": (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK"),
+        "threads": int(fields[17]),
+        "fds": fds,
+    }
+
+
+def sample_process_tree(pid: int) -> dict[str, float]:
+    sample = {value: 0 for value in SAMPLED_VALUES}
+    for tree_pid in process_tree(pid):
+        usage = read_process(tree_pid)
+        if usage:
+            sample["processes"] += 1
+            for key, value in usage.items():
+                sample[key] += value
+    return sample
+
+
+class ResourceSampler:
+    """Samples a process tree in a background thread.
+
+    The usage is measured over windows (a test). The window result has
+    the usage at the start and end of the window, the change and the peak
+    values during the window."""
+
+    def __init__(self, pid: int, interval: float = 0.25):
+        self.pid = pid
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="aptest-resource-sampler", daemon=True
+        )
+        self._start: dict[str, float] | None = None
+        self._peak: dict[str, float] = {}
+
+    def start(self) -> "ResourceSampler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join(self.interval * 2 + 1)
+
+    def _record(self, sample: dict[str, float]) -> None:
+        with self._lock:
+            for key, value in sample.items():
+                self._peak[key] = max(self._peak.get(key, value), value)
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self._record(sample_process_tree(self.pid))
+
+    def begin(self) -> None:
+        """Start a measurement window"""
+        sample = sample_process_tree(self.pid)
+        with self._lock:
+            self._start = sample
+            self._peak = dict(sample)
+
+    def end(self) -> dict[str, Any] | None:
+        """End the measurement window and return the usage"""
+        sample = sample_process_tree(self.pid)
+        self._record(sample)
+        with self._lock:
+            start, self._start = self._start, None
+            peak = dict(self._peak)
+        if start is None:
+            return None
+        return window_usage(start, sample, peak)
+
+
+def window_usage(
+    start: dict[str, float], end: dict[str, float], peak: dict[str, float]
+) -> dict[str, Any]:
+    usage = {}
+    for key in SAMPLED_VALUES:
+        usage[key] = {
+            "start": start[key],
+            "end": end[key],
+            "delta": round(end[key] - start[key], 6),
+        }
+        if key not in CUMULATIVE_VALUES:
+            usage[key]["peak"] = peak[key]
+    return usage
@@ -0,0 +1,125 @@
+"""
+Retry schedules of deliveries to the simulated remote server.
+
+The attempts logged by the remote server (including the attempts that
+failed because of injected faults) are grouped by activity and inbox. An
+activity is identified by its id or, if it has none, by a hash of its
+canonical JSON. A schedule with more than one attempt is a retried
+delivery. Schedules can be checked against a backoff policy.
+"""
+
+import hashlib
+import json
+from dataclasses import dataclass, field
+from typing import Any, Iterable
+
+from activitypub_testsuite.http.faults import Attempt
+
+
+def activity_key(payload: Any) -> str | None:
+    """The activity id, or a hash of the canonical JSON if there is no id"""
+    if not isinstance(payload, dict):
+        return None
+    activity_id = payload.get("id")
+    if isinstance(activity_id, str) and activity_id:
+        return activity_id
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return f"sha256:{hashlib.sha256(canonical.encode()).hexdigest()}"
+
+
+@dataclass
+class RetrySchedule:
+    activity: str
+    host: str | None
+    inbox: str  # path
+    attempts: list[Attempt] = field(default_factory=list)
+
+    @property
+    def intervals(self) -> list[float]:
+        """Seconds between the starts of consecutive attempts"""
+        times = [attempt.started for attempt in self.attempts]
+        return [later - earlier for earlier, later in zip(times, times[1:])]
+
+    @property
+    def delivered(self) -> bool:
+        return any(attempt.status == 200 for attempt in self.attempts)
+
+    def to_json(self, start: float | None = None) -> dict[str, Any]:
+        """The schedule with attempt times (seconds) since the start
+        (default: the first attempt)"""
+        start = self.attempts[0].started if start is None else start
+        return {
+            "activity": self.activity,
+            "host": self.host,
+            "inbox": self.inbox,
+            # [time, status (None for a reset), Retry-After]
+            "attempts": [
+                [round(a.started - start, 6), a.status, a.retry_after]
+                for a in self.attempts
+            ],
+            "intervals": [round(interval, 6) for interval in self.intervals],
+            "delivered": self.delivered,
+        }
+
+
+def retry_schedules(
+    attempts: Iterable[Attempt], retried_only: bool = False
+) -> list[RetrySchedule]:
+    """The POST attempts grouped by activity and inbox (in the order of the
+    first attempt)"""
+    schedules: dict[tuple[str, str | None, str], RetrySchedule] = {}
+    for attempt in sorted(attempts, key=lambda a: a.started):
+        key = activity_key(attempt.json) if attempt.method == "POST" else None
+        if key is None:
+            continue
+        schedule = schedules.setdefault(
+            (key, attempt.host, attempt.path),
+            RetrySchedule(key, attempt.host, attempt.path),
+        )
+        schedule.attempts.append(attempt)
+    return [
+        schedule
+        for schedule in schedules.values()
+        if not retried_only or len(schedule.attempts) > 1
+    ]
+
+
+@dataclass
+class BackoffPolicy:
+    # Minimum seconds before the first retry
+    min_interval: float = 1.0
+    # Minimum growth of each interval over the previous one (1.0: the
+    # intervals must not shrink, 2.0: exponential backoff)
+    factor: float = 1.0
+    # Allowed shortfall of an interval (for random jitter), as a fraction
+    jitter: float = 0.1
+    # Maximum number of attempts (None: no limit)
+    max_attempts: int | None = None
+    # The interval after a response with Retry-After must be at least that long
+    retry_after: bool = True
+
+
+def check_backoff(schedule: RetrySchedule, policy: BackoffPolicy) -> list[str]:
+    """The violations of the backoff policy by a retry schedule"""
+    problems = []
+    attempts = schedule.attempts
+    if policy.max_attempts is not None and len(attempts) > policy.max_attempts:
+        problems.append(f"{len(attempts)} attempts (maximum {policy.max_attempts})")
+    minimum = policy.min_interval
+    for index, interval in enumerate(schedule.intervals):
+        retry_after = attempts[index].retry_after if policy.retry_after else None
+        required = max(minimum, retry_after or 0)
+        if interval < required * (1 - policy.jitter):
+            problems.append(
+                f"retry {index + 1} after {interval:0.3f}s (minimum {required:0.3f}s)"
+            )
+        minimum = max(policy.min_interval, interval * policy.factor)
+    return problems
+
+
+def assert_backoff(schedule: RetrySchedule, policy: BackoffPolicy) -> None:
+    problems = check_backoff(schedule, policy)
+    assert not problems, (
+        f"Retries of {schedule.activity} to {schedule.inbox} do not follow "
+        f"the backoff policy: {'; '.join(problems)}"
+    )
@@ -14,6 +14,10 @@ import rfc3987
 
 from .ap import AS2_CONTEXT, get_id, get_types
 from .interfaces import DEFAULT_AP_MEDIA_TYPE, Actor, HttpResponse
+from .tracing import span, traced
+
+# Local test suite state (probe results, duration history, etc.)
+APTEST_DIRECTORY = ".aptest"
 
 
 class BaseActor(ABC, Actor):
@@ -127,6 +131,7 @@ class BaseActor(ABC, Actor):
         """Add an item to a collection."""
         raise NotImplementedError()
 
+    @traced("actor.wait_for_collection_state")
     def wait_for_collection_state(
         self,
         collection_uri,
@@ -140,7 +145,8 @@ class BaseActor(ABC, Actor):
             uris = self.get_collection_item_uris(collection_uri)
             if state_predicate(uris):
                 break
-            time.sleep(period)
+            with span("poll.sleep", period=period):
+                time.sleep(period)
         return uris
 
     def assert_eventually_in_collection(
@@ -152,6 +158,7 @@ class BaseActor(ABC, Actor):
         uris = self.wait_for_collection_state(collection_uri, item_uri_observed)
         assert item_uri in uris
 
+    @traced("actor.get_collection_item_uris")
     def get_collection_item_uris(self, collection_uri: str):
         items = []
         self._get_collection_item_uris(collection_uri, items)
@@ -201,6 +208,7 @@ class BaseActor(ABC, Actor):
         """Set properties on an object."""
         raise NotImplementedError()
 
+    @traced("actor.get_json")
     def get_json(self, url: str | dict, proxy=False, exception=True) -> dict:
         """Get an object as a JSON-LD document. Handles authentication."""
         accepted_media = "application/activity+json; q=1.0, application/json; q=0.8"
@@ -1,9 +1,16 @@
+import re
 from urllib.parse import urlparse
 
 import pytest
 
 from activitypub_testsuite.ap import ACCEPTED_MEDIA_TYPES, assert_id_and_type
-from activitypub_testsuite.interfaces import Actor, RemoteCommunicator
+from activitypub_testsuite.delivery import DeliveryTracker
+from activitypub_testsuite.interfaces import (
+    Actor,
+    RemoteCommunicator,
+    ServerTestSupport,
+)
+from activitypub_testsuite.retries import BackoffPolicy, assert_backoff, retry_schedules
 
 
 @pytest.mark.ap_reqlevel("MUST")
@@ -64,6 +71,7 @@ def test_outbox_delivery_local(local_actor, recipient_key, local_actor2):
         pytest.param("audience", marks=pytest.mark.ap_capability("c2s.audience.delivery")),
     ],
 )
+@pytest.mark.ap_capability("s2s.delivery")
 def test_outbox_delivery_remote(
     local_actor: Actor,
     recipient_key: str,
@@ -94,6 +102,182 @@ def test_outbox_delivery_remote(
     assert delivered_activity["id"] == activity_uri
 
 
+# Number of fast simulated remote hosts in the head-of-line blocking test
+FAST_HOSTS = 4
+
+
+@pytest.mark.ap_capability("s2s.delivery")
+def test_outbox_delivery_slow_host_isolation(
+    server_support: ServerTestSupport,
+    local_actor: Actor,
+    remote_http_server,
+    delivery_tracker: DeliveryTracker,
+    test_config,
+    json_metadata,
+):
+    """A slow remote host should not delay delivery to other hosts. A post is
+    addressed to an actor on a very slow host (listed first) and actors on
+    several fast hosts. The fast hosts must receive the post within a bound
+    that does not depend on the slow host. The slow host response delay
+    (slow_delay, default: 10 seconds) and the bound (max_fast_seconds,
+    default: 3 seconds) can be set in the test configuration."""
+    slow_delay = test_config.get("slow_delay", 10.0)
+    max_fast_seconds = test_config.get("max_fast_seconds", 3.0)
+
+    hosts = ["hol_slow"] + [f"hol_fast_{i}" for i in range(FAST_HOSTS)]
+    recipients = {
+        host: server_support.get_remote_actor(f"{host}_actor", host=host)
+        for host in hosts
+    }
+    remote_http_server.faults.add(host="hol_slow", method="POST", delay=slow_delay)
+
+    delivery_tracker.expect(recipient.inbox for recipient in recipients.values())
+    delivery_tracker.begin()
+    response = local_actor.post(
+        local_actor.outbox,
+        local_actor.make_activity(
+            {
+                "to": [recipient.id for recipient in recipients.values()],
+                "object": local_actor.make_object(),
+            }
+        ),
+    )
+    activity_uri = response.headers["Location"]
+
+    fast_inboxes = [recipients[host].inbox for host in hosts[1:]]
+    delivery_tracker.wait(
+        activity_uri, max_fast_seconds, settle=0, inboxes=fast_inboxes
+    )
+    # Record when the slow host received the post (not part of the check)
+    delivery_tracker.wait(activity_uri, slow_delay + max_fast_seconds, settle=0)
+
+    receive_times = delivery_tracker.receive_times(activity_uri)
+    # [host, receive time, injected response delay]
+    json_metadata["host_delivery"] = [
+        [host, receive_times[recipient.inbox], slow_delay if host == hosts[0] else 0]
+        for host, recipient in recipients.items()
+    ]
+
+    fast_times = {host: receive_times[recipients[host].inbox] for host in hosts[1:]}
+    late = {
+        host: received
+        for host, received in fast_times.items()
+        if received is None or received > max_fast_seconds
+    }
+    assert not late, (
+        f"Delivery to fast hosts took longer than {max_fast_seconds}s "
+        f"with a slow host ({slow_delay}s): {late}"
+    )
+
+
+@pytest.mark.ap_capability("s2s.delivery")
+@pytest.mark.parametrize(
+    "failure",
+    [
+        pytest.param({"status": 503}, id="unavailable"),
+        pytest.param({"status": 429, "retry_after": 2}, id="rate_limited"),
+    ],
+)
+def test_outbox_delivery_retry_backoff(
+    local_actor: Actor,
+    remote_actor: Actor,
+    remote_http_server,
+    delivery_tracker: DeliveryTracker,
+    failure: dict,
+    test_config,
+):
+    """Failed deliveries should be retried with backoff. The first deliveries
+    to the remote inbox fail (retry_failures, default: 2) and the delivery
+    must succeed within retry_timeout (default: 60 seconds). The intervals
+    between the attempts must follow the backoff policy: at least
+    backoff_min_interval seconds (default: 1), growing by backoff_factor
+    (default: 1, not shrinking), at most backoff_max_attempts attempts and
+    honoring Retry-After. The retry timeline is recorded in the test report."""
+    failures = test_config.get("retry_failures", 2)
+    policy = BackoffPolicy(
+        min_interval=test_config.get("backoff_min_interval", 1.0),
+        factor=test_config.get("backoff_factor", 1.0),
+        max_attempts=test_config.get("backoff_max_attempts"),
+    )
+    remote_http_server.faults.add(
+        path=f"^{re.escape(urlparse(remote_actor.inbox).path)}$",
+        method="POST",
+        first=failures,
+        **failure,
+    )
+
+    delivery_tracker.expect([remote_actor.inbox])
+    response = local_actor.post(
+        local_actor.outbox,
+        local_actor.make_activity(
+            {"to": remote_actor.id, "object": local_actor.make_object()}
+        ),
+    )
+    activity_uri = response.headers["Location"]
+
+    delivered = delivery_tracker.wait(
+        activity_uri, test_config.get("retry_timeout", 60.0)
+    )
+    schedules = [
+        schedule
+        for schedule in retry_schedules(remote_http_server.faults.attempts)
+        if schedule.activity == activity_uri
+    ]
+    assert delivered and schedules, f"Not delivered after {failures} failures"
+    assert_backoff(schedules[0], policy)
+
+
+# Number of remote recipients on one host in the concurrency limit test
+CONCURRENCY_RECIPIENTS = 20
+
+
+@pytest.mark.ap_capability("s2s.delivery")
+def test_outbox_delivery_host_concurrency_limit(
+    server_support: ServerTestSupport,
+    local_actor: Actor,
+    remote_http_server,
+    delivery_tracker: DeliveryTracker,
+    test_config,
+):
+    """The server should limit the number of concurrent requests to a remote
+    host. A post is addressed to many actors on one simulated host that
+    handles requests concurrently and takes a while to accept each delivery
+    (host_delay, default: 0.5 seconds). The peak number of in-flight
+    requests to the host must not exceed max_host_concurrency (default: 10).
+    The in-flight requests over time are recorded in the test report."""
+    host_delay = test_config.get("host_delay", 0.5)
+    max_concurrency = test_config.get("max_host_concurrency", 10)
+
+    host = "concurrency_host"
+    remote_http_server.get_virtual_host(host, concurrent=True)
+    remote_http_server.faults.add(host=host, method="POST", delay=host_delay)
+    recipients = [
+        server_support.get_remote_actor(f"concurrency_actor_{i}", host=host)
+        for i in range(CONCURRENCY_RECIPIENTS)
+    ]
+
+    delivery_tracker.expect(recipient.inbox for recipient in recipients)
+    response = local_actor.post(
+        local_actor.outbox,
+        local_actor.make_activity(
+            {
+                "to": [recipient.id for recipient in recipients],
+                "object": local_actor.make_object(),
+            }
+        ),
+    )
+    activity_uri = response.headers["Location"]
+    delivered = delivery_tracker.wait(
+        activity_uri, CONCURRENCY_RECIPIENTS * host_delay + 10, settle=0
+    )
+
+    peak = remote_http_server.concurrency.peak(host)
+    assert (
+        peak <= max_concurrency
+    ), f"{peak} concurrent requests to one host (maximum {max_concurrency})"
+    assert delivered, "The post was not delivered to every recipient"
+
+
 # TODO (B) @review AP Section 7. - Servers performing delivery to the inbox or
 # sharedInbox properties of actors on other servers MUST provide the object property
 # in the activity: Create, Update, Delete, Follow, Add, Remove, Like, Block, Undo.
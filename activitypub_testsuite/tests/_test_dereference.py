@@ -0,0 +1,130 @@
+import uuid
+
+import pytest
+
+from activitypub_testsuite.dereference import (
+    actor_fetches,
+    actor_urls,
+    fetch_counts,
+    page_fetches,
+    wait_until_idle,
+)
+from activitypub_testsuite.interfaces import Actor, ServerTestSupport
+from activitypub_testsuite.support import rfc3339_datetime
+
+# Number of activities posted by the remote actor
+BURST_SIZE = 10
+
+# Collections of the remote actor in the crawl budget test
+LARGE_COLLECTIONS = ["followers", "following", "outbox"]
+
+
+@pytest.mark.ap_capability("s2s.inbox.post")
+def test_remote_actor_fetch_caching(
+    server_support: ServerTestSupport,
+    local_actor: Actor,
+    remote_http_server,
+    test_config,
+    json_metadata,
+):
+    """A burst of signed activities from one remote actor. The server should
+    cache the remote actor profile and public key instead of dereferencing
+    them for every inbox POST. The maximum number of fetches can be set
+    for a server with the max_fetches test configuration (default: 2)."""
+    max_fetches = test_config.get("max_fetches", 2)
+
+    # A new actor so the server has not cached it in earlier tests
+    remote_actor = server_support.get_remote_actor(f"fetch_{uuid.uuid4().hex[:8]}")
+
+    activity_ids = []
+    for _ in range(BURST_SIZE):
+        activity = remote_actor.setup_activity(
+            {
+                "to": local_actor.id,
+                "object": remote_actor.make_object({"published": rfc3339_datetime()}),
+            }
+        )
+        remote_actor.post(local_actor.inbox, activity)
+        activity_ids.append(activity["id"])
+
+    local_actor.assert_eventually_in_collection(local_actor.inbox, activity_ids[-1])
+    wait_until_idle(remote_http_server)
+
+    fetches = actor_fetches(remote_http_server.requests, remote_actor)
+    json_metadata["dereference"] = {
+        "activities": BURST_SIZE,
+        "actor_fetches": fetches,
+        "max_fetches": max_fetches,
+        "fetch_counts": dict(fetch_counts(remote_http_server.requests)),
+    }
+
+    assert fetches <= max_fetches, (
+        f"{fetches} fetches of {', '.join(actor_urls(remote_actor))} "
+        f"for {BURST_SIZE} activities (maximum {max_fetches})"
+    )
+
+
+@pytest.mark.ap_capability("s2s.inbox.post")
+@pytest.mark.parametrize(
+    "trigger",
+    [
+        pytest.param(
+            "Follow", marks=pytest.mark.ap_capability("s2s.inbox.post.Accept.Follow")
+        ),
+        pytest.param(
+            "Update", marks=pytest.mark.ap_capability("s2s.inbox.post.Update")
+        ),
+    ],
+)
+def test_remote_collection_crawl_budget(
+    server_support: ServerTestSupport,
+    local_actor: Actor,
+    remote_http_server,
+    trigger: str,
+    test_config,
+    json_metadata,
+):
+    """A remote actor with very large followers, following and outbox
+    collections. After following the actor (Follow) or receiving an update
+    of the actor profile (Update), the server should not crawl the
+    collections. The maximum number of pages fetched can be set for a server
+    with the max_pages test configuration (default: 10) and the collection
+    sizes with collection_size (default: 100000)."""
+    max_pages = test_config.get("max_pages", 10)
+    collection_size = test_config.get("collection_size", 100_000)
+
+    remote_actor = server_support.get_remote_actor(f"crawl_{uuid.uuid4().hex[:8]}")
+    collections = [
+        remote_actor.setup_paged_collection(name, collection_size)
+        for name in LARGE_COLLECTIONS
+    ]
+
+    if trigger == "Follow":
+        follow_activity = local_actor.setup_activity(
+            {"type": "Follow", "object": remote_actor.id}
+        )
+        activity = remote_actor.setup_activity(
+            {"type": "Accept", "object": follow_activity["id"]}
+        )
+    else:
+        activity = remote_actor.setup_activity(
+            {"type": "Update", "to": local_actor.id, "object": remote_actor.profile}
+        )
+    remote_actor.post(local_actor.inbox, activity)
+    wait_until_idle(remote_http_server)
+
+    pages = {
+        collection.id: page_fetches(remote_http_server.requests, collection.id)
+        for collection in collections
+    }
+    json_metadata["dereference"] = {
+        "collection_size": collection_size,
+        "page_fetches": pages,
+        "max_pages": max_pages,
+    }
+
+    total = sum(pages.values())
+    assert total <= max_pages, (
+        f"{total} collection pages fetched after {trigger} (maximum {max_pages}): "
+        + ", ".join(f"{url} ({count})" for url, count in pages.items() if count)
+    )
@@ -0,0 +1,66 @@
+import pytest
+
+from activitypub_testsuite.ap import PUBLIC_URI
+from activitypub_testsuite.delivery import (
+    DeliveryTracker,
+    FanoutConfig,
+    RemoteFollowers,
+    actor_delivery_inbox,
+    format_fanout_summary,
+)
+from activitypub_testsuite.interfaces import Actor, ServerTestSupport
+
+
+@pytest.mark.ap_load
+@pytest.mark.ap_capability("s2s.delivery", "collections.followers", "s2s.sharedInbox")
+def test_outbox_delivery_fanout(
+    server_support: ServerTestSupport,
+    local_actor: Actor,
+    remote_followers: RemoteFollowers,
+    fanout_config: FanoutConfig,
+    delivery_tracker: DeliveryTracker,
+    json_metadata,
+):
+    """Delivery of one post to many remote followers. The followers are
+    spread across several simulated remote hosts, some with a shared inbox.
+    The time until every expected inbox has received the post is measured
+    and the missed and duplicate deliveries are counted."""
+
+    def has_shared_inbox(host_index: int) -> bool:
+        every = fanout_config.shared_inbox_every
+        return every > 0 and host_index % every == 0
+
+    followers = [
+        server_support.get_remote_actor(
+            f"fanout_follower_{i}",
+            host=f"fanout_host_{i % fanout_config.hosts}",
+            shared_inbox=has_shared_inbox(i % fanout_config.hosts),
+        )
+        for i in range(fanout_config.followers)
+    ]
+
+    assert remote_followers.add(followers), "Follows were not accepted"
+
+    delivery_tracker.expect(actor_delivery_inbox(follower) for follower in followers)
+    delivery_tracker.begin()
+    response = local_actor.post(
+        local_actor.outbox,
+        local_actor.make_activity(
+            {
+                "to": PUBLIC_URI,
+                "cc": local_actor.followers,
+                "object": local_actor.make_object(
+                    {"type": "Note", "content": "Fan-out delivery"}
+                ),
+            }
+        ),
+    )
+    activity_uri = response.headers["Location"]
+
+    delivery_tracker.wait(activity_uri, fanout_config.timeout)
+    summary = delivery_tracker.summary(activity_uri)
+    json_metadata["fanout"] = summary
+    print("\n".join(format_fanout_summary(summary)))
+
+    assert summary["missed"] == 0, f"Missed deliveries: {summary['missed_inboxes']}"
+    assert summary["duplicates"] == 0, "Duplicate deliveries"
@@ -112,6 +112,7 @@ def test_inbox_reject_of_local_follow_doesnt_add_actor_to_following(
 @pytest.mark.ap_capability(
     "s2s.inbox.post.Undo.Follow",
     "collections.followers",
+    "s2s.delivery",
 )
 def test_inbox_undo_follow(
     remote_actor: Actor, local_actor: Actor, remote_communicator: RemoteCommunicator
@@ -6,6 +6,7 @@ from activitypub_testsuite.interfaces import Actor
 
 @pytest.mark.ap_capability("s2s.inbox.post.Like")
 @pytest.mark.ap_reqlevel("SHOULD")
+@pytest.mark.ap_capability("collections.likes")
 def test_inbox_like_local(
     remote_actor: Actor,
     local_actor: Actor,
@@ -51,6 +52,7 @@ def test_inbox_like_local(
 
 @pytest.mark.ap_capability("s2s.inbox.post.Like")
 @pytest.mark.ap_reqlevel("SHOULD")
+@pytest.mark.ap_capability("collections.liked")
 def test_outbox_like_local(local_actor):
     """AP 6.8 Like Activity. The Like activity indicates the actor likes the object.
     The side effect of receiving this in an outbox is that the server SHOULD
@@ -95,6 +97,7 @@ def test_outbox_like_local(local_actor):
 
 @pytest.mark.ap_capability("s2s.inbox.post.Like")
 @pytest.mark.ap_reqlevel("SHOULD")
+@pytest.mark.ap_capability("collections.likes")
 def test_inbox_undo_like(
     local_actor: Actor,
     remote_actor: Actor,
@@ -161,6 +164,7 @@ def test_inbox_undo_like(
 
 @pytest.mark.ap_capability("s2s.inbox.post.Like")
 @pytest.mark.ap_capability("s2s.inbox.post.Undo")
+@pytest.mark.ap_capability("collections.liked")
 def test_outbox_undo_like(
     local_actor: Actor,
     remote_actor: Actor,
@@ -0,0 +1,40 @@
+import pytest
+
+from activitypub_testsuite.delivery import UndoLog
+from activitypub_testsuite.interfaces import Actor, ServerTestSupport
+from activitypub_testsuite.load import LoadConfig, make_inbox_sender, run_load
+
+
+@pytest.mark.ap_load
+@pytest.mark.ap_capability("s2s.inbox.post")
+def test_inbox_load(
+    server_support: ServerTestSupport,
+    local_actor: Actor,
+    local_actor2: Actor,
+    load_config: LoadConfig,
+    load_undo_log: UndoLog,
+    record_load_result,
+):
+    """Sustained inbox traffic from many remote actors. Signed activities
+    are posted to the local actor inboxes at the configured rate (or
+    concurrency) for the configured duration. The throughput, latency
+    percentiles and error rates are recorded in the test report. The
+    likes and follows are undone after the test."""
+
+    senders = [
+        server_support.get_remote_actor(f"load_actor_{i}")
+        for i in range(load_config.senders)
+    ]
+    liked_object = local_actor.setup_object({"type": "Note", "cc": "as:Public"})
+
+    send = make_inbox_sender(
+        senders,
+        [local_actor, local_actor2],
+        load_config.activity_types,
+        liked_object_uri=liked_object["id"],
+        undo_log=load_undo_log,
+    )
+    result = run_load(send, load_config)
+    record_load_result(result)
+
+    assert result.samples, "No load requests were sent"
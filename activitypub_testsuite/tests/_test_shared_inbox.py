@@ -1,4 +1,12 @@
-# TODO (C) @tests shared inbox tests
+import pytest
+
+from activitypub_testsuite.ap import PUBLIC_URI
+from activitypub_testsuite.delivery import (
+    DeliveryTracker,
+    RemoteFollowers,
+    actor_delivery_inbox,
+)
+from activitypub_testsuite.interfaces import Actor, ServerTestSupport
 
 #
 # Shared Inbox
@@ -7,8 +15,140 @@
 # TODO  (C) @tests AP vSection 4.1 Reading from the sharedInbox endpoint MUST NOT
 # present objects which are not addressed to the Public endpoint.
 
-# TODO (C) @tests AP Section 7.1.3 Origin servers sending publicly addressed activities
+
+def _post_public_note(local_actor: Actor, to: list[str], content: str) -> str:
+    response = local_actor.post(
+        local_actor.outbox,
+        local_actor.make_activity(
+            {
+                "to": [PUBLIC_URI, *to],
+                "cc": local_actor.followers,
+                "object": local_actor.make_object({"type": "Note", "content": content}),
+            }
+        ),
+    )
+    return response.headers["Location"]
+
+
+@pytest.mark.ap_capability("s2s.delivery", "collections.followers", "s2s.sharedInbox")
+def test_shared_inbox_delivery_deduplicated(
+    server_support: ServerTestSupport,
+    local_actor: Actor,
+    remote_followers: RemoteFollowers,
+    delivery_tracker: DeliveryTracker,
+    test_config,
+    json_metadata,
+):
+    """A public post to many followers on a few simulated remote hosts that
+    have a shared inbox. The server should deliver the post once to the
+    shared inbox of each host instead of once to each follower's inbox.
+    The number of hosts and followers can be set for a server with the
+    shared_hosts (default: 3) and followers_per_host (default: 10) test
+    configuration."""
+    hosts = test_config.get("shared_hosts", 3)
+    followers_per_host = test_config.get("followers_per_host", 10)
+    timeout = test_config.get("delivery_timeout", 30)
+
+    followers = [
+        server_support.get_remote_actor(
+            f"shared_follower_{host}_{i}",
+            host=f"shared_host_{host}",
+            shared_inbox=True,
+        )
+        for host in range(hosts)
+        for i in range(followers_per_host)
+    ]
+    assert remote_followers.add(followers), "Follows were not accepted"
+
+    shared_inboxes = sorted({actor_delivery_inbox(f) for f in followers})
+    delivery_tracker.expect(shared_inboxes)
+    delivery_tracker.begin()
+    activity_uri = _post_public_note(local_actor, [], "Shared inbox delivery")
+
+    delivery_tracker.wait(activity_uri, timeout)
+    shared_counts = delivery_tracker.receipt_counts(activity_uri)
+    individual_counts = delivery_tracker.receipt_counts(
+        activity_uri, [follower.inbox for follower in followers]
+    )
+    individual = sum(individual_counts.values())
+    json_metadata["shared_inbox"] = {
+        "followers": len(followers),
+        "shared_inboxes": shared_counts,
+        "individual_deliveries": individual,
+    }
+
+    assert individual == 0, (
+        f"{individual} deliveries to follower inboxes "
+        f"instead of {len(shared_inboxes)} shared inboxes"
+    )
+    missed = [inbox for inbox, count in shared_counts.items() if count == 0]
+    assert not missed, f"Missed shared inbox deliveries: {missed}"
+    duplicated = [inbox for inbox, count in shared_counts.items() if count > 1]
+    assert not duplicated, f"Duplicate shared inbox deliveries: {duplicated}"
+
+
+# AP Section 7.1.3 Origin servers sending publicly addressed activities
 # to sharedInbox endpoints MUST still deliver to actors and collections
 # otherwise addressed (through to, bto, cc, bcc, and audience) which
 # do not have a sharedInbox and would not otherwise receive the
 # activity through the sharedInbox mechanism.
+@pytest.mark.ap_capability("s2s.delivery", "collections.followers", "s2s.sharedInbox")
+def test_shared_inbox_delivery_without_shared_inbox(
+    server_support: ServerTestSupport,
+    local_actor: Actor,
+    remote_followers: RemoteFollowers,
+    delivery_tracker: DeliveryTracker,
+    test_config,
+    json_metadata,
+):
+    """A public post to followers on a simulated host with a shared inbox,
+    followers on a host without one and a directly addressed actor on a
+    third host without one. The post should be delivered once to the shared
+    inbox and to the inbox of every actor that does not have a shared inbox.
+    The number of followers on each host can be set for a server with the
+    followers_per_host test configuration (default: 10)."""
+    followers_per_host = test_config.get("followers_per_host", 10)
+    timeout = test_config.get("delivery_timeout", 30)
+
+    shared_followers = [
+        server_support.get_remote_actor(
+            f"mixed_shared_follower_{i}", host="mixed_shared_host", shared_inbox=True
+        )
+        for i in range(followers_per_host)
+    ]
+    individual_followers = [
+        server_support.get_remote_actor(
+            f"mixed_individual_follower_{i}", host="mixed_individual_host"
+        )
+        for i in range(followers_per_host)
+    ]
+    direct_recipient = server_support.get_remote_actor(
+        "mixed_direct_recipient", host="mixed_direct_host"
+    )
+    assert remote_followers.add(
+        shared_followers + individual_followers
+    ), "Follows were not accepted"
+
+    shared_inbox = actor_delivery_inbox(shared_followers[0])
+    individual_inboxes = [
+        actor.inbox for actor in [*individual_followers, direct_recipient]
+    ]
+    delivery_tracker.expect([shared_inbox, *individual_inboxes])
+    delivery_tracker.begin()
+    activity_uri = _post_public_note(
+        local_actor, [direct_recipient.id], "Shared and individual inbox delivery"
+    )
+
+    delivery_tracker.wait(activity_uri, timeout)
+    summary = delivery_tracker.summary(activity_uri)
+    counts = delivery_tracker.receipt_counts(activity_uri)
+    json_metadata["shared_inbox"] = {
+        "followers": len(shared_followers) + len(individual_followers),
+        "shared_inboxes": {shared_inbox: counts[shared_inbox]},
+        "individual_inboxes": {inbox: counts[inbox] for inbox in individual_inboxes},
+    }
+
+    assert counts[shared_inbox] > 0, "Not delivered to the shared inbox"
+    missed = [inbox for inbox in individual_inboxes if counts[inbox] == 0]
+    assert not missed, f"Not delivered to actors without a shared inbox: {missed}"
+    assert summary["duplicates"] == 0, "Duplicate deliveries"
@@ -0,0 +1,239 @@
+"""
+Lightweight span tracing of test operations.
+
+Spans nest per thread (a span started in a span is its child). Tracing
+is disabled unless a tracer is configured (see the --aptest-trace options),
+in which case the span context manager and decorator do almost nothing.
+
+Completed spans are written to the exporters:
+
+* Chrome trace event format (JSON array), which can be loaded in
+  Perfetto (https://ui.perfetto.dev) or chrome://tracing
+* OTLP JSON (one ExportTraceServiceRequest per line, like the
+  OpenTelemetry collector file exporter)
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Iterator
+
+SEPARATORS = (",", ":")
+
+
+class Span:
+    __slots__ = [
+        "name",
+        "attributes",
+        "span_id",
+        "parent",
+        "trace_id",
+        "thread_id",
+        "start",
+        "end",
+        "error",
+    ]
+
+    def __init__(self, name: str, attributes: dict[str, Any], parent: "Span | None"):
+        self.name = name
+        self.attributes = attributes
+        self.span_id = os.urandom(8).hex()
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.thread_id = threading.get_native_id()
+        self.start = time.time_ns()
+        self.end = None
+        self.error = None
+
+
+class ChromeTraceExporter:
+    """Writes Chrome trace "complete" events as the spans end.
+
+    The closing bracket of the event array is optional in the trace
+    format so the file is usable even if the test run is killed."""
+
+    def __init__(self, filename: str):
+        self.fp = open(filename, "w")
+        self.fp.write("[\n")
+        self.pid = os.getpid()
+        self._first = True
+
+    def export(self, span: Span) -> None:
+        args = dict(span.attributes)
+        if span.error:
+            args["error"] = span.error
+        event = {
+            "name": span.name,
+            "cat": span.name.split(".")[0],
+            "ph": "X",
+            "ts": span.start / 1000,
+            "dur": (span.end - span.start) / 1000,
+            "pid": self.pid,
+            "tid": span.thread_id,
+            "args": args,
+        }
+        self.fp.write(("" if self._first else ",\n") + json.dumps(event))
+        self._first = False
+
+    def flush(self) -> None:
+        self.fp.flush()
+
+    def close(self) -> None:
+        self.fp.write("\n]\n")
+        self.fp.close()
+
+
+def otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OtlpJsonExporter:
+    """Writes the spans as OTLP JSON, one line per batch of spans
+    (the spans of a test)."""
+
+    def __init__(self, filename: str, service_name: str = "activitypub-testsuite"):
+        self.fp = open(filename, "w")
+        self.service_name = service_name
+        self.spans: list[dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        otlp_span = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 1,  # internal
+            "startTimeUnixNano": str(span.start),
+            "endTimeUnixNano": str(span.end),
+            "attributes": [
+                {"key": key, "value": otlp_value(value)}
+                for key, value in span.attributes.items()
+            ]
+            + [{"key": "thread.id", "value": otlp_value(span.thread_id)}],
+        }
+        if span.parent:
+            otlp_span["parentSpanId"] = span.parent.span_id
+        if span.error:
+            otlp_span["status"] = {"code": 2, "message": span.error}
+        with self._lock:
+            self.spans.append(otlp_span)
+
+    def flush(self) -> None:
+        with self._lock:
+            spans, self.spans = self.spans, []
+        if not spans:
+            return
+        request = {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {
+                                "key": "service.name",
+                                "value": otlp_value(self.service_name),
+                            }
+                        ]
+                    },
+                    "scopeSpans": [
+                        {"scope": {"name": "activitypub_testsuite"}, "spans": spans}
+                    ],
+                }
+            ]
+        }
+        self.fp.write(json.dumps(request, separators=SEPARATORS) + "\n")
+        self.fp.flush()
+
+    def close(self) -> None:
+        self.flush()
+        self.fp.close()
+
+
+class Tracer:
+    def __init__(self, exporters: list):
+        self.exporters = exporters
+        self.closed = False
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _stack(self) -> list[Span]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        stack = self._stack()
+        current = Span(name, attributes, stack[-1] if stack else None)
+        stack.append(current)
+        try:
+            yield current
+        except BaseException as ex:
+            current.error = f"{type(ex).__name__}: {ex}"
+            raise
+        finally:
+            current.end = time.time_ns()
+            stack.pop()
+            with self._lock:
+                # Spans that end after the tracer is closed are dropped
+                if not self.closed:
+                    for exporter in self.exporters:
+                        exporter.export(current)
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self.closed:
+                for exporter in self.exporters:
+                    exporter.flush()
+
+    def close(self) -> None:
+        """Close the exporters. If this is the installed tracer,
+        tracing is disabled."""
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            for exporter in self.exporters:
+                exporter.close()
+        if TRACER is self:
+            set_tracer(None)
+
+
+TRACER: Tracer | None = None
+
+
+def set_tracer(tracer: Tracer | None) -> None:
+    global TRACER
+    TRACER = tracer
+
+
+def span(name: str, **attributes: Any):
+    """A span context manager (does nothing if tracing is disabled)"""
+    if TRACER is None:
+        return nullcontext()
+    return TRACER.span(name, **attributes)
+
+
+def traced(name: str) -> Callable:
+    """Decorator for tracing a function or method call"""
+
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if TRACER is None:
+                return fn(*args, **kwargs)
+            with TRACER.span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
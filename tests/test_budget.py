@@ -0,0 +1,65 @@
+import json
+
+from activitypub_testsuite.budget import check_budgets, get_budgets, unknown_budgets
+
+pytest_plugins = ["pytester"]
+
+
+def test_unknown_budgets():
+    assert unknown_budgets({"max_call_seconds": 1, "max_calls": 2}) == ["max_calls"]
+
+
+def test_get_budgets():
+    budgets = get_budgets(
+        {"max_call_seconds": 1, "max_setup_seconds": 2},
+        {"max_call_seconds": 5, "status_code": 201},
+    )
+    assert budgets == {"max_call_seconds": 5, "max_setup_seconds": 2}
+
+
+def test_check_budgets():
+    durations = {"setup": 0.5, "call": 1.5, "teardown": 0.25}
+    metadata = {"delivery_latency": [("A", "http://h/inbox", 0.2)]}
+    budgets = {
+        "max_call_seconds": 1,
+        "max_duration_seconds": 3,
+        "max_delivery_ms": 100,
+    }
+
+    results = {r["name"]: r for r in check_budgets(budgets, durations, metadata)}
+
+    assert results["max_call_seconds"]["exceeded"]
+    assert results["max_duration_seconds"]["actual"] == 2.25
+    assert not results["max_duration_seconds"]["exceeded"]
+    assert results["max_delivery_ms"]["actual"] == 200
+    assert results["max_delivery_ms"]["exceeded"]
+
+
+def test_check_budgets_without_value():
+    assert check_budgets({"max_delivery_ms": 100}, {"call": 1.0}, {}) == []
+
+
+def test_over_budget_outcome(pytester):
+    pytester.makepyfile(
+        """
+        import time
+
+        import pytest
+
+        @pytest.mark.ap_perf(max_call_seconds=0.01)
+        def test_slow():
+            time.sleep(0.05)
+
+        def test_fast():
+            pass
+        """
+    )
+    result = pytester.runpytest_subprocess("-rA", "--json-report-file=report.json")
+
+    # The over-budget test is counted once (not as passed) and fails the run
+    assert result.parseoutcomes() == {"passed": 1, "overbudget": 1}
+    assert result.ret == 1
+    assert "PASSED test_over_budget_outcome.py::test_slow" not in result.outlines
+    report = json.loads((pytester.path / "report.json").read_text())
+    assert report["exitcode"] == 1
+    assert report["summary"]["overbudget"] == 1
@@ -0,0 +1,267 @@
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from activitypub_testsuite import fixtures
+from activitypub_testsuite.fixtures import (
+    ServerCapabilities,
+    check_collection_configs,
+    collection_config_directory,
+    get_test_config,
+    missing_server_capability,
+)
+from activitypub_testsuite.probe import nest_capabilities, probe_outbox
+
+pytest_plugins = ["pytester"]
+
+
+def test_capability_resolution():
+    capabilities = ServerCapabilities(
+        {
+            "c2s": {"default": False},
+            "s2s": {"inbox": {"post": {"default": True, "Like": False}}},
+            "webfinger": True,
+        }
+    )
+    assert capabilities.resolve("c2s.outbox.post") is False
+    assert capabilities.resolve("s2s.inbox.post.Create") is True
+    assert capabilities.resolve("s2s.inbox.post.Like") is False
+    assert capabilities.resolve("webfinger") is True
+    assert capabilities.resolve("nodeinfo") is None
+
+
+def test_capability_resolution_is_cached():
+    config = {"tombstones": False}
+    capabilities = ServerCapabilities(config)
+    assert capabilities.resolve("tombstones") is False
+    config["tombstones"] = True
+    assert capabilities.resolve("tombstones") is False
+
+
+def test_empty_capabilities():
+    assert not ServerCapabilities(None)
+    assert ServerCapabilities({"webfinger": True})
+
+
+def test_parameterized_test_config():
+    testsuite_config = {
+        "test_outbox_post": {
+            "status_code": 201,
+            "application/activity+json": {"skip": True},
+        }
+    }
+    config = get_test_config(
+        testsuite_config, "test_outbox_post[application/activity+json]"
+    )
+    assert config["skip"] is True
+    assert config["status_code"] == 201
+    assert get_test_config(testsuite_config, "test_other") == {}
+
+
+def test_nest_probed_capabilities():
+    nested = nest_capabilities(
+        {
+            "c2s.outbox.post": True,
+            "c2s.outbox.post.Block": False,
+            "webfinger": True,
+        }
+    )
+    assert nested == {
+        "c2s": {"outbox": {"post": {"default": True, "Block": False}}},
+        "webfinger": True,
+    }
+
+
+def test_configured_capabilities_override_probed():
+    capabilities = ServerCapabilities(
+        {"c2s": {"outbox": {"post": {"Block": True}}}},
+        {
+            "c2s.outbox.post": True,
+            "c2s.outbox.post.Block": False,
+            "c2s.outbox.post.Like": False,
+        },
+    )
+    assert capabilities.resolve("c2s.outbox.post.Block") is True
+    assert capabilities.resolve("c2s.outbox.post.Like") is False
+    assert capabilities.resolve("c2s.outbox.post.Create") is True
+    assert capabilities.resolve("webfinger") is None
+
+
+def test_missing_capability_reports_failing_id():
+    marker = SimpleNamespace(args=("s2s.inbox", "webfinger", "s2s.unknown"))
+    item = SimpleNamespace(iter_markers=lambda name: [marker], stash={})
+    capabilities = ServerCapabilities({"s2s": {"inbox": True}, "webfinger": False})
+
+    assert missing_server_capability(item, capabilities) == "webfinger"
+    assert (
+        missing_server_capability(item, ServerCapabilities({"webfinger": True})) is None
+    )
+    assert item.stash["unknown_capabilities"] == ["s2s.inbox", "s2s.unknown"]
+
+
+def test_collection_config_directory(monkeypatch, tmp_path):
+    def server_test_directory():
+        return "/project/tests"
+
+    fixture_defs = [SimpleNamespace(argnames=(), func=server_test_directory)]
+    session = SimpleNamespace(
+        _fixturemanager=SimpleNamespace(getfixturedefs=lambda name, node: fixture_defs)
+    )
+    item = SimpleNamespace(session=session, path=tmp_path / "test_fedi_x.py")
+    monkeypatch.delenv("APTEST_SERVER_TEST_DIRECTORY", raising=False)
+
+    assert collection_config_directory(item) == "/project/tests"
+    fixture_defs[0].argnames = ("request",)
+    assert collection_config_directory(item) == str(tmp_path)
+    monkeypatch.setenv("APTEST_SERVER_TEST_DIRECTORY", "/config")
+    assert collection_config_directory(item) == "/config"
+
+
+def test_check_collection_configs(monkeypatch):
+    config = {"test_a": {"skip": True}}
+    monkeypatch.setattr(fixtures, "_collection_configs", {"/project/tests": config})
+
+    check_collection_configs({"test_a": {"skip": True}})
+    with pytest.raises(pytest.UsageError):
+        check_collection_configs({})
+
+
+COLLECTION_SKIP_CONFTEST = """
+import pytest
+
+from activitypub_testsuite.fixtures import *  # noqa
+
+@pytest.fixture(scope="session")
+def server_test_directory(request):
+    return str(request.config.rootpath)
+
+@pytest.fixture
+def server_support():
+    with open("fixtures.log", "a") as fp:
+        fp.write("server_support\\n")
+"""
+
+
+def test_collection_skip_creates_no_fixtures(pytester, monkeypatch):
+    monkeypatch.setenv("APTEST_SERVER_TEST_DIRECTORY", str(pytester.path))
+    pytester.makeconftest(COLLECTION_SKIP_CONFTEST)
+    pytester.makefile(
+        ".toml",
+        config="""
+        [server.capabilities]
+        webfinger = false
+
+        [test_configured_skip]
+        skip = "not supported"
+        """,
+    )
+    pytester.makepyfile(
+        """
+        import pytest
+
+        def test_configured_skip(local_actor):
+            pass
+
+        @pytest.mark.ap_capability("webfinger")
+        def test_capability_skip(local_actor):
+            pass
+        """
+    )
+    result = pytester.runpytest_subprocess("-rs")
+
+    result.assert_outcomes(skipped=2)
+    result.stdout.fnmatch_lines(["*Missing required server capability: webfinger"])
+    assert not (pytester.path / "fixtures.log").exists()
+
+
+class FakeProbeActor:
+    """Accepts every outbox POST except the given activity types"""
+
+    def __init__(self, statuses: dict[str, int]):
+        self.id = "http://server/actor"
+        self.outbox = f"{self.id}/outbox"
+        self.statuses = statuses
+        self.posted: list[dict] = []
+        self.objects: dict[str, dict] = {}
+
+    def make_object(self):
+        return {"type": "Note", "content": "probe"}
+
+    def make_activity(self, properties):
+        return dict(properties)
+
+    def post(self, url, activity, exception=True):
+        activity_id = f"{self.id}/activities/{len(self.posted)}"
+        if activity["type"] == "Create":
+            object_id = f"{self.id}/objects/{len(self.posted)}"
+            self.objects[object_id] = {**activity["object"], "id": object_id}
+            activity = {**activity, "object": object_id}
+        self.posted.append(activity)
+        self.objects[activity_id] = activity
+        status = self.statuses.get(activity["type"], 201)
+        return httpx.Response(status, headers={"Location": activity_id})
+
+    def get_json(self, url, exception=True):
+        return self.objects.get(url)
+
+
+def test_probe_outbox():
+    actor = FakeProbeActor({"Block": 501, "Like": 400})
+    target = SimpleNamespace(id="http://remote/target")
+
+    results = probe_outbox(actor, target)
+
+    assert results["c2s.outbox.post.Create"] is True
+    assert results["c2s.outbox.post.Block"] is False
+    assert "c2s.outbox.post.Like" not in results  # inconclusive
+    assert results["c2s.outbox.post.Delete"] is True
+    types = [activity["type"] for activity in actor.posted]
+    assert types[-2:] == ["Create", "Delete"]
+    by_type = {activity["type"]: activity for activity in actor.posted}
+    assert by_type["Follow"]["object"] == target.id
+    assert by_type["Block"]["object"] == target.id
+    assert actor.objects[by_type["Undo"]["object"]]["type"] == "Follow"
+    first_object = actor.posted[0]["object"]
+    assert by_type["Like"]["object"] == first_object
+    assert by_type["Delete"]["object"] != first_object
+
+
+PROBE_FAILURE_CONFTEST = """
+import pytest
+
+from activitypub_testsuite.fixtures import *  # noqa
+
+@pytest.fixture(scope="session")
+def server_test_directory(request):
+    return str(request.config.rootpath)
+
+@pytest.fixture
+def local_base_url():
+    return "http://localhost:1"  # nothing listening
+
+@pytest.fixture
+def capability_probe_actors():
+    with open("probes.log", "a") as fp:
+        fp.write("probe\\n")
+    return None, None
+"""
+
+
+def test_probe_failure_probes_once(pytester, monkeypatch):
+    monkeypatch.setenv("APTEST_PROBE_CAPABILITIES", "1")
+    monkeypatch.setenv("APTEST_SERVER_TEST_DIRECTORY", str(pytester.path))
+    pytester.makeconftest(PROBE_FAILURE_CONFTEST)
+    pytester.makepyfile(
+        """
+        def test_a():
+            pass
+
+        def test_b():
+            pass
+        """
+    )
+    result = pytester.runpytest_subprocess()
+
+    result.assert_outcomes(passed=2, warnings=1)
+    assert (pytester.path / "probes.log").read_text() == "probe\n"
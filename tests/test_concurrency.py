@@ -0,0 +1,63 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+
+from activitypub_testsuite.http.concurrency import ConcurrencyTracker, reduce_series
+from activitypub_testsuite.http.server import HTTPServer
+from activitypub_testsuite.report.summary import concurrency_chart
+
+
+def test_tracker():
+    tracker = ConcurrencyTracker()
+    tracker.begin("a")
+    tracker.begin("a")
+    tracker.end("a")
+    tracker.begin(None)
+
+    assert tracker.peak("a") == 2
+    assert tracker.peak() == 1
+    summary = tracker.summary()
+    assert [count for _, count in summary["a"]["series"]] == [1, 2, 1]
+    assert summary["remote"]["peak"] == 1
+
+
+def test_reduce_series():
+    series = [[i, i % 3] for i in range(10)]
+    assert reduce_series(series, 20) == series
+    assert reduce_series(series, 4) == [[2, 2], [5, 2], [8, 2], [9, 0]]
+
+
+def test_concurrency_chart():
+    assert concurrency_chart([]) is None
+    chart = concurrency_chart([[1.0, 2], [2.0, 0]], width=100, height=10)
+    assert chart["points"] == "0.0,10.0 50.0,10.0 50.0,0.0 100.0,0.0 100.0,10.0"
+    assert chart["peak"] == 2
+
+
+@pytest.fixture
+def httpd():
+    httpd = HTTPServer("localhost", 0)
+    httpd.start()
+    while httpd.httpd is None:  # listening on an ephemeral port
+        time.sleep(0.01)
+    yield httpd
+    httpd.stop()
+
+
+@pytest.mark.parametrize("concurrent,peak", [(True, 4), (False, 1)])
+def test_host_concurrency(httpd, concurrent, peak):
+    port = httpd.get_virtual_host("host", concurrent=concurrent)
+    httpd.faults.add(host="host", delay=0.2)
+
+    with ThreadPoolExecutor(4) as executor:
+        list(
+            executor.map(
+                lambda i: httpx.post(f"http://localhost:{port}/inbox", json={}),
+                range(4),
+            )
+        )
+
+    assert httpd.is_concurrent("host") == concurrent
+    assert httpd.concurrency.peak("host") == peak
@@ -0,0 +1,128 @@
+from types import SimpleNamespace
+
+import httpx
+
+from activitypub_testsuite.delivery import (
+    DeliveryTracker,
+    actor_delivery_inbox,
+    delivery_latencies,
+    inbox_key,
+)
+from activitypub_testsuite.http.server import HTTPServer
+from activitypub_testsuite.interfaces import RemoteRequest
+from activitypub_testsuite.report.summary import delivery_chart
+
+
+def test_inbox_key():
+    assert inbox_key("http://localhost:8000/a/inbox") == (8000, "/a/inbox")
+    assert inbox_key("http://127.0.0.1:8000/a/inbox") == (8000, "/a/inbox")
+
+
+def test_actor_delivery_inbox():
+    actor = SimpleNamespace(inbox="http://h:1/a/inbox", shared_inbox=None)
+    assert actor_delivery_inbox(actor) == "http://h:1/a/inbox"
+    actor.shared_inbox = "http://h:1/inbox"
+    assert actor_delivery_inbox(actor) == "http://h:1/inbox"
+
+
+def test_delivery_summary():
+    inboxes = [f"http://h:{port}/inbox" for port in [1, 2, 3]]
+    tracker = DeliveryTracker(inboxes)
+    tracker.start = 10.0
+    tracker.record((2, "/inbox"), "A", 10.5)
+    tracker.record((1, "/inbox"), "A", 10.25)
+    tracker.record((1, "/inbox"), "A", 11.0)  # duplicate
+    tracker.record((4, "/inbox"), "A", 11.0)  # not expected
+    tracker.record((3, "/inbox"), "B", 11.0)  # another activity
+
+    summary = tracker.summary("A")
+
+    assert summary["delivered"] == 2
+    assert summary["missed"] == 1
+    assert summary["missed_inboxes"] == ["http://h:3/inbox"]
+    assert summary["duplicates"] == 1
+    assert summary["unexpected"] == 1
+    assert summary["completion_time"] is None
+    assert summary["curve"] == [[0.25, 1], [0.5, 2]]
+
+    tracker.record((3, "/inbox"), "A", 12.0)
+    assert tracker.summary("A")["completion_time"] == 2.0
+    assert tracker.wait("A", timeout=0, settle=0)
+    assert not tracker.wait("B", timeout=0, settle=0)
+
+
+def test_receive_times():
+    inboxes = [f"http://h:{port}/inbox" for port in [1, 2]]
+    tracker = DeliveryTracker(inboxes)
+    tracker.start = 10.0
+    tracker.record((1, "/inbox"), "A", 10.5)
+
+    assert tracker.receive_times("A") == {inboxes[0]: 0.5, inboxes[1]: None}
+    assert tracker.wait("A", timeout=0, settle=0, inboxes=inboxes[:1])
+    assert not tracker.wait("A", timeout=0, settle=0)
+
+
+def test_receipt_counts():
+    inboxes = [f"http://h:{port}/inbox" for port in [1, 2]]
+    tracker = DeliveryTracker(inboxes)
+    tracker.record((1, "/inbox"), "A", 10.5)
+    tracker.record((1, "/inbox"), "A", 11.0)
+    tracker.record((3, "/a/inbox"), "A", 11.0)
+    tracker.record((2, "/inbox"), "B", 11.0)
+
+    assert tracker.receipt_counts("A") == {inboxes[0]: 2, inboxes[1]: 0}
+    assert tracker.receipt_counts("A", ["http://h:3/a/inbox"]) == {
+        "http://h:3/a/inbox": 1
+    }
+
+
+def test_delivery_latencies():
+    def request(method, url, activity_id, received):
+        json = {"id": activity_id} if activity_id else None
+        return RemoteRequest(method, url, "", json, {}, {}, received)
+
+    requests = [
+        request("get", "http://h/actor", None, 10.1),
+        request("post", "http://h/b/inbox", "A", 10.5),
+        request("post", "http://h/a/inbox", "A", 10.25),
+        request("post", "http://h/a/inbox", "A", 11.0),  # retry
+        request("post", "http://h/a/inbox", "B", 11.0),  # not posted to an outbox
+    ]
+
+    assert delivery_latencies({"A": 10.0}, requests) == [
+        ("A", "http://h/a/inbox", 0.25),
+        ("A", "http://h/b/inbox", 0.5),
+    ]
+
+
+def test_delivery_chart():
+    assert delivery_chart([]) is None
+    chart = delivery_chart([[1.0, 1], [2.0, 2]], width=100, height=10)
+    assert chart["points"] == "0.0,10.0 50.0,10.0 50.0,5.0 100.0,5.0 100.0,0.0"
+    assert chart["end"] == 2.0
+    assert chart["count"] == 2
+
+
+def test_virtual_hosts():
+    httpd = HTTPServer("localhost", 0)
+    httpd.start()
+    try:
+        tracker = DeliveryTracker().attach(httpd)
+        port = httpd.get_virtual_host("other")
+        assert httpd.get_virtual_host("other") == port
+        httpd.serve_objects({"id": "http://localhost/object", "type": "Note"})
+
+        url = f"http://localhost:{port}"
+        assert httpx.get(f"{url}/object").json()["type"] == "Note"
+        httpx.post(f"{url}/inbox", json={"id": "A", "type": "Create"})
+
+        assert [request.method for request in httpd.requests] == ["get", "post"]
+        assert tracker.receipts[0].inbox == (port, "/inbox")
+        assert tracker.receipts[0].activity_id == "A"
+
+        # The virtual hosts log to the new request log after a reset
+        httpd.reset()
+        httpx.post(f"{url}/inbox", json={"id": "B", "type": "Create"})
+        assert [request.json["id"] for request in httpd.requests] == ["B"]
+    finally:
+        httpd.stop()
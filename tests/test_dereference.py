@@ -0,0 +1,73 @@
+import time
+from types import SimpleNamespace
+
+import httpx
+
+from activitypub_testsuite.dereference import actor_fetches, fetch_counts, page_fetches
+from activitypub_testsuite.http.server import HTTPServer, PagedCollection
+from activitypub_testsuite.interfaces import RemoteRequest
+
+
+def request(method, path):
+    return RemoteRequest(method, f"http://h{path}", path, None, {}, {})
+
+
+def test_fetch_counts():
+    requests = [
+        request("get", "/a"),
+        request("get", "/a"),
+        request("post", "/a/inbox"),
+        request("get", "/b?page=1"),
+    ]
+    assert fetch_counts(requests) == {"/a": 2, "/b": 1}
+
+
+def test_actor_fetches():
+    actor = SimpleNamespace(
+        id="http://h/a", profile={"publicKey": {"id": "http://h/a#main-key"}}
+    )
+    requests = [request("get", "/a"), request("get", "/a"), request("get", "/b")]
+    assert actor_fetches(requests, actor) == 2
+
+    actor.profile["publicKey"]["id"] = "http://h/keys/a"
+    assert actor_fetches(requests + [request("get", "/keys/a")], actor) == 3
+
+
+def test_page_fetches():
+    requests = [
+        request("get", "/a/followers"),
+        request("get", "/a/followers?page=1"),
+        request("get", "/a/followers?page=2"),
+        request("get", "/a/outbox?page=1"),
+    ]
+    assert page_fetches(requests, "http://h/a/followers") == 2
+
+
+def test_paged_collection():
+    collection = PagedCollection("http://h/c", 101, page_size=50)
+
+    assert collection({})["last"] == "http://h/c?page=3"
+    first = collection({"page": ["1"]})
+    assert len(first["orderedItems"]) == 50
+    assert first["next"] == "http://h/c?page=2"
+    assert "prev" not in first
+    assert collection({"page": ["3"]})["orderedItems"] == ["http://h/c/items/100"]
+    assert collection({"page": ["4"]}) is None
+
+
+def test_serve_generator():
+    httpd = HTTPServer("localhost", 0)
+    httpd.start()
+    try:
+        while httpd.httpd is None:  # listening on an ephemeral port
+            time.sleep(0.01)
+        url = f"http://localhost:{httpd.httpd.server_address[1]}"
+        httpd.serve_generator(f"{url}/c", PagedCollection(f"{url}/c", 1_000_000))
+
+        assert httpx.get(f"{url}/c").json()["totalItems"] == 1_000_000
+        page = httpx.get(f"{url}/c?page=20000").json()
+        assert page["orderedItems"][-1] == f"{url}/c/items/999999"
+        assert httpx.get(f"{url}/c?page=20001").status_code == 404
+        assert page_fetches(httpd.requests, f"{url}/c") == 2
+    finally:
+        httpd.stop()
@@ -0,0 +1,92 @@
+import time
+
+import httpx
+import pytest
+
+from activitypub_testsuite.http.faults import FaultInjector, FaultRule
+from activitypub_testsuite.http.server import HTTPServer
+
+
+def test_rule_matching():
+    rule = FaultRule(path=r"/inbox$", host="slow", method="POST")
+    assert rule.matches("slow", "POST", "/a/inbox")
+    assert not rule.matches("fast", "POST", "/a/inbox")
+    assert not rule.matches("slow", "GET", "/a/inbox")
+    assert not rule.matches("slow", "POST", "/a/outbox")
+    assert FaultRule().matches(None, "GET", "/")
+
+
+def test_first_attempts_per_url():
+    faults = FaultInjector()
+    rule = faults.add(status=503, first=2)
+    assert faults.match(None, "POST", "/a") is rule
+    assert faults.match(None, "POST", "/b") is rule
+    assert faults.match(None, "POST", "/a") is rule
+    assert faults.match(None, "POST", "/a") is None
+
+
+def test_fault_profile():
+    faults = FaultInjector()
+    faults.add_profile("rate-limited")
+    assert faults.rules[0].status == 429
+    with pytest.raises(ValueError):
+        faults.add_profile("unknown")
+
+
+@pytest.fixture
+def httpd():
+    httpd = HTTPServer("localhost", 0)
+    httpd.start()
+    while httpd.httpd is None:  # listening on an ephemeral port
+        time.sleep(0.01)
+    yield httpd
+    httpd.stop()
+
+
+def test_injected_faults(httpd):
+    url = f"http://localhost:{httpd.httpd.server_address[1]}"
+    httpd.serve_objects({"id": f"{url}/note", "type": "Note", "content": "x" * 40})
+    httpd.faults.add(path="/inbox", status=429, retry_after=3, first=1)
+    httpd.faults.add(path="/reset", reset=True)
+    httpd.faults.add(path="/note", delay=0.1, trickle=0.01)
+
+    response = httpx.post(f"{url}/inbox", json={"id": "A"})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "3"
+    assert httpx.post(f"{url}/inbox", json={"id": "A"}).status_code == 200
+    with pytest.raises(httpx.TransportError):
+        httpx.post(f"{url}/reset", json={"id": "B"})
+    start = time.monotonic()
+    assert httpx.get(f"{url}/note").json()["type"] == "Note"
+    assert time.monotonic() - start >= 0.1
+
+    # Only the handled requests are recorded (and seen by the listeners)
+    assert [r.path for r in httpd.requests] == ["/inbox", "/note"]
+    assert [(a.path, a.status, a.fault) for a in httpd.faults.attempts] == [
+        ("/inbox", 429, "status 429"),
+        ("/inbox", 200, None),
+        ("/reset", None, "reset"),
+        ("/note", 200, "delay"),
+    ]
+    assert httpd.faults.attempts[0].json == {"id": "A"}
+    assert httpd.faults.attempts[-1].duration >= 0.1
+
+
+def test_virtual_host_faults(httpd):
+    httpd.faults.add(host="down", status=503)
+    down = httpd.get_virtual_host("down")
+    up = httpd.get_virtual_host("up")
+    assert httpx.post(f"http://localhost:{down}/inbox", json={}).status_code == 503
+    assert httpx.post(f"http://localhost:{up}/inbox", json={}).status_code == 200
+    assert [a.host for a in httpd.faults.attempts] == ["down", "up"]
+
+
+def test_post_received_before_delay(httpd):
+    url = f"http://localhost:{httpd.httpd.server_address[1]}"
+    httpd.faults.add(path="/inbox", delay=0.2)
+
+    start = time.monotonic()
+    assert httpx.post(f"{url}/inbox", json={"id": "A"}).status_code == 200
+
+    # The injected delay isn't part of the delivery latency
+    assert httpd.requests[0].received - start < 0.2
@@ -0,0 +1,67 @@
+from activitypub_testsuite.history import (
+    DurationHistory,
+    estimate_duration,
+    longest_first,
+    shard_assignments,
+)
+
+
+def make_report(created: float, durations: dict[str, float], outcome="passed"):
+    return {
+        "created": created,
+        "tests": [
+            {
+                "nodeid": nodeid,
+                "outcome": outcome,
+                "setup": {"duration": 0.0},
+                "call": {"duration": duration},
+                "teardown": {"duration": 0.0},
+            }
+            for nodeid, duration in durations.items()
+        ],
+    }
+
+
+def test_durations_are_recent_means():
+    with DurationHistory(":memory:") as history:
+        history.ingest(make_report(1, {"a": 10.0, "b": 1.0}))
+        history.ingest(make_report(2, {"a": 2.0}))
+        history.ingest(make_report(3, {"a": 4.0}))
+        assert history.durations() == {"a": 16 / 3, "b": 1.0}
+        assert history.durations(window=2) == {"a": 3.0, "b": 1.0}
+
+
+def test_skipped_tests_are_not_recorded():
+    with DurationHistory(":memory:") as history:
+        assert history.ingest(make_report(1, {"a": 0.001}, "skipped")) == 0
+        assert history.durations() == {}
+
+
+def test_longest_first():
+    durations = {"a": 1.0, "b": 3.0, "c": 2.0}
+    assert longest_first(["a", "b", "c"], durations) == ["b", "c", "a"]
+    # Tests without history use the mean duration, ties by node id
+    assert longest_first(["d", "a", "b", "c"], durations) == ["b", "c", "d", "a"]
+
+
+def test_estimate_duration():
+    durations = {"a": 4.0, "b": 3.0, "c": 2.0, "d": 1.0}
+    assert estimate_duration(durations, durations) == 10.0
+    assert estimate_duration(durations, durations, workers=2) == 5.0
+    assert estimate_duration(durations, durations, workers=8) == 4.0
+
+
+def test_shards_are_balanced_by_duration():
+    durations = {"a": 5.0, "b": 4.0, "c": 3.0, "d": 2.0, "e": 1.0, "f": 1.0}
+    assignments = shard_assignments(durations, durations, 2)
+    loads = [0.0, 0.0]
+    for nodeid, shard in assignments.items():
+        loads[shard] += durations[nodeid]
+    assert loads == [8.0, 8.0]
+
+
+def test_shards_without_history_are_stable():
+    nodeids = [f"test_module.py::test_{i}" for i in range(100)]
+    assignments = shard_assignments(nodeids, {}, 3)
+    assert assignments == shard_assignments(reversed(nodeids), {}, 3)
+    assert set(assignments.values()) == {0, 1, 2}
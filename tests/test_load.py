@@ -0,0 +1,111 @@
+import time
+from types import SimpleNamespace
+
+from activitypub_testsuite.delivery import UndoLog
+from activitypub_testsuite.load import (
+    LoadConfig,
+    LoadResult,
+    LoadSample,
+    format_summary,
+    make_inbox_sender,
+    run_load,
+)
+
+
+def test_summary():
+    result = LoadResult()
+    result.elapsed = 2.0
+    for i in range(8):
+        result.add(LoadSample("Create", i * 0.1, 0.01 * (i + 1), 202))
+    result.add(LoadSample("Like", 0.8, 0.5, 500))
+    result.add(LoadSample("unknown", 0.9, 1.0, None, "ConnectError"))
+
+    summary = result.summary()
+
+    assert summary["requests"] == 10
+    assert summary["throughput"] == 5
+    assert summary["error_rate"] == 0.2
+    assert summary["errors"] == {"500": 1, "ConnectError": 1}
+    assert summary["latency"]["p50"] == 0.05
+    assert summary["latency"]["max"] == 1.0
+    assert summary["activity_types"]["Create"]["errors"] == 0
+    assert summary["activity_types"]["Like"]["errors"] == 1
+    lines = format_summary(summary)
+    assert "10 requests in 2.0s (5.0/s), error rate 20.00%" in lines
+
+
+def fake_send(n):
+    time.sleep(0.01)
+    if n % 5 == 4:
+        raise ConnectionError()
+    return "Create", SimpleNamespace(status_code=202)
+
+
+def test_run_load_closed_loop():
+    config = LoadConfig(duration=60, concurrency=2, requests=20)
+    summary = run_load(fake_send, config).summary()
+    # Two workers sending back-to-back until the request budget is used
+    assert summary["requests"] == 20
+    assert summary["errors"] == {"ConnectionError": 4}
+    assert summary["activity_types"]["Create"]["requests"] == 16
+
+
+def test_run_load_open_loop():
+    result = run_load(fake_send, LoadConfig(duration=0.5, rate=40, concurrency=4))
+    # The requests are scheduled at the target rate
+    assert len(result.samples) == 20
+    offsets = sorted(sample.offset for sample in result.samples)
+    assert offsets[1] - offsets[0] == 0.025
+    assert all(sample.latency >= 0.01 for sample in result.samples)
+
+
+class FakeActor:
+    def __init__(self, actor_id):
+        self.id = actor_id
+        self.inbox = f"{actor_id}/inbox"
+        self.posts = []
+
+    def make_object(self, properties):
+        return {"id": f"{self.id}/object", **properties}
+
+    def setup_activity(self, properties):
+        return {"id": f"{self.id}/activity", **properties}
+
+    def post(self, url, activity, exception=True):
+        self.posts.append((url, activity))
+        return SimpleNamespace(status_code=202)
+
+
+def test_make_inbox_sender():
+    senders = [FakeActor("https://remote/a"), FakeActor("https://remote/b")]
+    recipients = [FakeActor("https://local/x")]
+    send = make_inbox_sender(
+        senders, recipients, ["Create", "Like", "Follow"], "https://local/note"
+    )
+
+    assert [send(n)[0] for n in range(3)] == ["Create", "Like", "Follow"]
+
+    (url, create), (_, follow) = senders[0].posts
+    assert url == "https://local/x/inbox"
+    assert create["object"]["type"] == "Note"
+    assert follow["object"] == "https://local/x"
+    assert senders[1].posts[0][1]["object"] == "https://local/note"
+
+
+def test_make_inbox_sender_undo_log():
+    sender = FakeActor("https://remote/a")
+    recipient = FakeActor("https://local/x")
+    undo_log = UndoLog()
+    send = make_inbox_sender(
+        [sender], [recipient], ["Create", "Like", "Follow"], undo_log=undo_log
+    )
+    for n in range(3):
+        send(n)
+
+    undo_log.undo_all()
+
+    undos = [activity for _, activity in sender.posts[3:]]
+    assert [undo["type"] for undo in undos] == ["Undo", "Undo"]
+    assert [undo["object"]["type"] for undo in undos] == ["Like", "Follow"]
+    assert {url for url, _ in sender.posts[3:]} == {"https://local/x/inbox"}
+    assert undo_log.activities == []
@@ -0,0 +1,35 @@
+import os
+
+from activitypub_testsuite.output import OutputBuffer
+
+
+def test_output_buffer_lines():
+    output = OutputBuffer()
+    assert output.append(b"first\nsec", 1.0) == ["first"]
+    assert output.append(b"ond\r\nthird\n", 2.0) == ["second", "third"]
+    assert output.flush() == []
+    assert output.since(0) == ([(1.0, "first"), (2.0, "second"), (2.0, "third")], 0)
+    position = output.position()
+    output.append(b"fourth\nunterminated", 3.0)
+    assert output.flush() == ["unterminated"]
+    assert [line for _, line in output.since(position)[0]] == ["fourth", "unterminated"]
+
+
+def test_output_buffer_bounded():
+    output = OutputBuffer(max_lines=3)
+    output.append(b"".join(f"line {i}\n".encode() for i in range(10)))
+    assert [line for _, line in output.since(0)[0]] == ["line 7", "line 8", "line 9"]
+    # Lines that are no longer buffered or over the limit are counted
+    lines, dropped = output.since(5, limit=2)
+    assert [line for _, line in lines] == ["line 8", "line 9"]
+    assert dropped == 3
+
+
+def test_output_buffer_read_from_pipe():
+    read_fd, write_fd = os.pipe()
+    with os.fdopen(write_fd, "wb") as fp:
+        fp.write(b"one\ntwo\nthree")
+    output = OutputBuffer()
+    with os.fdopen(read_fd, "rb") as fp:
+        lines = [line for chunk in output.read_from(fp) for line in chunk]
+    assert lines == ["one", "two", "three"]
@@ -0,0 +1,76 @@
+from activitypub_testsuite.report.compare import ReportComparison, format_text
+
+
+def make_test(nodeid, outcome, duration, capabilities=None):
+    test = {"nodeid": nodeid, "outcome": outcome, "call": {"duration": duration}}
+    if capabilities:
+        test["metadata"] = {"ap_capability": capabilities}
+    return test
+
+
+def test_compare_outcomes_and_durations():
+    base = [
+        make_test("t1", "passed", 1.0, ["c2s.outbox.post"]),
+        make_test("t2", "passed", 1.0, ["c2s.outbox.post"]),
+        make_test("t3", "failed", 0.5),
+        make_test("t4", "passed", 0.01),
+        make_test("removed", "passed", 1.0),
+    ]
+    head = [
+        make_test("t1", "passed", 2.0, ["c2s.outbox.post"]),
+        make_test("t2", "failed", 1.1, ["c2s.outbox.post"]),
+        make_test("t3", "passed", 0.5),
+        # Large relative change, but below the minimum delta
+        make_test("t4", "passed", 0.04),
+        make_test("new1", "passed", 0.2),
+        make_test("new2", "passed", 3.0),
+    ]
+    comparison = ReportComparison(base, head, threshold=0.2, min_delta=0.05)
+
+    assert [(c["name"], c["regression"]) for c in comparison.outcome_changes] == [
+        ("t2", True),
+        ("t3", False),
+    ]
+    assert [c["name"] for c in comparison.duration_regressions] == ["t1"]
+    assert comparison.duration_regressions[0]["ratio"] == 1.0
+    capability = comparison.capability_changes[0]
+    assert capability["name"] == "c2s.outbox.post"
+    assert (capability["base"], capability["head"]) == (2.0, 3.1)
+    assert capability["regression"]
+    assert [t["name"] for t in comparison.new_tests] == ["new2", "new1"]
+    assert comparison.removed_tests == ["removed"]
+    assert comparison.has_regressions
+    assert "! " in "\n".join(format_text(comparison))
+
+
+def test_compare_no_regressions():
+    tests = [make_test("t1", "passed", 1.0), make_test("t2", "skipped", 0.0)]
+    faster = [make_test("t1", "passed", 0.5), make_test("t2", "skipped", 0.0)]
+    comparison = ReportComparison(tests, faster)
+    assert not comparison.has_regressions
+    assert comparison.duration_changes[0]["delta"] == -0.5
+
+
+def test_compare_delivery_latency():
+    def make_delivery_test(nodeid, latencies):
+        test = make_test(nodeid, "passed", 1.0)
+        test["metadata"] = {
+            "delivery_latency": [["A", "http://h/inbox", x] for x in latencies]
+        }
+        return test
+
+    base = [make_delivery_test("t1", [0.1, 0.2]), make_delivery_test("t2", [0.3])]
+    head = [make_delivery_test("t1", [0.1, 0.2]), make_delivery_test("t2", [0.9])]
+    comparison = ReportComparison(base, head, threshold=0.2, min_delta=0.05)
+
+    assert [c["name"] for c in comparison.delivery_changes] == [
+        "Delivery latency p50",
+        "Delivery latency p90",
+        "Delivery latency p99",
+    ]
+    assert [c["name"] for c in comparison.delivery_regressions] == [
+        "Delivery latency p90",
+        "Delivery latency p99",
+    ]
+    assert comparison.has_regressions
+    assert ReportComparison(base, base).delivery_regressions == []
@@ -0,0 +1,72 @@
+from activitypub_testsuite.report.jsonl import (
+    JsonLinesWriter,
+    load_jsonl_report,
+    stream_jsonl_report,
+    write_stage,
+)
+
+
+def write_test(writer, nodeid, outcomes: dict[str, str]):
+    for when, outcome in outcomes.items():
+        write_stage(
+            writer,
+            nodeid,
+            1,
+            when,
+            outcome,
+            {"duration": 0.5, "outcome": "passed" if outcome == "" else outcome},
+        )
+
+
+def write_results(filename, finish=True):
+    writer = JsonLinesWriter(filename)
+    writer.write("start", created=100.0, root="/tests", environment={"Python": "3"})
+    write_test(writer, "t1", {"setup": "", "call": "passed", "teardown": ""})
+    write_test(writer, "t2", {"setup": "", "call": "xfailed", "teardown": ""})
+    write_test(writer, "t3", {"setup": "error", "teardown": ""})
+    # Killed during the test call
+    write_test(writer, "t4", {"setup": ""})
+    if finish:
+        writer.write(
+            "finish",
+            created=100.0,
+            duration=5.0,
+            exitcode=1,
+            environment={"Python": "3"},
+            summary={"passed": 1, "total": 4, "collected": 4},
+        )
+    writer.close()
+
+
+def test_jsonl_round_trip(tmp_path):
+    filename = str(tmp_path / "results.jsonl")
+    write_results(filename)
+    report = load_jsonl_report(filename)
+    assert report["duration"] == 5.0
+    assert report["exitcode"] == 1
+    assert [(t["nodeid"], t["outcome"]) for t in report["tests"]] == [
+        ("t1", "passed"),
+        ("t2", "xfailed"),
+        ("t3", "error"),
+        ("t4", "error"),
+    ]
+    assert report["tests"][0]["call"] == {"duration": 0.5, "outcome": "passed"}
+    assert "call" not in report["tests"][2]
+
+
+def test_jsonl_without_finish(tmp_path):
+    filename = str(tmp_path / "results.jsonl")
+    write_results(filename, finish=False)
+    report = stream_jsonl_report(filename)
+    assert report["created"] == 100.0
+    assert report["root"] == "/tests"
+    assert report["exitcode"] == 2
+    assert report["summary"] == {
+        "passed": 1,
+        "xfailed": 1,
+        "error": 2,
+        "total": 4,
+        "collected": 4,
+    }
+    # Streamed tests can be iterated more than once
+    assert len(list(report["tests"])) == len(list(report["tests"])) == 4
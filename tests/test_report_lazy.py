@@ -0,0 +1,86 @@
+import base64
+import gzip
+import json
+
+from activitypub_testsuite.report.lazy import LazyReportData
+
+
+def decode(lazy_data: LazyReportData):
+    return json.loads(gzip.decompress(base64.b64decode(lazy_data.encoded_tests())))
+
+
+def test_lazy_report_data():
+    tests = [
+        {
+            "nodeid": "tests/test_a.py::test_1[x]",
+            "outcome": "failed",
+            "metadata": {
+                "ap_reqlevel": ["MUST"],
+                "ap_capability": ["c2s.outbox.post"],
+                "documentation": "Test documentation",
+                "params": {"p": 1},
+            },
+            "setup": {"duration": 0.25, "outcome": "passed"},
+            "call": {
+                "duration": 1.0,
+                "outcome": "failed",
+                "crash": {"message": "AssertionError"},
+                "longrepr": "...",
+            },
+        },
+        {
+            "nodeid": "tests/test_a.py::test_2",
+            "outcome": "xfailed",
+            "metadata": {"config": {"xfail": "Known issue", "bug": True}},
+            "setup": {"duration": 0.5, "outcome": "skipped"},
+        },
+    ]
+    lazy_data = LazyReportData().add_tests(tests)
+    assert decode(lazy_data) == [
+        [
+            "test_1[x]",
+            1,
+            1.25,
+            0,
+            [0],
+            {
+                "reason": "AssertionError",
+                "documentation": "Test documentation",
+                "params": {"p": "1"},
+                "stages": [["setup", "passed", 0.25], ["call", "failed", 1.0]],
+            },
+        ],
+        [
+            "test_2",
+            4,
+            0.5,
+            1,
+            [],
+            {
+                "reason": "Known issue",
+                "bug": True,
+                "stages": [["setup", "skipped", 0.5]],
+            },
+        ],
+    ]
+    assert lazy_data.lookups()["reqlevels"] == ["MUST", ""]
+    assert lazy_data.lookups()["capabilities"] == ["c2s.outbox.post"]
+
+
+def test_lazy_report_data_empty():
+    assert decode(LazyReportData()) == []
+
+
+def test_lazy_report_data_other_outcomes():
+    tests = [
+        {"nodeid": "test_a", "outcome": "rerun"},
+        {"nodeid": "test_b", "outcome": "error"},
+        {"nodeid": "test_c", "outcome": "rerun"},
+    ]
+    lazy_data = LazyReportData().add_tests(tests)
+    outcomes = lazy_data.lookups()["outcomes"]
+    assert [outcomes[record[1]] for record in decode(lazy_data)] == [
+        "rerun",
+        "error",
+        "rerun",
+    ]
@@ -0,0 +1,47 @@
+from activitypub_testsuite.report.matrix import ReportMatrix, project_name
+
+
+def make_test(nodeid, outcome, duration=None, capabilities=None):
+    test = {"nodeid": nodeid, "outcome": outcome, "metadata": {}}
+    if duration is not None:
+        test["call"] = {"duration": duration}
+    if capabilities:
+        test["metadata"]["ap_capability"] = capabilities
+    return test
+
+
+def test_project_name():
+    report = {"environment": {"Project": {"Project Name": "Server A"}}}
+    assert project_name(report, "a.json") == "Server A"
+    assert project_name({"environment": {}}, "out/server-b-report.json") == "server-b"
+
+
+def test_matrix_data():
+    matrix = ReportMatrix()
+    matrix.add(
+        "a",
+        [
+            make_test("tests/a.py::test_1", "passed", 1.0, ["c2s.outbox.post"]),
+            make_test("tests/a.py::test_2", "skipped"),
+        ],
+    )
+    # Same tests in a different server test module
+    matrix.add(
+        "b",
+        [
+            make_test("b/test_b.py::test_1", "failed", 2.0, ["c2s.outbox.post"]),
+            make_test("b/test_b.py::test_3", "passed", 0.5),
+        ],
+    )
+    data = matrix.data()
+    assert data["servers"] == ["a", "b"]
+    assert data["capabilities"] == ["c2s.outbox.post"]
+    passed, skipped, failed = (
+        data["outcomes"].index(o) for o in ["passed", "skipped", "failed"]
+    )
+    assert data["tests"] == [
+        ["test_1", 0, [0], [[passed, 1.0], [failed, 2.0]]],
+        ["test_2", 0, [], [[skipped, None], None]],
+        ["test_3", 0, [], [None, [passed, 0.5]]],
+    ]
+    assert data["rollups"] == [[[1, 1, 1.0], [0, 1, 2.0]]]
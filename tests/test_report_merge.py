@@ -0,0 +1,128 @@
+import io
+import json
+
+from activitypub_testsuite.report.generator import load_report
+from activitypub_testsuite.report.merge import (
+    ReportMerger,
+    merge_report_files,
+    merge_reports,
+)
+
+
+def make_report(created, duration, outcomes: dict[str, str], exitcode=0):
+    return {
+        "created": created,
+        "duration": duration,
+        "exitcode": exitcode,
+        "environment": {"Python": "3.11"},
+        "summary": {"collected": 4},
+        "tests": [
+            {"nodeid": nodeid, "outcome": outcome}
+            for nodeid, outcome in outcomes.items()
+        ],
+    }
+
+
+def test_merge_shard_reports():
+    merged = merge_reports(
+        [
+            make_report(100.0, 10.0, {"t1": "passed", "t2": "failed"}, exitcode=1),
+            make_report(102.0, 20.0, {"t3": "passed", "t4": "skipped"}),
+        ]
+    )
+    assert merged["created"] == 100.0
+    assert merged["duration"] == 22.0
+    assert merged["exitcode"] == 1
+    assert merged["environment"] == {"Python": "3.11"}
+    assert [t["nodeid"] for t in merged["tests"]] == ["t1", "t2", "t3", "t4"]
+    assert merged["summary"] == {
+        "passed": 2,
+        "failed": 1,
+        "skipped": 1,
+        "total": 4,
+        "collected": 4,
+    }
+
+
+def test_merge_keeps_last_rerun_and_sources():
+    merger = ReportMerger()
+    merger.add(
+        make_report(100.0, 10.0, {"t1": "failed", "t2": "passed"}, exitcode=1),
+        "a.json",
+    )
+    rerun = make_report(200.0, 5.0, {"t1": "passed"})
+    rerun["environment"]["Shard"] = "1/2"
+    merger.add(rerun, "b.json")
+    merged = merger.report()
+    assert [(t["nodeid"], t["outcome"]) for t in merged["tests"]] == [
+        ("t1", "passed"),
+        ("t2", "passed"),
+    ]
+    assert merged["summary"]["passed"] == 2
+    assert merged["exitcode"] == 0
+    assert [s["source"] for s in merged["sources"]] == ["a.json", "b.json"]
+    assert merged["sources"][1]["environment"] == {"Shard": "1/2"}
+
+
+def test_merged_report_streaming_write():
+    merger = ReportMerger()
+    merger.add(make_report(100.0, 10.0, {"t1": "passed"}))
+    merger.add(make_report(110.0, 10.0, {"t2": "xfailed"}))
+    fp = io.StringIO()
+    merger.write(fp)
+    assert json.loads(fp.getvalue()) == merger.report()
+
+
+def test_merged_exitcode():
+    failed = make_report(0.0, 1.0, {"t1": "failed"}, exitcode=1)
+    empty = make_report(0.0, 1.0, {}, exitcode=5)
+    interrupted = make_report(0.0, 1.0, {"t2": "passed"}, exitcode=2)
+    assert merge_reports([failed, empty])["exitcode"] == 1
+    assert merge_reports([empty])["exitcode"] == 5
+    assert merge_reports([interrupted, empty])["exitcode"] == 2
+
+
+def test_merge_report_files(tmp_path):
+    first = make_report(0.0, 10.0, {"t1": "failed"}, exitcode=1)
+    first["warnings"] = [{"message": "w"}]
+    filenames = []
+    for i, report in enumerate([first, make_report(0.0, 5.0, {"t1": "passed"})]):
+        filename = tmp_path / f"r{i}.json"
+        filename.write_text(json.dumps(report, indent=2))
+        filenames.append(str(filename))
+
+    merged = merge_report_files(filenames).report()
+
+    assert merged["created"] == 0.0
+    assert merged["duration"] == 10.0
+    assert merged["exitcode"] == 0
+    assert merged["tests"] == [{"nodeid": "t1", "outcome": "passed"}]
+    assert merged["warnings"] == [{"message": "w"}]
+
+
+def test_merged_tests_streamed_from_files(tmp_path):
+    shard = make_report(0.0, 10.0, {"t1": "failed", "t2": "passed", "t3": "failed"})
+    rerun = make_report(20.0, 5.0, {"t3": "passed", "t1": "passed"})
+    rerun["tests"].append({"nodeid": "t1", "outcome": "failed", "rerun": 2})
+    filenames = []
+    for i, report in enumerate([shard, rerun]):
+        filename = tmp_path / f"r{i}.json"
+        filename.write_text(json.dumps(report))
+        filenames.append(str(filename))
+
+    merger = merge_report_files(filenames)
+    report = load_report(filenames)
+
+    # Only the node id index is kept. The tests are read from the files.
+    assert all(isinstance(entry, list) for entry in merger.index.values())
+    expected = [
+        {"nodeid": "t1", "outcome": "failed", "rerun": 2},
+        {"nodeid": "t2", "outcome": "passed"},
+        {"nodeid": "t3", "outcome": "passed"},
+    ]
+    assert list(merger.tests) == expected
+    assert len(merger.tests) == 3
+    assert list(report["tests"]) == expected
+    assert list(report["tests"]) == expected  # re-iterable
+    assert report["summary"]["failed"] == 1
+    assert report["exitcode"] == 1
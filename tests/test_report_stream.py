@@ -0,0 +1,49 @@
+import io
+import json
+
+from activitypub_testsuite.report.stream import (
+    JsonScanner,
+    read_report_header,
+    stream_report,
+)
+
+REPORT = {
+    "created": 1718000000.123456,
+    "duration": 12.5,
+    "exitcode": 0,
+    "environment": {"Python": "3.11", "Packages": {"pytest": "8.3.2"}},
+    "summary": {"passed": 2, "total": 2, "collected": 2},
+    "tests": [
+        {"nodeid": "t.py::test_a", "outcome": "passed", "call": {"duration": 1e-05}},
+        {"nodeid": "t.py::test_b[x, y]", "outcome": "passed", "setup": {}},
+    ],
+    "warnings": [{"message": "deprecated", "when": "collect"}],
+}
+
+
+def test_scanner_with_small_chunks():
+    # Chunk boundaries split numbers, strings and literals
+    for chunk_size in [1, 2, 3, 7]:
+        for indent in [None, 2]:
+            fp = io.StringIO(json.dumps(REPORT, indent=indent))
+            scanner = JsonScanner(fp, chunk_size=chunk_size)
+            report = {}
+            for key, _ in scanner.object_items():
+                if key == "tests":
+                    report[key] = list(scanner.array_values())
+                else:
+                    report[key] = scanner.value()
+            assert report == REPORT
+
+
+def test_stream_report(tmp_path):
+    filename = tmp_path / "report.json"
+    filename.write_text(json.dumps(REPORT, indent=2))
+    header = read_report_header(filename)
+    assert "tests" not in header
+    assert header["warnings"] == REPORT["warnings"]
+    report = stream_report(filename)
+    assert report["summary"] == REPORT["summary"]
+    # The tests can be iterated more than once
+    assert list(report["tests"]) == REPORT["tests"]
+    assert list(report["tests"]) == REPORT["tests"]
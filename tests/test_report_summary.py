@@ -0,0 +1,75 @@
+from activitypub_testsuite.report.summary import (
+    DeliveryLatencyTotals,
+    fixture_durations,
+    fixture_totals,
+    latency_summary,
+    percentile,
+    summarize,
+)
+
+
+def test_percentile():
+    values = [0.1 * i for i in range(1, 11)]
+    assert percentile(values, 50) == values[4]
+    assert percentile(values, 90) == values[8]
+    assert percentile(values, 99) == values[9]
+    assert percentile(values, 0) == values[0]
+    assert percentile([], 50) == 0
+
+
+def test_latency_summary():
+    summary = latency_summary([0.3, 0.1, 0.2])
+    assert summary == {
+        "p50": 0.2,
+        "p90": 0.3,
+        "p95": 0.3,
+        "p99": 0.3,
+        "mean": 0.2,
+        "max": 0.3,
+    }
+    assert latency_summary([])["max"] == 0
+
+
+def test_summarize():
+    tests = [{"outcome": "passed"}, {"outcome": "failed"}, {"outcome": "passed"}]
+    assert summarize(tests) == {"passed": 2, "failed": 1, "total": 3, "collected": 3}
+    assert summarize(tests, 5)["collected"] == 5
+
+
+def make_test(fixtures):
+    return {"nodeid": "t", "metadata": {"fixtures": fixtures}}
+
+
+def test_fixture_durations():
+    test = make_test({"a": {"setup": 0.1}, "b": {"setup": 0.2, "teardown": 0.3}})
+    assert fixture_durations(test) == [("b", 0.2, 0.3), ("a", 0.1, 0.0)]
+    assert fixture_durations({"nodeid": "t"}) == []
+
+
+def test_fixture_totals():
+    tests = [
+        make_test({"server": {"setup": 2.0}, "actor": {"setup": 0.25}}),
+        make_test({"actor": {"setup": 0.25, "teardown": 0.5}}),
+        {"nodeid": "no-metadata"},
+    ]
+    assert fixture_totals(tests) == [
+        ("server", 1, 2.0, 0.0),
+        ("actor", 2, 0.5, 0.5),
+    ]
+
+
+def test_delivery_latency_totals():
+    totals = DeliveryLatencyTotals()
+    assert totals.summary() is None
+    totals.add({"metadata": {"delivery_latency": [["A", "http://h/1", 0.5]]}})
+    totals.add({"metadata": {}})
+    totals.add(
+        {
+            "metadata": {
+                "delivery_latency": [["B", "http://h/1", 0.1], ["B", "http://h/2", 0.3]]
+            }
+        }
+    )
+    summary = totals.summary()
+    assert (summary["count"], summary["tests"]) == (3, 2)
+    assert (summary["p50"], summary["max"]) == (0.3, 0.5)
@@ -0,0 +1,62 @@
+import os
+
+import pytest
+
+from activitypub_testsuite import resources
+from activitypub_testsuite.report.summary import ResourceTimeline
+from activitypub_testsuite.resources import (
+    ResourceSampler,
+    sample_process_tree,
+    window_usage,
+)
+
+
+@pytest.mark.skipif(not resources.is_supported(), reason="Requires /proc")
+def test_sample_process():
+    sample = sample_process_tree(os.getpid())
+    assert sample["processes"] >= 1
+    assert sample["rss"] > 0
+    assert sample["threads"] >= 1
+    assert sample["fds"] >= 3
+
+
+@pytest.mark.skipif(not resources.is_supported(), reason="Requires /proc")
+def test_sampler_window():
+    sampler = ResourceSampler(os.getpid(), interval=0.01).start()
+    try:
+        sampler.begin()
+        data = bytearray(20_000_000)  # noqa: F841
+        usage = sampler.end()
+    finally:
+        sampler.stop()
+    assert usage["rss"]["peak"] >= usage["rss"]["end"] > usage["rss"]["start"]
+    assert "peak" not in usage["cpu"]
+    assert sampler.end() is None
+
+
+def test_window_usage():
+    start = {"rss": 100, "cpu": 1.0, "threads": 2, "fds": 5, "processes": 1}
+    end = {"rss": 150, "cpu": 1.5, "threads": 2, "fds": 4, "processes": 1}
+    peak = {"rss": 200, "cpu": 1.5, "threads": 3, "fds": 6, "processes": 2}
+    usage = window_usage(start, end, peak)
+    assert usage["rss"] == {"start": 100, "end": 150, "delta": 50, "peak": 200}
+    assert usage["cpu"] == {"start": 1.0, "end": 1.5, "delta": 0.5}
+    assert usage["fds"]["delta"] == -1
+
+
+def test_resource_timeline():
+    timeline = ResourceTimeline()
+    for i, rss in enumerate([100, 300, 200]):
+        timeline.add(
+            {"nodeid": f"t{i}", "metadata": {"resources": {"rss": {"end": rss}}}}
+        )
+    timeline.add({"nodeid": "not-sampled"})
+    chart = timeline.chart(width=100, height=10)
+    assert chart["points"] == "0.0,10.0 50.0,0.0 100.0,5.0"
+    assert (chart["start"], chart["end"], chart["low"], chart["high"]) == (
+        100,
+        200,
+        100,
+        300,
+    )
+    assert ResourceTimeline().chart() is None
@@ -0,0 +1,88 @@
+from activitypub_testsuite.http.faults import Attempt
+from activitypub_testsuite.report.summary import retry_timeline
+from activitypub_testsuite.retries import (
+    BackoffPolicy,
+    RetrySchedule,
+    activity_key,
+    check_backoff,
+    retry_schedules,
+)
+
+
+def attempt(started, status=200, json=None, path="/a/inbox", retry_after=None):
+    return Attempt(
+        "POST",
+        None,
+        path,
+        started,
+        status=status,
+        json=json or {"id": "A"},
+        retry_after=retry_after,
+    )
+
+
+def schedule(*attempts):
+    return RetrySchedule("A", None, "/a/inbox", list(attempts))
+
+
+def test_activity_key():
+    assert activity_key({"id": "A", "type": "Create"}) == "A"
+    assert activity_key({"type": "Create", "actor": "x"}) == activity_key(
+        {"actor": "x", "type": "Create"}
+    )
+    assert activity_key({"type": "Create"}).startswith("sha256:")
+    assert activity_key(None) is None
+
+
+def test_retry_schedules():
+    attempts = [
+        attempt(12.0, 200),
+        attempt(10.0, 503),
+        attempt(11.0, 503),
+        attempt(10.5, 200, path="/b/inbox"),
+        attempt(10.5, 200, json={"id": "B"}),
+    ]
+
+    schedules = retry_schedules(attempts)
+    assert [(s.activity, s.inbox, len(s.attempts)) for s in schedules] == [
+        ("A", "/a/inbox", 3),
+        ("A", "/b/inbox", 1),
+        ("B", "/a/inbox", 1),
+    ]
+    assert schedules[0].intervals == [1.0, 1.0]
+    assert schedules[0].delivered
+    assert schedules[0].to_json()["attempts"] == [
+        [0.0, 503, None],
+        [1.0, 503, None],
+        [2.0, 200, None],
+    ]
+    assert len(retry_schedules(attempts, retried_only=True)) == 1
+
+
+def test_check_backoff():
+    policy = BackoffPolicy(min_interval=1.0, factor=2.0, jitter=0.1, max_attempts=3)
+    assert check_backoff(schedule(attempt(0), attempt(1), attempt(3.0)), policy) == []
+
+    problems = check_backoff(
+        schedule(attempt(0), attempt(0.2), attempt(2.2), attempt(3.0)), policy
+    )
+    assert problems == [
+        "4 attempts (maximum 3)",
+        "retry 1 after 0.200s (minimum 1.000s)",
+        "retry 3 after 0.800s (minimum 4.000s)",
+    ]
+
+
+def test_check_backoff_retry_after():
+    retried = schedule(attempt(0, 429, retry_after=5), attempt(2))
+    assert check_backoff(retried, BackoffPolicy()) == [
+        "retry 1 after 2.000s (minimum 5.000s)"
+    ]
+    assert check_backoff(retried, BackoffPolicy(retry_after=False)) == []
+
+
+def test_retry_timeline():
+    assert retry_timeline([]) is None
+    timeline = retry_timeline([[0.0, 503, None], [2.0, None, None], [4.0, 200, None]])
+    assert [mark["x"] for mark in timeline["marks"]] == [7, 150, 293]
+    assert [mark["ok"] for mark in timeline["marks"]] == [False, False, True]
@@ -0,0 +1,84 @@
+import json
+from contextlib import contextmanager
+
+import pytest
+
+from activitypub_testsuite import tracing
+from activitypub_testsuite.tracing import (
+    ChromeTraceExporter,
+    OtlpJsonExporter,
+    Tracer,
+    span,
+    traced,
+)
+
+
+@traced("operation")
+def operation(fail=False):
+    with span("nested", value=1):
+        if fail:
+            raise ValueError("failed")
+    return "result"
+
+
+def test_tracing_disabled():
+    assert tracing.TRACER is None
+    assert operation() == "result"
+    with span("ignored") as current:
+        assert current is None
+
+
+@pytest.fixture
+def tracer(tmp_path):
+    chrome_path = tmp_path / "trace.json"
+    otlp_path = tmp_path / "trace.jsonl"
+    tracer = Tracer([ChromeTraceExporter(chrome_path), OtlpJsonExporter(otlp_path)])
+    yield tracer, chrome_path, otlp_path
+    tracer.close()
+
+
+@contextmanager
+def installed(tracer: Tracer):
+    """Install the tracer only while the traced code runs, so the plugin's
+    stage spans never use it"""
+    previous = tracing.TRACER
+    tracing.set_tracer(tracer)
+    try:
+        yield
+    finally:
+        tracing.set_tracer(previous)
+
+
+def test_tracing_exporters(tracer):
+    tracer, chrome_path, otlp_path = tracer
+    with installed(tracer):
+        assert operation() == "result"
+        with pytest.raises(ValueError):
+            operation(fail=True)
+    tracer.close()
+
+    events = json.loads(chrome_path.read_text())
+    assert [e["name"] for e in events] == ["nested", "operation"] * 2
+    assert events[0]["args"] == {"value": 1}
+    assert events[2]["args"]["error"] == "ValueError: failed"
+    assert all(e["ph"] == "X" and e["dur"] >= 0 for e in events)
+
+    lines = otlp_path.read_text().splitlines()
+    assert len(lines) == 1
+    spans = json.loads(lines[0])["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    nested, parent = spans[:2]
+    assert nested["parentSpanId"] == parent["spanId"]
+    assert nested["traceId"] == parent["traceId"]
+    assert "parentSpanId" not in parent
+    assert spans[3]["status"]["code"] == 2
+
+
+def test_closed_tracer(tracer):
+    tracer, chrome_path, _ = tracer
+    tracing.set_tracer(tracer)
+    with tracer.span("open"):
+        tracer.close()
+    tracer.flush()
+    tracer.close()
+    assert tracing.TRACER is None
+    assert json.loads(chrome_path.read_text()) == []